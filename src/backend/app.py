@@ -1,4 +1,6 @@
 import os
+
+import click
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -6,6 +8,11 @@ from flask_mail import Mail
 
 from .config import Config
 from .models import db
+from .audit_buffer import init_audit_buffer
+from .response_layer import init_response_layer
+from .instrumentation import init_instrumentation, instrumentation_bp
+from .project_versions import init_project_versions
+from .prometheus_metrics import init_metrics, metrics_bp
 from .auth import auth_bp
 from .projects import projects_bp
 from .workorders import workorders_bp
@@ -30,7 +37,14 @@ def create_app() -> Flask:
         supports_credentials=False,  # Must be False when using "*" for origins
     )
 
+    # Before db.init_app so the engine gets the timed pool; its request timer wraps every other hook
+    init_metrics(app)
     db.init_app(app)
+    # Early, so its after_request hook runs late and times the others
+    init_instrumentation(app)
+    init_audit_buffer(app)
+    init_project_versions()
+    init_response_layer(app)
     jwt = JWTManager(app)
     with app.app_context():
         db.create_all()
@@ -58,6 +72,49 @@ def create_app() -> Flask:
     app.register_blueprint(projects_bp)
     app.register_blueprint(workorders_bp)
     app.register_blueprint(messages_bp)
+    app.register_blueprint(instrumentation_bp)
+    app.register_blueprint(metrics_bp)
+
+    @app.cli.command("archive-audit-logs")
+    def archive_audit_logs_command():
+        """Archive audit logs older than AUDIT_HOT_RETENTION_DAYS (run from cron)."""
+        from .audit_archive import ArchiveNotConfiguredError, archive_audit_logs
+        try:
+            summary = archive_audit_logs()
+        except ArchiveNotConfiguredError as e:
+            raise click.ClickException(str(e))
+        print(f"Archived {summary['rowsArchived']} audit log(s) into {summary['segmentsWritten']} segment(s) before {summary['cutoff']}")
+
+    @app.cli.command("snapshot-project-metrics")
+    def snapshot_project_metrics_command():
+        """Store today's EVM and health figures per project (run daily from cron)."""
+        from .metric_snapshots import take_metric_snapshots
+        summary = take_metric_snapshots()
+        print(f"Snapshotted metrics for {summary['projectsSnapshotted']} project(s) on {summary['snapshotDate']}")
+
+    @app.cli.command("benchmark-json")
+    @click.option("--user-id", type=int, required=True, help="User the endpoints are requested as (an admin sees everything)")
+    @click.option("--project-id", type=int, required=True, help="Project used for the per-project endpoints")
+    @click.option("--repeat", type=int, default=20, show_default=True, help="Encodes per provider and endpoint")
+    def benchmark_json_command(user_id, project_id, repeat):
+        """Compare JSON encode time and gzip/brotli payload size on real endpoint payloads."""
+        from .response_layer import benchmark_endpoints
+        urls = [url.format(project_id=project_id) for url in (
+            "/api/projects/my-projects",
+            "/api/projects/{project_id}/report-data",
+            "/api/projects/{project_id}/metrics/all",
+            "/api/projects/{project_id}/audit-logs",
+            "/api/projects/{project_id}/supplies",
+            "/api/projects/supplies/catalog",
+            "/api/workorders/project/{project_id}",
+        )]
+        for row in benchmark_endpoints(app, user_id, urls, repeat):
+            if "error" in row:
+                print(f"{row['url']}: HTTP {row['status']}, {row['error']}")
+                continue
+            encode = ", ".join(f"{name} {ms} ms" for name, ms in row["encodeMs"].items())
+            sizes = ", ".join(f"{name} {size} B" for name, size in row["bytes"].items())
+            print(f"{row['url']}: HTTP {row['status']} | encode: {encode} | size: {sizes}")
 
     return app
 
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import insert, update
+
+from .models import db, User, WorkOrder, WorkOrderWorker, AuditEntityType
+from .project_versions import bump_project_versions
+
+
+def load_users_by_id(user_ids: Iterable[int]) -> Dict[int, User]:
+    """Load users for a set of IDs with a single IN query"""
+    ids = {int(uid) for uid in user_ids}
+    if not ids:
+        return {}
+    users = User.query.filter(User.id.in_(ids)).all()
+    return {u.id: u for u in users}
+
+
+def load_assignment_rows(work_order_ids: Iterable[int]) -> Dict[int, Dict[int, dict]]:
+    """Load every assignment row (active and inactive) for the given work orders in one query.
+
+    Returns a mapping of work order ID -> {user ID -> {"id", "isActive"}}.
+    """
+    ids = {int(wid) for wid in work_order_ids}
+    rows: Dict[int, Dict[int, dict]] = {wid: {} for wid in ids}
+    if not ids:
+        return rows
+
+    result = db.session.query(
+        WorkOrderWorker.id,
+        WorkOrderWorker.workOrderId,
+        WorkOrderWorker.userId,
+        WorkOrderWorker.isActive,
+    ).filter(WorkOrderWorker.workOrderId.in_(ids)).all()
+
+    for row_id, wo_id, user_id, is_active in result:
+        rows[wo_id][user_id] = {"id": row_id, "isActive": is_active}
+    return rows
+
+
+def active_worker_ids(rows: Dict[int, dict]) -> Set[int]:
+    """Return the set of active worker IDs from a work order's assignment rows"""
+    return {user_id for user_id, row in rows.items() if row["isActive"]}
+
+
+def format_worker_names(worker_ids: Iterable[int], users_by_id: Dict[int, User]) -> str:
+    """Build the audit string for a set of workers (sorted by ID, "None" when empty)"""
+    names = []
+    for wid in sorted(worker_ids):
+        w = users_by_id.get(wid)
+        if w:
+            names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
+    return ", ".join(names) if names else "None"
+
+
+def apply_worker_assignments(
+    work_orders: List[WorkOrder],
+    desired: Dict[int, Set[int]],
+    user_id: int,
+    session_id: Optional[str] = None,
+    rows: Optional[Dict[int, Dict[int, dict]]] = None,
+) -> Dict[int, dict]:
+    """Diff current and desired worker sets for many work orders and persist the changes in bulk.
+
+    Args:
+        work_orders: Work orders being changed (used for project IDs in audit logs)
+        desired: Mapping of work order ID -> set of worker IDs that should be actively assigned
+        user_id: ID of the user making the change
+        session_id: Optional audit session ID; one is generated if not provided
+        rows: Optional pre-loaded result of load_assignment_rows() to avoid reloading
+
+    Returns:
+        Mapping of changed work order ID -> {"added": [...], "removed": [...]}.
+        Work orders whose worker set did not change are omitted.
+    """
+    from .workorders import create_audit_log
+
+    if rows is None:
+        rows = load_assignment_rows(desired.keys())
+
+    now = datetime.utcnow()
+    deactivate_ids: List[int] = []
+    reactivate_ids: List[int] = []
+    inserts: List[dict] = []
+    changes: Dict[int, dict] = {}
+    name_ids: Set[int] = set()
+
+    for wo_id, wanted in desired.items():
+        wo_rows = rows.get(wo_id, {})
+        current = active_worker_ids(wo_rows)
+        added = wanted - current
+        removed = current - wanted
+        if not added and not removed:
+            continue
+
+        for wid in removed:
+            deactivate_ids.append(wo_rows[wid]["id"])
+        for wid in added:
+            if wid in wo_rows:
+                reactivate_ids.append(wo_rows[wid]["id"])
+            else:
+                inserts.append({"workOrderId": wo_id, "userId": wid, "assignedAt": now, "isActive": True})
+
+        changes[wo_id] = {
+            "old": current,
+            "new": set(wanted),
+            "added": sorted(added),
+            "removed": sorted(removed),
+        }
+        name_ids |= current | wanted
+
+    if not changes:
+        return {}
+
+    # One statement per kind of change instead of one query per worker
+    if deactivate_ids:
+        db.session.execute(
+            update(WorkOrderWorker).where(WorkOrderWorker.id.in_(deactivate_ids)).values(isActive=False)
+        )
+    if reactivate_ids:
+        db.session.execute(
+            update(WorkOrderWorker).where(WorkOrderWorker.id.in_(reactivate_ids)).values(isActive=True, assignedAt=now)
+        )
+    if inserts:
+        db.session.execute(insert(WorkOrderWorker), inserts)
+    # Core statements skip the flush hooks, so bump the versions here
+    bump_project_versions({wo.projectId for wo in work_orders if wo.id in changes})
+
+    # One audit record per changed work order, with names resolved from a single user query
+    users_by_id = load_users_by_id(name_ids)
+    session_id = session_id or str(uuid.uuid4())
+    project_ids = {wo.id: wo.projectId for wo in work_orders}
+    for wo_id, change in changes.items():
+        create_audit_log(
+            AuditEntityType.WORK_ORDER,
+            wo_id,
+            user_id,
+            "assignedWorkers",
+            format_worker_names(change["old"], users_by_id),
+            format_worker_names(change["new"], users_by_id),
+            session_id,
+            project_ids.get(wo_id)
+        )
+
+    return {wo_id: {"added": c["added"], "removed": c["removed"]} for wo_id, c in changes.items()}
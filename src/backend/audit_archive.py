@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, delete, func, select
+
+from .models import db, Audit, AuditArchiveSegment, AuditEntityType, NotificationDismissal
+from .status_analytics import refresh_all_status_analytics
+
+# Rows fetched per round trip while writing a month to disk
+ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVE_FIELDS = ("id", "entityType", "entityId", "userId", "field", "oldValue", "newValue", "sessionId", "projectId", "createdAt")
+
+
+class ArchiveNotConfiguredError(RuntimeError):
+    """AUDIT_ARCHIVE_DIR is not set, so there is no persistent place to move audit rows to"""
+
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + 1, 1, 1) if value.month == 12 else date(value.year, value.month + 1, 1)
+
+
+def archive_cutoff(now: Optional[datetime] = None, retention_days: Optional[int] = None) -> datetime:
+    """Start of the oldest month that must stay in the hot table; whole months before it are archived"""
+    now = now or datetime.utcnow()
+    if retention_days is None:
+        retention_days = current_app.config.get("AUDIT_HOT_RETENTION_DAYS", 180)
+    boundary = _month_start(now - timedelta(days=retention_days))
+    return datetime(boundary.year, boundary.month, 1)
+
+
+def _archive_root() -> Optional[str]:
+    return current_app.config.get("AUDIT_ARCHIVE_DIR") or None
+
+
+def _effective_project_id():
+    """projectId, falling back to entityId for older project-level rows written without it"""
+    return func.coalesce(Audit.projectId, case((Audit.entityType == AuditEntityType.PROJECT, Audit.entityId), else_=None))
+
+
+def _serialize(row) -> dict:
+    data = {}
+    for name in ARCHIVE_FIELDS:
+        value = getattr(row, name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, AuditEntityType):
+            value = value.value
+        data[name] = value
+    return data
+
+
+class _SegmentWriter:
+    """Writes one project's rows for one month to a temporary gzip file"""
+
+    def __init__(self, root: str, period: date, project_id: Optional[int], run_id: str):
+        self.period = period
+        self.project_id = project_id
+        project_part = f"project-{project_id}" if project_id is not None else "project-none"
+        self.rel_path = os.path.join(period.strftime("%Y-%m"), f"{project_part}-{run_id}.ndjson.gz")
+        self.path = os.path.join(root, self.rel_path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.tmp_path = self.path + ".tmp"
+        self.handle = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+        self.count = 0
+        self.min_created = self.max_created = None
+        self.min_id = self.max_id = None
+
+    def write(self, row) -> None:
+        self.handle.write(json.dumps(_serialize(row), separators=(",", ":")) + "\n")
+        self.count += 1
+        if self.min_created is None or row.createdAt < self.min_created:
+            self.min_created = row.createdAt
+        if self.max_created is None or row.createdAt > self.max_created:
+            self.max_created = row.createdAt
+        self.min_id = row.id if self.min_id is None else min(self.min_id, row.id)
+        self.max_id = row.id if self.max_id is None else max(self.max_id, row.id)
+
+    def close(self) -> None:
+        self.handle.close()
+
+    def segment(self) -> AuditArchiveSegment:
+        return AuditArchiveSegment(
+            projectId=self.project_id,
+            periodStart=self.period,
+            path=self.rel_path,
+            rowCount=self.count,
+            minCreatedAt=self.min_created,
+            maxCreatedAt=self.max_created,
+            minAuditId=self.min_id,
+            maxAuditId=self.max_id,
+        )
+
+
+def _archive_month(root: str, month: date, cutoff: datetime, run_id: str) -> Tuple[int, int]:
+    """Move one calendar month of audit rows to disk. Returns (rows archived, segments written)."""
+    start = datetime(month.year, month.month, 1)
+    end = min(datetime(_next_month(month).year, _next_month(month).month, 1), cutoff)
+    project_key = _effective_project_id().label("archiveProjectId")
+
+    rows = (
+        db.session.query(*[getattr(Audit, name) for name in ARCHIVE_FIELDS], project_key)
+        .filter(Audit.createdAt >= start, Audit.createdAt < end)
+        .order_by(project_key, Audit.createdAt, Audit.id)
+        .yield_per(ARCHIVE_BATCH_SIZE)
+    )
+
+    writers: List[_SegmentWriter] = []
+    current: Optional[_SegmentWriter] = None
+    max_id = None
+    try:
+        for row in rows:
+            if current is None or current.project_id != row.archiveProjectId:
+                if current is not None:
+                    current.close()
+                current = _SegmentWriter(root, month, row.archiveProjectId, run_id)
+                writers.append(current)
+            current.write(row)
+            max_id = row.id if max_id is None else max(max_id, row.id)
+        if current is not None:
+            current.close()
+
+        if not writers:
+            return 0, 0
+
+        # Files are complete; publish them, record the manifest and drop the hot rows together
+        for writer in writers:
+            os.replace(writer.tmp_path, writer.path)
+        db.session.add_all([writer.segment() for writer in writers])
+
+        archived = and_(Audit.createdAt >= start, Audit.createdAt < end, Audit.id <= max_id)
+        db.session.execute(
+            delete(NotificationDismissal).where(NotificationDismissal.auditLogId.in_(select(Audit.id).where(archived)))
+        )
+        db.session.execute(delete(Audit).where(archived))
+        db.session.commit()
+        return sum(w.count for w in writers), len(writers)
+    except Exception:
+        db.session.rollback()
+        for writer in writers:
+            writer.close()
+            for path in (writer.tmp_path, writer.path):
+                if os.path.exists(path):
+                    os.remove(path)
+        raise
+
+
+def archive_audit_logs(cutoff: Optional[datetime] = None) -> dict:
+    """Move every whole month of audit rows older than the cutoff into gzip'd NDJSON segments.
+
+    Each month is written, recorded in audit_archive_segments and deleted from audit_logs
+    in its own transaction, so an interrupted run can simply be re-run.
+    """
+    root = _archive_root()
+    if root is None:
+        raise ArchiveNotConfiguredError(
+            "AUDIT_ARCHIVE_DIR is not set; point it at persistent storage before archiving audit logs"
+        )
+    cutoff = cutoff or archive_cutoff()
+
+    # Status analytics replay from the hot table, so fold in any pending transitions first
+    refresh_all_status_analytics()
+    run_id = uuid.uuid4().hex[:12]
+
+    oldest = db.session.query(func.min(Audit.createdAt)).filter(Audit.createdAt < cutoff).scalar()
+    summary = {"cutoff": cutoff.isoformat(), "rowsArchived": 0, "segmentsWritten": 0, "months": []}
+    if oldest is None:
+        return summary
+
+    month = _month_start(oldest)
+    while datetime(month.year, month.month, 1) < cutoff:
+        count, segments = _archive_month(root, month, cutoff, run_id)
+        if count:
+            summary["rowsArchived"] += count
+            summary["segmentsWritten"] += segments
+            summary["months"].append({"month": month.strftime("%Y-%m"), "rows": count, "segments": segments})
+        month = _next_month(month)
+    return summary
+
+
+def _read_segment(root: Optional[str], segment: AuditArchiveSegment) -> Optional[List[dict]]:
+    """The segment's rows, or None if its file is gone (or the archive directory is not configured)"""
+    if root is None:
+        current_app.logger.error(f"Audit archive segment {segment.path} unreadable: AUDIT_ARCHIVE_DIR is not set")
+        return None
+    path = os.path.join(root, segment.path)
+    if not os.path.exists(path):
+        current_app.logger.error(f"Audit archive segment missing: {path}")
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def load_archived_audits(
+    project_id: int,
+    limit: int,
+    entity_types: Optional[List[AuditEntityType]] = None,
+    fields: Optional[List[str]] = None,
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+) -> Tuple[List[dict], bool]:
+    """Read archived rows for a project, newest first, with the same filters as the hot query.
+
+    Only segments whose time range can match are opened, and reading stops once a whole
+    month has produced enough rows. Returns (rows, incomplete); incomplete is True when a
+    segment that could hold matching rows has no file, so the caller can say history is missing.
+    """
+    query = AuditArchiveSegment.query.filter(AuditArchiveSegment.projectId == project_id)
+    if since:
+        query = query.filter(AuditArchiveSegment.maxCreatedAt >= since)
+    if until:
+        query = query.filter(AuditArchiveSegment.minCreatedAt <= until)
+    if before:
+        query = query.filter(AuditArchiveSegment.minCreatedAt <= before[0])
+    segments = query.order_by(AuditArchiveSegment.periodStart.desc(), AuditArchiveSegment.id).all()
+
+    type_values = {t.value for t in entity_types} if entity_types else None
+    field_set = set(fields) if fields else None
+
+    def matches(row: dict) -> bool:
+        created_at = row["_createdAt"]
+        if type_values and row["entityType"] not in type_values:
+            return False
+        if field_set and row["field"] not in field_set:
+            return False
+        if user_id is not None and row["userId"] != user_id:
+            return False
+        if since and created_at < since:
+            return False
+        if until and created_at > until:
+            return False
+        if before and (created_at, row["id"]) >= before:
+            return False
+        return True
+
+    root = _archive_root()
+    incomplete = False
+    results: List[dict] = []
+    by_period: Dict[date, List[AuditArchiveSegment]] = {}
+    for segment in segments:
+        by_period.setdefault(segment.periodStart, []).append(segment)
+
+    # Months are disjoint, so each month can be sorted on its own
+    for period in sorted(by_period, reverse=True):
+        month_rows = []
+        for segment in by_period[period]:
+            rows = _read_segment(root, segment)
+            if rows is None:
+                incomplete = True
+                continue
+            for row in rows:
+                row["_createdAt"] = datetime.fromisoformat(row["createdAt"])
+                if matches(row):
+                    month_rows.append(row)
+        month_rows.sort(key=lambda r: (r["_createdAt"], r["id"]), reverse=True)
+        results.extend(month_rows)
+        if len(results) >= limit:
+            break
+
+    for row in results:
+        row.pop("_createdAt", None)
+    return results[:limit], incomplete
+
+
+def archived_audit_to_dict(row: dict, users_by_id: dict, work_orders: dict, supplies: dict) -> dict:
+    """Shape an archived row like Audit.to_dict, using pre-loaded users, work orders and supplies"""
+    user = users_by_id.get(row["userId"])
+    result = {
+        "id": row["id"],
+        "entityType": row["entityType"],
+        "entityId": row["entityId"],
+        "userId": row["userId"],
+        "user": user.to_dict() if user else None,
+        "field": row["field"],
+        "oldValue": row["oldValue"],
+        "newValue": row["newValue"],
+        "sessionId": row["sessionId"],
+        "projectId": row["projectId"],
+        "createdAt": row["createdAt"],
+        "archived": True,
+    }
+    if row["entityType"] == AuditEntityType.WORK_ORDER.value and row["entityId"] in work_orders:
+        result["workOrderName"] = work_orders[row["entityId"]].name
+    elif row["entityType"] == AuditEntityType.SUPPLY.value and row["entityId"] in supplies:
+        result["supplyName"] = supplies[row["entityId"]].name
+    return result
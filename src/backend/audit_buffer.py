@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from flask import Flask
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from .models import db, Audit, AuditEntityType, Project, WorkOrder
+from .prometheus_metrics import notification_queue, record_notification_fanout
+
+# Keys in Session.info used to hold this unit of work's pending audit rows and notifications
+_BUFFER_KEY = "audit_buffer"
+_NOTIFY_KEY = "audit_notifications"
+
+
+def record_audit(
+    entity_type: AuditEntityType,
+    entity_id: int,
+    user_id: int,
+    field: str,
+    old_value: Optional[str],
+    new_value: Optional[str],
+    session_id: Optional[str] = None,
+    project_id: Optional[int] = None,
+    notify: bool = False,
+    entity_name: Optional[str] = None,
+) -> None:
+    """Queue an audit row on the current session.
+
+    Rows are written with one bulk insert when the session commits and discarded on rollback.
+    If notify is set, the change is also handed to the notification layer after the commit,
+    together with every other notifiable change from the same unit of work.
+    """
+    db.session.info.setdefault(_BUFFER_KEY, []).append({
+        "entityType": entity_type,
+        "entityId": entity_id,
+        "userId": user_id,
+        "field": field,
+        "oldValue": old_value,
+        "newValue": new_value,
+        "sessionId": session_id,
+        "projectId": project_id,
+        # Stamp the time of the change, not the time of the commit
+        "createdAt": datetime.utcnow(),
+        "_notify": notify,
+        "_entityName": entity_name,
+    })
+
+
+def pending_audit_count() -> int:
+    """Number of audit rows waiting for the current session to commit"""
+    return len(db.session.info.get(_BUFFER_KEY, []))
+
+
+def _flush_audit_buffer(session: Session) -> None:
+    buffered = session.info.pop(_BUFFER_KEY, None)
+    if not buffered:
+        return
+    # render_nulls keeps rows with and without None values in a single executemany batch
+    session.execute(
+        insert(Audit).execution_options(render_nulls=True),
+        [{k: v for k, v in row.items() if not k.startswith("_")} for row in buffered],
+    )
+    notifiable = [row for row in buffered if row["_notify"] and row["projectId"]]
+    if notifiable:
+        session.info.setdefault(_NOTIFY_KEY, []).extend(notifiable)
+
+
+def _discard_audit_buffer(session: Session, *args) -> None:
+    # Notifications already queued belong to an earlier, committed transaction and are kept
+    session.info.pop(_BUFFER_KEY, None)
+
+
+def dispatch_audit_notifications() -> int:
+    """Send one consolidated notification set for everything committed in this unit of work.
+
+    Runs in an after_request hook, once the handler has committed, so email delivery never
+    holds a transaction open. The sends are synchronous: they still delay the response by the
+    time SMTP takes. Returns the number of emails sent.
+    """
+    pending = db.session.info.pop(_NOTIFY_KEY, None)
+    if not pending:
+        return 0
+
+    from .notification_service import notify_project_managers_of_changes
+
+    # Resolve display names with one query per entity type instead of one per change
+    work_order_ids = {row["entityId"] for row in pending if row["entityType"] == AuditEntityType.WORK_ORDER and not row["_entityName"]}
+    project_ids = {row["projectId"] for row in pending if row["entityType"] == AuditEntityType.PROJECT and not row["_entityName"]}
+    work_order_names = dict(db.session.query(WorkOrder.id, WorkOrder.name).filter(WorkOrder.id.in_(work_order_ids)).all()) if work_order_ids else {}
+    project_names = dict(db.session.query(Project.id, Project.name).filter(Project.id.in_(project_ids)).all()) if project_ids else {}
+
+    sent = 0
+    by_user = {}
+    for row in pending:
+        by_user.setdefault(row["userId"], []).append(row)
+
+    with notification_queue(len(pending)):
+        for user_id, rows in by_user.items():
+            if user_id is None:
+                continue
+            changes: List[dict] = []
+            for row in rows:
+                name = row["_entityName"]
+                if not name:
+                    if row["entityType"] == AuditEntityType.WORK_ORDER:
+                        name = work_order_names.get(row["entityId"])
+                    elif row["entityType"] == AuditEntityType.PROJECT:
+                        name = project_names.get(row["projectId"])
+                changes.append({
+                    "entity_type": row["entityType"],
+                    "project_id": row["projectId"],
+                    "field": row["field"],
+                    "old_value": row["oldValue"],
+                    "new_value": row["newValue"],
+                    "entity_name": name,
+                })
+            try:
+                sent += notify_project_managers_of_changes(changes, int(user_id))
+            except Exception as e:
+                # Notifications are best effort; the audit rows are already committed
+                import traceback
+                print(f"Failed to send notifications for audit logs: {str(e)}")
+                print(traceback.format_exc())
+    record_notification_fanout(sent)
+    return sent
+
+
+def init_audit_buffer(app: Flask) -> None:
+    """Hook the buffer into session commit/rollback and request completion"""
+    if not event.contains(Session, "before_commit", _flush_audit_buffer):
+        event.listen(Session, "before_commit", _flush_audit_buffer)
+        event.listen(Session, "after_rollback", _discard_audit_buffer)
+        event.listen(Session, "after_soft_rollback", _discard_audit_buffer)
+
+    @app.after_request
+    def _send_audit_notifications(response):
+        dispatch_audit_notifications()
+        return response
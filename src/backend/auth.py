@@ -5,6 +5,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 
 from .models import db, User, UserRole, WorkerType, ProjectInvitation, ProjectMember, ProjectManager, PasswordReset
+from .pagination import parse_limit, encode_cursor, decode_cursor
+from .user_directory import DEFAULT_DIRECTORY_LIMIT, MAX_DIRECTORY_LIMIT, get_user_directory, project_user_ids
 from .email_service import validate_invitation_token, accept_invitation, create_password_reset_token, send_password_reset_email, validate_password_reset_token
 from google.cloud import storage
 import uuid
@@ -253,6 +255,61 @@ def get_all_users():
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve workers: {str(e)}"}), 500
 
+@auth_bp.get("/directory")
+@jwt_required()
+def get_user_directory_page():
+    """
+    Search and page through users for pickers, returning a compact projection.
+    Example request: GET /api/auth/directory?q=jo%20sm&role=worker&projectId=3&limit=25
+    Query params: q (prefix of first name, last name or email; every word must match), role, workerType,
+    projectId (members and managers only), includeInactive (admins only), limit (max 100), cursor.
+    Requires Authorization header with Bearer token.
+    """
+    try:
+        try:
+            limit = parse_limit(request.args.get("limit"), DEFAULT_DIRECTORY_LIMIT, MAX_DIRECTORY_LIMIT)
+            after = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+            # The cursor is a (lastName, firstName, id) sort key; anything else cannot be compared with one
+            if after is not None and not (
+                len(after) == 3 and isinstance(after[0], str) and isinstance(after[1], str)
+                and isinstance(after[2], int) and not isinstance(after[2], bool)
+            ):
+                raise ValueError("Invalid cursor")
+            project_id = int(request.args["projectId"]) if request.args.get("projectId") else None
+        except ValueError:
+            return jsonify({"error": "limit and projectId must be numbers and cursor must come from a previous page"}), 400
+
+        role = request.args.get("role")
+        if role and role not in {r.value for r in UserRole}:
+            return jsonify({"error": "Invalid role"}), 400
+        worker_type = request.args.get("workerType")
+        if worker_type and worker_type not in {t.value for t in WorkerType}:
+            return jsonify({"error": "Invalid workerType"}), 400
+
+        include_inactive = request.args.get("includeInactive", "").lower() == "true"
+        if include_inactive:
+            current = User.query.filter_by(id=int(get_jwt_identity())).first()
+            if not current or current.role != UserRole.ADMIN:
+                return jsonify({"error": "Only admins can list inactive users"}), 403
+
+        users, last_key = get_user_directory().search(
+            query=request.args.get("q"),
+            role=role,
+            worker_type=worker_type,
+            user_ids=project_user_ids(project_id) if project_id is not None else None,
+            include_inactive=include_inactive,
+            after=after,
+            limit=limit,
+        )
+        return jsonify({
+            "users": users,
+            "nextCursor": encode_cursor(*last_key) if last_key else None,
+            "limit": limit,
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to search users: {str(e)}"}), 500
+
 @auth_bp.post("/forgot-password")
 def forgot_password():
     """Request a password reset - sends email with reset link"""
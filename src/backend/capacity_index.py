@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import random
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+from .models import db, ProjectVersion, WorkOrder, WorkOrderStatus, WorkOrderWorker
+from .prometheus_metrics import record_cache
+
+# Work orders that still occupy their assigned workers
+BOOKING_STATUSES = (WorkOrderStatus.PENDING, WorkOrderStatus.IN_PROGRESS)
+
+# Concurrent work orders a worker can carry before they count as overallocated
+DEFAULT_WORKER_CAPACITY = 1
+
+# Rebuild from the database at least this often, in case another process changed assignments
+_rebuild_after = timedelta(minutes=10)
+
+# Compare the project version counters with the index's at most this often
+_check_after = timedelta(seconds=5)
+
+
+class _Node:
+    __slots__ = ("key", "start", "end", "max_end", "priority", "left", "right")
+
+    def __init__(self, key: tuple, start: int, end: int):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.max_end = end
+        self.priority = random.random()
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+
+
+def _update(node: _Node) -> _Node:
+    node.max_end = max(node.end,
+                       node.left.max_end if node.left else node.end,
+                       node.right.max_end if node.right else node.end)
+    return node
+
+
+def _split(node: Optional[_Node], key: tuple) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into (< key, >= key) by (start, key)"""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key)
+    node.left = right
+    return left, _update(node)
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+class IntervalTree:
+    """Treap of closed [start, end] intervals ordered by start and augmented with the subtree's max end.
+
+    Insert and delete are O(log n) expected; an overlap query is O(log n + k) for k matches.
+    """
+
+    def __init__(self):
+        self.root: Optional[_Node] = None
+        self.size = 0
+
+    def insert(self, key: tuple, start: int, end: int) -> None:
+        left, right = _split(self.root, (start, key))
+        self.root = _merge(_merge(left, _Node(key, start, end)), right)
+        self.size += 1
+
+    def remove(self, key: tuple, start: int) -> None:
+        left, rest = _split(self.root, (start, key))
+        # key + (0,) sorts right after key, so the middle piece holds only this interval
+        match, right = _split(rest, (start, key + (0,)))
+        if match is not None:
+            self.size -= 1
+        self.root = _merge(left, right)
+
+    def overlapping(self, start: int, end: int) -> List[_Node]:
+        """Every interval that shares at least one day with [start, end]"""
+        found, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end < start:
+                continue
+            stack.append(node.left)
+            if node.start <= end:
+                if node.end >= start:
+                    found.append(node)
+                stack.append(node.right)
+        return found
+
+
+def peak_concurrency(intervals: Iterable[Tuple[int, int]]) -> Tuple[int, Optional[int]]:
+    """Sweep line over closed day intervals: (most overlapping at once, first day it happens)"""
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end + 1, -1))
+    # Ends (-1) sort before starts on the same day because the interval closed the day before
+    events.sort()
+    peak, peak_day, current = 0, None, 0
+    for day, delta in events:
+        current += delta
+        if current > peak:
+            peak, peak_day = current, day
+    return peak, peak_day
+
+
+class CapacityIndex:
+    """Active assignments per worker with their work order date ranges, across all projects"""
+
+    def __init__(self):
+        self._reset()
+        self.fingerprint = None
+        self.built_at: Optional[datetime] = None
+        self.checked_at: Optional[datetime] = None
+        # Held while refresh_work_orders edits the tree and while readers walk it
+        self.lock = threading.RLock()
+
+    def _reset(self) -> None:
+        self.tree = IntervalTree()
+        self.assignments: Dict[tuple, dict] = {}  # (workOrderId, userId) -> interval details
+        self.by_work_order: Dict[int, Set[tuple]] = {}
+        self.by_worker: Dict[int, Set[tuple]] = {}
+
+    def _add(self, wo_id: int, user_id: int, project_id: int, start: date, end: date) -> None:
+        key = (wo_id, user_id)
+        start_day, end_day = start.toordinal(), max(end, start).toordinal()
+        self.tree.insert(key, start_day, end_day)
+        self.assignments[key] = {"workOrderId": wo_id, "userId": user_id, "projectId": project_id,
+                                 "start": start_day, "end": end_day}
+        self.by_work_order.setdefault(wo_id, set()).add(key)
+        self.by_worker.setdefault(user_id, set()).add(key)
+
+    def _drop_work_order(self, wo_id: int) -> None:
+        for key in self.by_work_order.pop(wo_id, set()):
+            entry = self.assignments.pop(key)
+            self.tree.remove(key, entry["start"])
+            worker_keys = self.by_worker.get(entry["userId"])
+            if worker_keys is not None:
+                worker_keys.discard(key)
+                if not worker_keys:
+                    del self.by_worker[entry["userId"]]
+
+    def _load(self, work_order_ids: Optional[Set[int]] = None) -> None:
+        query = db.session.query(
+            WorkOrderWorker.workOrderId, WorkOrderWorker.userId, WorkOrder.projectId, WorkOrder.startDate, WorkOrder.endDate
+        ).join(WorkOrder, WorkOrder.id == WorkOrderWorker.workOrderId).filter(
+            WorkOrderWorker.isActive == True,
+            WorkOrder.isActive == True,
+            WorkOrder.status.in_(BOOKING_STATUSES),
+        )
+        if work_order_ids is not None:
+            query = query.filter(WorkOrderWorker.workOrderId.in_(work_order_ids))
+        for wo_id, user_id, project_id, start, end in query.all():
+            self._add(wo_id, user_id, project_id, start, end)
+
+    @classmethod
+    def build(cls) -> "CapacityIndex":
+        """A new index loaded from the database, not yet visible to other threads"""
+        index = cls()
+        # Taken before loading, so a write that commits mid-load shows up as a changed fingerprint
+        index.fingerprint = _assignment_fingerprint()
+        index._load()
+        index.built_at = index.checked_at = datetime.now()
+        return index
+
+    def refresh_work_orders(self, work_order_ids: Iterable[int]) -> None:
+        """Reload just these work orders' assignments after their workers, dates or status changed.
+
+        The fingerprint is left alone: re-reading it here would also absorb writes other worker
+        processes committed meanwhile, hiding them until the periodic rebuild. The next freshness
+        check sees the change and rebuilds instead.
+        """
+        ids = {int(wid) for wid in work_order_ids}
+        if not ids:
+            return
+        with self.lock:
+            for wo_id in ids:
+                self._drop_work_order(wo_id)
+            self._load(ids)
+
+    def busy_workers(self, start: date, end: date) -> Dict[int, List[dict]]:
+        """Worker ID -> assignments overlapping [start, end]"""
+        busy: Dict[int, List[dict]] = {}
+        with self.lock:
+            for node in self.tree.overlapping(start.toordinal(), end.toordinal()):
+                entry = self.assignments[node.key]
+                busy.setdefault(entry["userId"], []).append(entry)
+        return busy
+
+    def overallocated(self, start: date, end: date, capacity: int = DEFAULT_WORKER_CAPACITY) -> List[dict]:
+        """Workers with more than `capacity` work orders overlapping on some day in [start, end]"""
+        lo, hi = start.toordinal(), end.toordinal()
+        result = []
+        for user_id, entries in self.busy_workers(start, end).items():
+            if len(entries) <= capacity:
+                continue
+            peak, peak_day = peak_concurrency((max(e["start"], lo), min(e["end"], hi)) for e in entries)
+            if peak > capacity:
+                result.append({
+                    "userId": user_id,
+                    "peakConcurrent": peak,
+                    "firstOverallocatedDate": date.fromordinal(peak_day).isoformat(),
+                    "projectIds": sorted({e["projectId"] for e in entries}),
+                    "workOrders": [_entry_dict(e) for e in sorted(entries, key=lambda e: (e["start"], e["workOrderId"]))],
+                })
+        return sorted(result, key=lambda r: (-r["peakConcurrent"], r["userId"]))
+
+
+def _entry_dict(entry: dict) -> dict:
+    return {
+        "workOrderId": entry["workOrderId"],
+        "projectId": entry["projectId"],
+        "startDate": date.fromordinal(entry["start"]).isoformat(),
+        "endDate": date.fromordinal(entry["end"]).isoformat(),
+    }
+
+
+def _assignment_fingerprint() -> tuple:
+    """Changes whenever a project's data is written, which covers every assignment and work order edit.
+
+    Reads the per-project version counters (one small row per project) rather than aggregating
+    the assignment and work order tables.
+    """
+    return tuple(db.session.query(
+        func.count(ProjectVersion.projectId), func.sum(ProjectVersion.version), func.max(ProjectVersion.updatedAt)
+    ).one())
+
+
+_index = CapacityIndex()
+_rebuild_lock = threading.Lock()
+
+
+def _is_stale(index: CapacityIndex) -> bool:
+    now = datetime.now()
+    if index.built_at is None or now - index.built_at > _rebuild_after:
+        return True
+    with index.lock:
+        if now - index.checked_at < _check_after:
+            return False
+        index.checked_at = now
+    return index.fingerprint != _assignment_fingerprint()
+
+
+def get_capacity_index() -> CapacityIndex:
+    """The process-wide index, rebuilt if the database moved on without it (e.g. another worker process)"""
+    global _index
+    current = _index
+    stale = _is_stale(current)
+    record_cache("capacity_index", not stale)
+    if stale:
+        with _rebuild_lock:
+            # Skip the rebuild if another thread published a new index while this one waited
+            if _index is current:
+                # Built on the side and published in one assignment, so readers never see a half-loaded tree
+                _index = CapacityIndex.build()
+    return _index
+
+
+def refresh_capacity(work_order_ids: Iterable[int]) -> None:
+    """Apply committed assignment or work order changes to the index incrementally"""
+    index = _index
+    if index.built_at is not None:
+        index.refresh_work_orders(work_order_ids)
+
+
+def assignment_conflicts(work_order_ids: Iterable[int], capacity: int = DEFAULT_WORKER_CAPACITY) -> List[dict]:
+    """Workers on these work orders who are booked above capacity during them"""
+    index = get_capacity_index()
+    conflicts = []
+    with index.lock:
+        for wo_id in sorted({int(w) for w in work_order_ids}):
+            for key in sorted(index.by_work_order.get(wo_id, ())):
+                entry = index.assignments[key]
+                window = (date.fromordinal(entry["start"]), date.fromordinal(entry["end"]))
+                overlapping = [e for e in index.busy_workers(*window).get(entry["userId"], []) if e["workOrderId"] != wo_id]
+                if len(overlapping) + 1 > capacity:
+                    conflicts.append({
+                        "workOrderId": wo_id,
+                        "userId": entry["userId"],
+                        "overlapping": [_entry_dict(e) for e in sorted(overlapping, key=lambda e: (e["start"], e["workOrderId"]))],
+                    })
+    return conflicts
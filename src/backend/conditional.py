@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func, select
+
+from .models import db, User, ProjectVersion, ProjectMember, WorkOrder, WorkOrderWorker
+
+# (fingerprint, last modified) for the data behind a response
+Validators = Tuple[tuple, Optional[datetime]]
+
+
+def _table_state(model, stamp_column, *criteria) -> list:
+    """count and max(stamp) of the matching rows, as scalar subqueries: edits bump the stamp, inserts the count"""
+    columns = [func.count(model.id), func.max(stamp_column)]
+    return [select(column).where(*criteria).scalar_subquery() for column in columns]
+
+
+def _collect(subqueries: list) -> Validators:
+    """Evaluate every subquery in one round trip"""
+    values = tuple(db.session.execute(select(*subqueries)).one())
+    stamps = [v for v in values if isinstance(v, datetime)]
+    return values, max(stamps) if stamps else None
+
+
+def _project_state(project_id: int) -> list:
+    """The project's version counter covers its work orders, crew and supplies; users are shared"""
+    this_project = ProjectVersion.projectId == project_id
+    return (
+        [select(ProjectVersion.version).where(this_project).scalar_subquery(),
+         select(ProjectVersion.updatedAt).where(this_project).scalar_subquery()]
+        # Nested user dicts (managers, requesters) change with any user edit
+        + _table_state(User, User.updatedAt)
+    )
+
+
+def project_validators(user_id: int, project_id: int, **_) -> Validators:
+    return _collect(_project_state(project_id))
+
+
+def project_metrics_validators(user_id: int, project_id: int, **_) -> Validators:
+    """Metrics also move with the calendar (days elapsed, overdue work orders) and with the members' bookings elsewhere.
+
+    Workforce overallocation counts every project a member is booked on, so the versions of those
+    projects are part of the tag: a booking added, moved or finished there bumps its project's version.
+    """
+    members = select(ProjectMember.userId).where(ProjectMember.projectId == project_id, ProjectMember.isActive == True)
+    booked_projects = select(WorkOrder.projectId).join(WorkOrderWorker, WorkOrderWorker.workOrderId == WorkOrder.id).where(
+        WorkOrderWorker.userId.in_(members)
+    )
+    other_projects = ProjectVersion.projectId.in_(booked_projects)
+    fingerprint, last_modified = _collect(
+        _project_state(project_id)
+        + [select(func.count(ProjectVersion.projectId)).where(other_projects).scalar_subquery(),
+           select(func.sum(ProjectVersion.version)).where(other_projects).scalar_subquery(),
+           select(func.max(ProjectVersion.updatedAt)).where(other_projects).scalar_subquery()]
+    )
+    return fingerprint + (date.today(),), last_modified
+
+
+def user_projects_validators(user_id: int, **_) -> Validators:
+    """The projects list a user sees: any write to any project (memberships and invitations included) bumps the sum"""
+    return _collect(
+        [select(func.sum(ProjectVersion.version)).scalar_subquery(),
+         select(func.max(ProjectVersion.updatedAt)).scalar_subquery()]
+        + _table_state(User, User.updatedAt)
+    )
+
+
+def _weak_etag(user_id, fingerprint: tuple) -> str:
+    # Responses differ per user (access, role) and per query string (fields=, workOrderId=, ...)
+    raw = repr((user_id, request.path, sorted(request.args.items(multi=True)), fingerprint))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(validators: Callable[..., Validators]):
+    """Answer conditional GETs with 304 before the view runs, and tag 200s with ETag/Last-Modified.
+
+    validators(user_id, **view_kwargs) must change whenever the response body could. Use under
+    @jwt_required() so the caller's identity is part of the tag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_jwt_identity()
+            fingerprint, last_modified = validators(int(user_id), **kwargs)
+            etag = _weak_etag(user_id, fingerprint)
+
+            # Only If-None-Match is honoured: Last-Modified has one-second resolution, so two writes
+            # in the same second would look unchanged
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Per-user data: browsers may keep it but must revalidate on every use
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add("Authorization")
+            return response
+        return wrapper
+    return decorator
@@ -33,10 +33,42 @@ class Config:
     MAIL_USERNAME = os.getenv("MAIL_USERNAME", "")
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "")
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER", "noreply@projectmanagement.com")
+    # Flask-Mail suppresses sending under TESTING; set to true to also suppress it for a load test server
+    if os.getenv("MAIL_SUPPRESS_SEND"):
+        MAIL_SUPPRESS_SEND = os.getenv("MAIL_SUPPRESS_SEND").lower() in ["true", "on", "1"]
     
     # Application URL for invitation links
     APP_URL = os.getenv("APP_URL", "http://localhost:3000")
 
+    # Audit log archival: rows older than the retention window move to gzip'd NDJSON files. The archive
+    # deletes the hot rows, so AUDIT_ARCHIVE_DIR must be persistent storage (a mounted volume, not the
+    # app tree); archiving refuses to run until it is set
+    AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "")
+    AUDIT_HOT_RETENTION_DAYS = int(os.getenv("AUDIT_HOT_RETENTION_DAYS", "180"))
+
+    # What-if forecasting: worker processes used when a request carries several scenarios (0 or 1 = inline).
+    # Off by default; set it to 2-4 on hosts with spare cores, and keep workers x FORECAST_WORKERS under the core count
+    FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "0"))
+
+    # Response layer: JSON encoder (orjson | stdlib) and gzip/brotli for bodies above COMPRESS_MIN_SIZE bytes
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+    COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "true").lower() in ["true", "on", "1"]
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+    # Per-request instrumentation: Server-Timing headers (on outside production) and a warning with the
+    # slowest statements when a request runs more than QUERY_BUDGET statements (0 = no budget)
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in ["true", "on", "1"]
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "false" if os.getenv("ENV") == "production" else "true").lower() in ["true", "on", "1"]
+    QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "50"))
+    SLOW_STATEMENT_LIMIT = int(os.getenv("SLOW_STATEMENT_LIMIT", "3"))
+
+    # Prometheus exposition at /metrics; set METRICS_TOKEN to require it as a bearer token from the scraper.
+    # Under gunicorn also set PROMETHEUS_MULTIPROC_DIR (see gunicorn_conf.py)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ["true", "on", "1"]
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
     # Optional: avoid stale connections on restarts
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_pre_ping": True,
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from .models import db, Project, WorkOrder, WorkOrderStatus
+from .project_versions import get_project_version
+from .prometheus_metrics import record_cache
+from .progress import (
+    blend_health_score, compute_risk_indicators, compute_schedule_variance, rollup_work_orders, summarize_progress, to_decimal
+)
+
+MAX_SCENARIOS = 50
+MAX_CHANGES_PER_SCENARIO = 1000
+
+# Below this many scenarios the pool's pickling overhead outweighs the parallelism
+PARALLEL_THRESHOLD = 4
+
+PROJECT_FIELDS = ("id", "status", "startDate", "endDate", "actualStartDate", "actualEndDate", "actualCost")
+WORK_ORDER_FIELDS = ("id", "status", "startDate", "endDate", "estimatedBudget", "actualCost")
+EDITABLE_WORK_ORDER_FIELDS = ("status", "startDate", "endDate", "estimatedBudget", "actualCost")
+EDITABLE_PROJECT_FIELDS = ("startDate", "endDate")
+
+# Simple in-memory cache of base snapshots, invalidated when the project or its work orders change
+_base_cache = {}
+_cache_ttl = timedelta(minutes=10)
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def project_state_version(project_id: int) -> tuple:
+    """Cheap fingerprint of the project's state: one primary key read of its version counter"""
+    return (get_project_version(project_id),)
+
+
+def load_base_snapshot(project_id: int) -> Tuple[Dict[str, Any], bool]:
+    """Plain in-memory copy of the project and its work orders, plus whether it came from the cache"""
+    version = project_state_version(project_id)
+    entry = _base_cache.get(project_id)
+    hit = bool(entry and entry["version"] == version and datetime.now() - entry["timestamp"] < _cache_ttl)
+    record_cache("forecast_base", hit)
+    if hit:
+        return entry["snapshot"], True
+
+    project = db.session.query(*[getattr(Project, f) for f in PROJECT_FIELDS]).filter(Project.id == project_id).one()
+    work_orders = db.session.query(*[getattr(WorkOrder, f) for f in WORK_ORDER_FIELDS]).filter(
+        WorkOrder.projectId == project_id
+    ).order_by(WorkOrder.id).all()
+
+    snapshot = {
+        "project": SimpleNamespace(**dict(zip(PROJECT_FIELDS, project))),
+        "workOrders": [SimpleNamespace(**dict(zip(WORK_ORDER_FIELDS, row))) for row in work_orders],
+    }
+    _base_cache[project_id] = {"version": version, "snapshot": snapshot, "timestamp": datetime.now()}
+    return snapshot, False
+
+
+def _parse_value(field: str, value):
+    if field == "status":
+        try:
+            return WorkOrderStatus(str(value).lower())
+        except ValueError:
+            raise ValueError("Invalid status. Must be pending, in_progress, on_hold, completed, or cancelled")
+    if field in ("startDate", "endDate"):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {field}. Use YYYY-MM-DD")
+    if value is None or value == "":
+        return None
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"{field} must be a number")
+    if not amount.is_finite():
+        raise ValueError(f"{field} must be a number")
+    if amount < 0:
+        raise ValueError(f"{field} must be positive")
+    return amount
+
+
+def _check_dates(label: str, current, changes: dict) -> None:
+    """Reject date changes that leave startDate after endDate, taking the unchanged date from current"""
+    if "startDate" not in changes and "endDate" not in changes:
+        return
+    start = changes.get("startDate", current.startDate)
+    end = changes.get("endDate", current.endDate)
+    if start and end and start > end:
+        raise ValueError(f"{label} startDate must be on or before endDate")
+
+
+def parse_scenarios(base: Dict[str, Any], scenarios: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Validate scenario payloads against the base snapshot.
+
+    Returns (parsed scenarios, errors); each error is {scenario, error}.
+    """
+    base_work_orders = {wo.id: wo for wo in base["workOrders"]}
+    parsed, errors = [], []
+    for index, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            errors.append({"scenario": index, "error": "Each scenario must be an object"})
+            continue
+        changes = scenario.get("workOrders") or []
+        if not isinstance(changes, list) or len(changes) > MAX_CHANGES_PER_SCENARIO:
+            errors.append({"scenario": index, "error": f"workOrders must be a list of at most {MAX_CHANGES_PER_SCENARIO} changes"})
+            continue
+        try:
+            work_order_changes = {}
+            for change in changes:
+                wo_id = int(change.get("id"))
+                if wo_id not in base_work_orders:
+                    raise ValueError(f"Work order {wo_id} is not in this project")
+                fields = {f: _parse_value(f, change[f]) for f in EDITABLE_WORK_ORDER_FIELDS if f in change}
+                if fields.get("status") is None and "status" in fields:
+                    raise ValueError("status cannot be empty")
+                work_order_changes.setdefault(wo_id, {}).update(fields)
+            project_changes = {
+                f: _parse_value(f, value) for f, value in (scenario.get("project") or {}).items() if f in EDITABLE_PROJECT_FIELDS
+            }
+            for wo_id, fields in work_order_changes.items():
+                _check_dates(f"Work order {wo_id}", base_work_orders[wo_id], fields)
+            _check_dates("Project", base["project"], project_changes)
+        except (AttributeError, TypeError, ValueError, InvalidOperation) as e:
+            errors.append({"scenario": index, "error": str(e) or "Invalid value"})
+            continue
+        parsed.append({
+            "name": scenario.get("name") or f"Scenario {index + 1}",
+            "workOrders": work_order_changes,
+            "project": project_changes,
+        })
+    return parsed, errors
+
+
+def evaluate_scenario(base: Dict[str, Any], scenario: Optional[dict], today: date) -> Dict[str, Any]:
+    """Apply a scenario to a copy of the base snapshot and run it through the progress.py formulas"""
+    scenario = scenario or {"name": "Current", "workOrders": {}, "project": {}}
+    project = SimpleNamespace(**vars(base["project"]))
+    for field, value in scenario["project"].items():
+        setattr(project, field, value)
+
+    cost_delta = Decimal("0")
+    work_orders = []
+    for wo in base["workOrders"]:
+        changes = scenario["workOrders"].get(wo.id)
+        if changes:
+            copy = SimpleNamespace(**vars(wo))
+            for field, value in changes.items():
+                setattr(copy, field, value)
+            # Project AC is the sum of work order actual costs, so shift it by the change
+            cost_delta += to_decimal(copy.actualCost) - to_decimal(wo.actualCost)
+            work_orders.append(copy)
+        else:
+            work_orders.append(wo)
+    if cost_delta:
+        project.actualCost = to_decimal(project.actualCost) + cost_delta
+
+    progress = summarize_progress(project, rollup_work_orders(work_orders), today=today)
+    schedule = compute_schedule_variance(project, today=today, spi=progress["SPI"])
+    risk = compute_risk_indicators(work_orders, today=today)
+    health = blend_health_score(progress["SPI"], progress["CPI"], progress["workOrderCompletion"], risk["riskIndex"])
+
+    return {
+        "name": scenario["name"],
+        "SPI": progress["SPI"],
+        "CPI": progress["CPI"],
+        "EV": float(progress["details"]["budget"]["earnedValueEV"]),
+        "PV": float(progress["details"]["budget"]["plannedValuePV"]),
+        "AC": float(progress["details"]["budget"]["actualCostAC"]),
+        "workOrderCompletion": progress["workOrderCompletion"],
+        "overallProgress": progress["overallProgress"],
+        "forecastEndDate": schedule["forecastEndDate"],
+        "healthScore": health["healthScore"],
+        "riskIndex": risk["riskIndex"],
+        "overdueOrders": risk["overdueOrders"],
+        "costOverruns": risk["costOverruns"],
+    }
+
+
+def _evaluate_chunk(base: Dict[str, Any], today: date, scenarios: List[dict]) -> List[Dict[str, Any]]:
+    return [evaluate_scenario(base, scenario, today) for scenario in scenarios]
+
+
+def get_worker_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool shared by the forecasting endpoints (None when FORECAST_WORKERS <= 1)"""
+    global _executor
+    workers = current_app.config.get("FORECAST_WORKERS", 0)
+    if workers <= 1:
+        return None
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def reset_worker_pool() -> None:
+    """Drop a broken pool so the next request starts a fresh one"""
+    global _executor
+    _executor = None
+
+
+def run_scenarios(base: Dict[str, Any], scenarios: List[dict], today: date) -> List[Dict[str, Any]]:
+    """Evaluate scenarios, spreading them over the worker pool when there are enough of them"""
+    pool = get_worker_pool() if len(scenarios) >= PARALLEL_THRESHOLD else None
+    if pool is None:
+        return _evaluate_chunk(base, today, scenarios)
+
+    # One task per worker so the base snapshot is pickled once per worker, not once per scenario
+    size = math.ceil(len(scenarios) / current_app.config["FORECAST_WORKERS"])
+    chunks = [scenarios[i:i + size] for i in range(0, len(scenarios), size)]
+    try:
+        results = pool.map(partial(_evaluate_chunk, base, today), chunks)
+        return [result for chunk in results for result in chunk]
+    except BrokenProcessPool:
+        reset_worker_pool()
+        current_app.logger.warning("Forecast worker pool failed; evaluating scenarios inline")
+        return _evaluate_chunk(base, today, scenarios)
+
+
+def _delta(result: Dict[str, Any], base: Dict[str, Any]) -> Dict[str, Any]:
+    delta = {key: result[key] - base[key] for key in ("SPI", "CPI", "EV", "PV", "AC", "overallProgress", "healthScore", "riskIndex")}
+    if result["forecastEndDate"] and base["forecastEndDate"]:
+        delta["forecastEndDays"] = (date.fromisoformat(result["forecastEndDate"]) - date.fromisoformat(base["forecastEndDate"])).days
+    else:
+        delta["forecastEndDays"] = None
+    return delta
+
+
+def forecast_project(project_id: int, scenarios: List[dict], today: Optional[date] = None) -> Tuple[Optional[Dict[str, Any]], List[dict]]:
+    """What-if results for each scenario next to the current state. Nothing is written.
+
+    Returns (report, errors); report is None when any scenario is invalid.
+    """
+    today = today or date.today()
+    base, cached = load_base_snapshot(project_id)
+    parsed, errors = parse_scenarios(base, scenarios)
+    if errors:
+        return None, errors
+
+    current = evaluate_scenario(base, None, today)
+    results = run_scenarios(base, parsed, today)
+    for result in results:
+        result["delta"] = _delta(result, current)
+
+    return {
+        "projectId": project_id,
+        "asOf": today.isoformat(),
+        "baseCached": cached,
+        "base": current,
+        "scenarios": results,
+    }, []
@@ -0,0 +1,26 @@
+"""gunicorn settings for running the backend with several worker processes.
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/todd-metrics gunicorn -c python:src.backend.gunicorn_conf src.backend.app:app
+
+Each worker keeps its Prometheus samples in files under PROMETHEUS_MULTIPROC_DIR so that /metrics,
+whichever worker answers it, reports the totals for all of them.
+"""
+import glob
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one's counters
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for sample_file in glob.glob(os.path.join(path, "*.db")):
+            os.remove(sample_file)
+
+
+def child_exit(server, worker):
+    from src.backend.prometheus_metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import db, Project, WorkOrder, WorkOrderStatus
+
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+
+# Work orders are flushed in chunks so IDs are assigned without one round trip per row
+IMPORT_CHUNK_SIZE = 500
+
+MAX_IMPORT_ROWS = 5000
+
+REQUIRED_COLUMNS = ("name", "startDate", "endDate", "priority")
+
+# Normalized header (lowercase, no spaces/underscores) -> WorkOrder field
+COLUMN_ALIASES = {
+    "name": "name",
+    "workorder": "name",
+    "workordername": "name",
+    "description": "description",
+    "location": "location",
+    "supplies": "suppliesList",
+    "supplieslist": "suppliesList",
+    "startdate": "startDate",
+    "start": "startDate",
+    "enddate": "endDate",
+    "end": "endDate",
+    "duedate": "endDate",
+    "status": "status",
+    "priority": "priority",
+    "estimatedbudget": "estimatedBudget",
+    "budget": "estimatedBudget",
+    "actualcost": "actualCost",
+    "cost": "actualCost",
+}
+
+
+class ImportFileError(ValueError):
+    """Raised when an uploaded file cannot be read as a work order sheet"""
+
+
+def normalize_header(header) -> Optional[str]:
+    """Map a spreadsheet column header to a WorkOrder field name (None if unknown)"""
+    if header is None:
+        return None
+    key = str(header).strip().lower().replace(" ", "").replace("_", "").replace("-", "")
+    return COLUMN_ALIASES.get(key)
+
+
+def _map_headers(headers) -> List[Optional[str]]:
+    fields = [normalize_header(h) for h in headers]
+    missing = [col for col in REQUIRED_COLUMNS if col not in fields]
+    if missing:
+        raise ImportFileError(f"Missing required columns: {', '.join(missing)}")
+    return fields
+
+
+def _is_blank(values) -> bool:
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in values)
+
+
+def _iter_csv_rows(stream) -> Iterator[Tuple[int, Dict[str, object]]]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        try:
+            headers = next(reader)
+        except StopIteration:
+            raise ImportFileError("The uploaded file is empty")
+        fields = _map_headers(headers)
+        for row_number, values in enumerate(reader, start=2):
+            if _is_blank(values):
+                continue
+            yield row_number, {f: v for f, v in zip(fields, values) if f}
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV files must be UTF-8 encoded")
+    finally:
+        # Don't let the wrapper close the underlying upload stream
+        text.detach()
+
+
+def _iter_xlsx_rows(stream) -> Iterator[Tuple[int, Dict[str, object]]]:
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError("Could not read the uploaded XLSX file")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            headers = next(rows)
+        except StopIteration:
+            raise ImportFileError("The uploaded file is empty")
+        fields = _map_headers(headers)
+        for row_number, values in enumerate(rows, start=2):
+            if _is_blank(values):
+                continue
+            yield row_number, {f: v for f, v in zip(fields, values) if f}
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(file_storage) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Stream (row number, {field: raw value}) pairs from an uploaded CSV or XLSX file"""
+    extension = os.path.splitext(file_storage.filename or "")[1].lower()
+    if extension == ".csv":
+        return _iter_csv_rows(file_storage.stream)
+    if extension == ".xlsx":
+        return _iter_xlsx_rows(file_storage.stream)
+    raise ImportFileError(f"Unsupported file type. Upload one of: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _parse_date(value) -> date:
+    # XLSX cells come back as datetime objects, CSV cells as strings
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+
+def _parse_amount(value, label: str) -> Tuple[Optional[Decimal], Optional[str]]:
+    if _text(value) is None:
+        return None, None
+    try:
+        amount = Decimal(str(value).replace(",", "").replace("$", "").strip())
+    except InvalidOperation:
+        return None, f"Invalid {label} format"
+    # "NaN" and "inf" parse as Decimals but cannot be stored in a DECIMAL column
+    if not amount.is_finite():
+        return None, f"Invalid {label} format"
+    if amount < 0:
+        return None, f"{label[0].upper()}{label[1:]} must be positive"
+    return amount, None
+
+
+def validate_import_row(row: Dict[str, object], project: Project) -> Tuple[Optional[dict], List[str]]:
+    """Validate one spreadsheet row against the same rules as create_workorder.
+
+    Returns (WorkOrder column values, errors). Values are None when the row has errors.
+    """
+    errors = []
+    values = {
+        "name": _text(row.get("name")),
+        "description": _text(row.get("description")),
+        "location": _text(row.get("location")),
+        "suppliesList": _text(row.get("suppliesList")),
+        "projectId": project.id,
+    }
+
+    missing = [f for f in REQUIRED_COLUMNS if _text(row.get(f)) is None]
+    if missing:
+        return None, [f"Missing required fields: {', '.join(missing)}"]
+
+    if len(values["name"]) > 200:
+        errors.append("Name must be 200 characters or fewer")
+
+    try:
+        values["startDate"] = _parse_date(row["startDate"])
+        values["endDate"] = _parse_date(row["endDate"])
+        if values["startDate"] >= values["endDate"]:
+            errors.append("End date must be after start date")
+        elif values["startDate"] < project.startDate or values["endDate"] > project.endDate:
+            errors.append(
+                f"Dates must fall within the project timeline ({project.startDate.isoformat()} to {project.endDate.isoformat()})"
+            )
+    except ValueError:
+        errors.append("Invalid date format. Use YYYY-MM-DD")
+
+    try:
+        priority_value = Decimal(str(row["priority"]).strip())
+    except InvalidOperation:
+        priority_value = None
+    # Whole numbers only ("3", or 3.0 from a spreadsheet cell); "2.7", "nan" and "inf" are row errors
+    if priority_value is None or not priority_value.is_finite() or priority_value != priority_value.to_integral_value():
+        errors.append("Priority must be a whole number between 1 and 5")
+    else:
+        priority = int(priority_value)
+        if priority < 1 or priority > 5:
+            errors.append("Priority must be between 1 and 5")
+        values["priority"] = priority
+
+    values["status"] = WorkOrderStatus.PENDING
+    status = _text(row.get("status"))
+    if status:
+        try:
+            values["status"] = WorkOrderStatus(status.lower().replace(" ", "_"))
+        except ValueError:
+            errors.append("Invalid status. Must be pending, in_progress, on_hold, completed, or cancelled")
+
+    values["estimatedBudget"], error = _parse_amount(row.get("estimatedBudget"), "estimated budget")
+    if error:
+        errors.append(error)
+    values["actualCost"], error = _parse_amount(row.get("actualCost"), "actual cost")
+    if error:
+        errors.append(error)
+
+    return (None if errors else values), errors
+
+
+def insert_work_orders(rows: List[dict]) -> List[WorkOrder]:
+    """Insert validated work order values in chunks, flushing each chunk to assign IDs"""
+    created: List[WorkOrder] = []
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        chunk = [WorkOrder(**values) for values in rows[start:start + IMPORT_CHUNK_SIZE]]
+        db.session.add_all(chunk)
+        db.session.flush()
+        created.extend(chunk)
+    return created
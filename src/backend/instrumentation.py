@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from flask import Blueprint, Flask, current_app, g, has_request_context, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .models import User, UserRole
+
+instrumentation_bp = Blueprint("instrumentation", __name__, url_prefix="/api/debug")
+
+# Histogram upper bounds; the last bucket catches everything above
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+# Characters of SQL kept for the slowest statements
+STATEMENT_PREVIEW = 300
+
+
+class RequestStats:
+    """SQL and serialization cost of the current request, kept on flask.g"""
+
+    __slots__ = ("started", "statements", "db_seconds", "serialize_seconds", "slowest")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.slowest: List[tuple] = []  # min-heap of (seconds, sql)
+
+    def add_statement(self, seconds: float, statement: str, keep: int) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        entry = (seconds, statement[:STATEMENT_PREVIEW])
+        if len(self.slowest) < keep:
+            heapq.heappush(self.slowest, entry)
+        elif keep and seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_statements(self) -> List[dict]:
+        return [{"ms": round(seconds * 1000, 2), "sql": sql} for seconds, sql in sorted(self.slowest, reverse=True)]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        buckets, running = [], 0
+        for bound, count in zip(list(self.bounds) + ["+Inf"], self.counts):
+            running += count
+            buckets.append({"le": bound, "count": running})
+        return {"count": self.count, "sum": round(self.total, 3), "buckets": buckets}
+
+
+class RouteStats:
+    """Aggregates for one method + URL rule since the process started"""
+
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.over_budget = 0
+        self.slowest_statement: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.latency_ms.count,
+            "latencyMs": self.latency_ms.to_dict(),
+            "statements": self.statements.to_dict(),
+            "dbMs": round(self.db_ms, 3),
+            "serializeMs": round(self.serialize_ms, 3),
+            "overQueryBudget": self.over_budget,
+            "slowestStatement": self.slowest_statement,
+        }
+
+
+_routes: Dict[str, RouteStats] = {}
+_lock = threading.Lock()
+
+
+def current_stats() -> Optional[RequestStats]:
+    return g.get("_request_stats") if has_request_context() else None
+
+
+def add_serialization_time(seconds: float) -> None:
+    stats = current_stats()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.add_statement(elapsed, statement, current_app.config["SLOW_STATEMENT_LIMIT"])
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("_query_started"):
+        connection.info["_query_started"].pop()
+
+
+def route_key() -> str:
+    rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+    return f"{request.method} {rule}"
+
+
+def _start_request():
+    g._request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    db_ms, serialize_ms = stats.db_seconds * 1000, stats.serialize_seconds * 1000
+    budget = current_app.config["QUERY_BUDGET"]
+    key = route_key()
+
+    with _lock:
+        route = _routes.setdefault(key, RouteStats())
+        route.latency_ms.observe(total_ms)
+        route.statements.observe(stats.statements)
+        route.db_ms += db_ms
+        route.serialize_ms += serialize_ms
+        if budget and stats.statements > budget:
+            route.over_budget += 1
+        if stats.slowest:
+            slowest = stats.slowest_statements()[0]
+            if route.slowest_statement is None or slowest["ms"] > route.slowest_statement["ms"]:
+                route.slowest_statement = slowest
+
+    if budget and stats.statements > budget:
+        print(f"Query budget exceeded: {key} ran {stats.statements} statements (budget {budget}), "
+              f"{db_ms:.1f} ms in the database")
+        for entry in stats.slowest_statements():
+            print(f"  {entry['ms']} ms: {entry['sql']}")
+
+    if current_app.config["SERVER_TIMING"]:
+        response.headers.add("Server-Timing", f'db;dur={db_ms:.2f};desc="{stats.statements} queries"')
+        response.headers.add("Server-Timing", f"serialize;dur={serialize_ms:.2f}")
+        response.headers.add("Server-Timing", f"total;dur={total_ms:.2f}")
+    return response
+
+
+def route_stats() -> Dict[str, dict]:
+    with _lock:
+        return {key: stats.to_dict() for key, stats in sorted(_routes.items())}
+
+
+def reset_route_stats() -> None:
+    with _lock:
+        _routes.clear()
+
+
+def init_instrumentation(app: Flask) -> None:
+    """Count statements and time per request.
+
+    Call before the other after_request hooks are registered: Flask runs them in reverse order, so
+    this one runs last and its total includes them (audit notifications, compression).
+    """
+    if not app.config.get("INSTRUMENTATION_ENABLED", True):
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+@instrumentation_bp.get("/request-stats")
+@jwt_required()
+def get_request_stats():
+    """Per-route latency and statement count histograms for this process (admins only)"""
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    if user.role != UserRole.ADMIN:
+        return jsonify({"error": "Only admins can view request statistics"}), 403
+
+    return jsonify({
+        "queryBudget": current_app.config["QUERY_BUDGET"],
+        "routes": route_stats(),
+    }), 200
+
+
+@instrumentation_bp.delete("/request-stats")
+@jwt_required()
+def reset_request_stats():
+    """Start the aggregates over, e.g. before a benchmark run (admins only)"""
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    if user.role != UserRole.ADMIN:
+        return jsonify({"error": "Only admins can reset request statistics"}), 403
+
+    reset_route_stats()
+    return jsonify({"message": "Request statistics reset"}), 200
@@ -0,0 +1,452 @@
+"""Concurrent load scenarios modelled on real field usage.
+
+Virtual users of four kinds run side by side, in Locust style: each picks a weighted task, makes one
+request and pauses. Concurrency goes up step by step (1, 2, 4, ... users), and every step reports
+throughput and latency percentiles, so the point where throughput stops growing and latency climbs
+shows how many gunicorn workers and pool connections a deployment needs.
+
+    # Everything in one process: seed a temp SQLite database and serve it on a free port
+    python -m src.backend.load_test --serve --scale small --steps 1,2,4,8,16
+
+    # Against a locally started server (same DATABASE_URL and JWT_SECRET_KEY, MAIL_SUPPRESS_SEND=true)
+    python -m src.backend.load_test --url http://127.0.0.1:8080 --steps 4,8,16,32,64 --step-seconds 30
+
+SQLite serialises writes, so --serve numbers show the mix working rather than capacity; size
+against gunicorn and MySQL.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+# Virtual user kinds and how many of each per 11 users
+PERSONA_WEIGHTS = {"worker": 6, "manager": 2, "catalog": 2, "admin": 1}
+
+# Work order statuses managers flip between
+FLIP_STATUSES = ("in_progress", "on_hold")
+
+
+def task(weight: int):
+    """Mark a VirtualUser method as a task picked `weight` times as often as a weight-1 task"""
+    def decorator(fn):
+        fn.task_weight = weight
+        return fn
+    return decorator
+
+
+class VirtualUser:
+    """One simulated user with its own keep-alive connection; subclasses declare @task methods"""
+
+    wait = (1.0, 3.0)  # think time range in seconds, scaled by --think-scale
+
+    def __init__(self, runner: "LoadRunner", user_id: int, rng: random.Random):
+        self.runner = runner
+        self.user_id = user_id
+        self.rng = rng
+        self.headers = {"Authorization": f"Bearer {runner.tokens[user_id]}", "Content-Type": "application/json"}
+        self.connection = runner.connect()
+        tasks = [getattr(self, name) for name in dir(self) if hasattr(getattr(self, name), "task_weight")]
+        self.tasks = [fn for fn in tasks for _ in range(fn.task_weight)]
+
+    def request(self, name: str, method: str, path: str, body: Optional[dict] = None) -> Optional[Any]:
+        data = json.dumps(body).encode() if body is not None else None
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=data, headers=self.headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = self.runner.connect()
+            status, payload = 0, b""
+        self.runner.record(name, time.perf_counter() - start, status)
+        if 200 <= status < 300 and payload:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    def get(self, name: str, path: str, **params) -> Optional[Any]:
+        return self.request(name, "GET", f"{path}?{urlencode(params)}" if params else path)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self.rng.choice(self.tasks)()
+            pause = self.rng.uniform(*self.wait) * self.runner.think_scale
+            if pause:
+                stop.wait(pause)
+        self.connection.close()
+
+
+class WorkerUser(VirtualUser):
+    """Field crew: the navbar polls unread messages, the messages page polls conversations"""
+
+    @task(5)
+    def unread_count(self):
+        self.get("worker: unread count", "/api/messages/unread-count")
+
+    @task(2)
+    def conversations(self):
+        self.get("worker: conversations", "/api/messages/conversations")
+
+    @task(1)
+    def my_projects(self):
+        self.get("worker: my projects", "/api/projects/my-projects")
+
+
+class ManagerUser(VirtualUser):
+    """Project managers poll notifications (workers have none) and move work orders along"""
+
+    wait = (2.0, 5.0)
+
+    @task(3)
+    def notifications(self):
+        self.get("manager: notifications", "/api/projects/notifications", limit=50)
+
+    @task(2)
+    def unread_count(self):
+        self.get("manager: unread count", "/api/messages/unread-count")
+
+    @task(2)
+    def flip_status(self):
+        work_orders = self.runner.personas["managerWorkOrders"].get(self.user_id)
+        if work_orders:
+            self.request("manager: flip status", "PUT", f"/api/workorders/{self.rng.choice(work_orders)}",
+                         {"status": self.rng.choice(FLIP_STATUSES)})
+
+    @task(1)
+    def dashboard(self):
+        self.get("manager: dashboard", "/api/projects/dashboard")
+
+
+class AdminUser(VirtualUser):
+    """Admins running the heavy reports"""
+
+    wait = (5.0, 15.0)
+
+    @task(1)
+    def portfolio(self):
+        self.get("admin: portfolio", "/api/projects/portfolio")
+
+    @task(1)
+    def report_data(self):
+        self.get("admin: report data", f"/api/projects/{self.rng.choice(self.runner.personas['projectIds'])}/report-data")
+
+    @task(1)
+    def all_metrics(self):
+        self.get("admin: metrics", f"/api/projects/{self.rng.choice(self.runner.personas['projectIds'])}/metrics/all")
+
+
+class CatalogUser(VirtualUser):
+    """Someone requesting supplies: one catalog search per keystroke of a term"""
+
+    wait = (3.0, 8.0)
+
+    @task(1)
+    def typeahead(self):
+        term = self.rng.choice(self.runner.personas["catalogTerms"])
+        for length in range(1, min(len(term), 5) + 1):
+            self.get("catalog: typeahead", "/api/projects/supplies/catalog",
+                     search=term[:length], supplyType="all", pageSize=20)
+            time.sleep(0.15 * self.runner.think_scale)  # typing speed
+
+
+PERSONA_CLASSES = {"worker": WorkerUser, "manager": ManagerUser, "catalog": CatalogUser, "admin": AdminUser}
+
+
+def load_personas() -> Dict[str, Any]:
+    """Users to act as and data they touch, read from the database the server uses (needs an app context)"""
+    from sqlalchemy import func
+    from .models import db, User, UserRole, Project, WorkOrder, BuildingSupply, ElectricalSupply
+
+    def users(role):
+        return [uid for (uid,) in db.session.query(User.id).filter(User.role == role, User.isActive == True).order_by(User.id)]
+
+    managers = users(UserRole.PROJECT_MANAGER)
+    rows = db.session.query(Project.projectManagerId, WorkOrder.id).join(WorkOrder, WorkOrder.projectId == Project.id).filter(
+        Project.isActive == True, WorkOrder.isActive == True, Project.projectManagerId.in_(managers)
+    ).all()
+    manager_work_orders: Dict[int, List[int]] = {}
+    for manager_id, work_order_id in rows:
+        manager_work_orders.setdefault(manager_id, []).append(work_order_id)
+
+    terms = set()
+    for model in (BuildingSupply, ElectricalSupply):
+        terms.update(name for (name,) in db.session.query(model.supplyCategory).filter(
+            model.projectId.is_(None), model.supplyCategory.isnot(None), func.length(model.supplyCategory) > 2
+        ).distinct().limit(20))
+
+    return {
+        "worker": users(UserRole.WORKER),
+        # Managers without projects would only produce 403s and empty polls
+        "manager": [uid for uid in managers if uid in manager_work_orders],
+        "admin": users(UserRole.ADMIN),
+        "catalog": users(UserRole.PROJECT_MANAGER) + users(UserRole.WORKER),
+        "managerWorkOrders": manager_work_orders,
+        "projectIds": [pid for (pid,) in db.session.query(Project.id).filter(Project.isActive == True).order_by(Project.id)],
+        "catalogTerms": sorted(terms) or ["Wire", "Pipe", "Bolt"],
+    }
+
+
+def persona_cycle(weights: Dict[str, int]) -> List[str]:
+    """Smooth weighted round robin, so even a few users get a mix: worker, manager, worker, catalog, ..."""
+    current = {kind: 0 for kind in weights}
+    cycle = []
+    for _ in range(sum(weights.values())):
+        for kind, weight in weights.items():
+            current[kind] += weight
+        kind = max(current, key=current.get)
+        current[kind] -= sum(weights.values())
+        cycle.append(kind)
+    return cycle
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, personas: Dict[str, Any], tokens: Dict[int, str], think_scale: float,
+                 metrics_token: Optional[str] = None, seed: int = 0):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.personas = personas
+        self.tokens = tokens
+        self.think_scale = think_scale
+        self.metrics_token = metrics_token
+        self.seed = seed
+        self._samples: List[tuple] = []
+        self._recording = False
+        self._lock = threading.Lock()
+
+    def connect(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def record(self, name: str, seconds: float, status: int) -> None:
+        if self._recording:
+            with self._lock:
+                self._samples.append((name, seconds, status))
+
+    def _users(self, count: int) -> List[VirtualUser]:
+        """count users in PERSONA_WEIGHTS proportions, skipping kinds the database has nobody for"""
+        kinds = persona_cycle({kind: weight for kind, weight in PERSONA_WEIGHTS.items() if self.personas[kind]})
+        users = []
+        for n in range(count):
+            kind = kinds[n % len(kinds)]
+            pool = self.personas[kind]
+            rng = random.Random(self.seed * 1000 + n)
+            users.append(PERSONA_CLASSES[kind](self, pool[n % len(pool)], rng))
+        return users
+
+    def scrape_pool_metrics(self) -> Optional[Dict[str, float]]:
+        """Checkout wait totals from the server's /metrics, when it exposes them"""
+        connection = self.connect()
+        headers = {"Authorization": f"Bearer {self.metrics_token}"} if self.metrics_token else {}
+        try:
+            connection.request("GET", "/metrics", headers=headers)
+            response = connection.getresponse()
+            text = response.read().decode()
+        except (OSError, http.client.HTTPException):
+            return None
+        finally:
+            connection.close()
+        if response.status != 200:
+            return None
+        wanted = {"todd_db_pool_checkout_wait_seconds_sum", "todd_db_pool_checkout_wait_seconds_count",
+                  "todd_db_pool_checkout_timeouts_total"}
+        values = {}
+        for line in text.splitlines():
+            name, _, value = line.partition(" ")
+            if name in wanted:
+                values[name] = float(value)
+        return values or None
+
+    def run_step(self, concurrency: int, seconds: float, warmup: float) -> Dict[str, Any]:
+        users = self._users(concurrency)
+        stop = threading.Event()
+        threads = [threading.Thread(target=user.run, args=(stop,), daemon=True) for user in users]
+        with self._lock:
+            self._samples = []
+        for thread in threads:
+            thread.start()
+        time.sleep(warmup)
+
+        pool_before = self.scrape_pool_metrics()
+        self._recording = True
+        started = time.perf_counter()
+        time.sleep(seconds)
+        self._recording = False
+        elapsed = time.perf_counter() - started
+        pool_after = self.scrape_pool_metrics()
+
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        with self._lock:
+            samples = list(self._samples)
+        return summarize_step(concurrency, elapsed, samples, pool_before, pool_after)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50Ms": None, "p95Ms": None, "p99Ms": None}
+    if len(latencies) == 1:
+        ms = round(latencies[0] * 1000, 1)
+        return {"p50Ms": ms, "p95Ms": ms, "p99Ms": ms}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {f"p{p}Ms": round(cuts[p - 1] * 1000, 1) for p in (50, 95, 99)}
+
+
+def summarize_step(concurrency: int, elapsed: float, samples: List[tuple],
+                   pool_before: Optional[dict], pool_after: Optional[dict]) -> Dict[str, Any]:
+    by_task: Dict[str, List[tuple]] = {}
+    for sample in samples:
+        by_task.setdefault(sample[0], []).append(sample)
+    errors = sum(1 for _, _, status in samples if not 200 <= status < 400)
+
+    step = {
+        "users": concurrency,
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "errorRate": round(errors / len(samples), 4) if samples else 0.0,
+        **_percentiles([seconds for _, seconds, _ in samples]),
+        "tasks": {
+            name: {"requests": len(rows), "errors": sum(1 for _, _, status in rows if not 200 <= status < 400),
+                   **_percentiles([seconds for _, seconds, _ in rows])}
+            for name, rows in sorted(by_task.items())
+        },
+    }
+    if pool_before and pool_after:
+        checkouts = pool_after.get("todd_db_pool_checkout_wait_seconds_count", 0) - pool_before.get("todd_db_pool_checkout_wait_seconds_count", 0)
+        waited = pool_after.get("todd_db_pool_checkout_wait_seconds_sum", 0) - pool_before.get("todd_db_pool_checkout_wait_seconds_sum", 0)
+        step["poolCheckouts"] = int(checkouts)
+        step["poolWaitMeanMs"] = round(waited / checkouts * 1000, 2) if checkouts else 0.0
+        step["poolTimeouts"] = int(pool_after.get("todd_db_pool_checkout_timeouts_total", 0) - pool_before.get("todd_db_pool_checkout_timeouts_total", 0))
+    return step
+
+
+def print_step(step: Dict[str, Any], verbose: bool) -> None:
+    pool = f" {step['poolWaitMeanMs']:>10} {step['poolTimeouts']:>8}" if "poolWaitMeanMs" in step else ""
+    print(f"{step['users']:>6} {step['requests']:>9} {step['rps']:>8} {step['p50Ms']!s:>9} {step['p95Ms']!s:>9} "
+          f"{step['p99Ms']!s:>9} {step['errorRate'] * 100:>7.2f}%{pool}")
+    if verbose:
+        for name, row in step["tasks"].items():
+            print(f"         {name:<26} {row['requests']:>7} req  p50 {row['p50Ms']} ms  p95 {row['p95Ms']} ms  errors {row['errors']}")
+
+
+def find_knee(steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The last step whose throughput still grew by 10% over the previous one"""
+    knee = steps[0] if steps else None
+    for previous, step in zip(steps, steps[1:]):
+        if step["rps"] < previous["rps"] * 1.1:
+            break
+        knee = step
+    return knee
+
+
+def _serve(app) -> str:
+    """Serve the app from a background thread on a free port"""
+    import logging
+    from werkzeug.serving import make_server
+
+    # One access log line per request would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .benchmark import SCALES
+
+    parser = argparse.ArgumentParser(description="Step up concurrent virtual users and report throughput and latency.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server that uses this DATABASE_URL and JWT_SECRET_KEY")
+    target.add_argument("--serve", action="store_true", help="Seed a temp SQLite database and serve it in-process")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Data to seed with --serve or --seed")
+    parser.add_argument("--seed", action="store_true", help="With --url: seed DATABASE_URL first (it must be empty)")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="Comma-separated concurrent user counts")
+    parser.add_argument("--step-seconds", type=float, default=20, help="Measured time per step")
+    parser.add_argument("--warmup-seconds", type=float, default=3, help="Unmeasured time at the start of each step")
+    parser.add_argument("--think-scale", type=float, default=0.1,
+                        help="Multiplier on the personas' think times (1 = real pacing, 0 = back-to-back requests)")
+    parser.add_argument("--metrics-token", default=os.getenv("METRICS_TOKEN"), help="Bearer token for the server's /metrics")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Per-task latency under every step")
+    parser.add_argument("--output", help="Write the steps as JSON here")
+    args = parser.parse_args(argv)
+    try:
+        steps = [int(n) for n in args.steps.split(",") if n.strip()]
+    except ValueError:
+        parser.error("--steps must be comma-separated integers")
+    if not steps or min(steps) < 1:
+        parser.error("--steps needs at least one count of 1 or more")
+
+    if args.serve:
+        path = os.path.join(tempfile.gettempdir(), "todd-load-test.db")
+        if os.path.exists(path):
+            os.remove(path)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # The app reads its configuration at import time. This process only mints tokens and reads personas,
+    # so it must not add its own samples to a server's multiprocess metrics directory
+    os.environ.setdefault("QUERY_BUDGET", "0")
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    from flask_jwt_extended import create_access_token
+    from .app import app
+    from .benchmark import seed_synthetic_data
+
+    with app.app_context():
+        if args.serve or args.seed:
+            try:
+                seed_synthetic_data(SCALES[args.scale], args.random_seed)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return 2
+        personas = load_personas()
+        user_ids = {uid for kind in PERSONA_CLASSES for uid in personas[kind]}
+        tokens = {uid: create_access_token(identity=uid) for uid in user_ids}
+    if not user_ids:
+        print("Error: the database has no users to act as (use --seed or --serve)")
+        return 2
+
+    if args.serve:
+        # Status flips would otherwise email the synthetic managers
+        app.config["MAIL_SUPPRESS_SEND"] = True
+        base_url = _serve(app)
+    else:
+        base_url = args.url.rstrip("/")
+    print(f"Target {base_url}: {len(personas['worker'])} workers, {len(personas['manager'])} managers, "
+          f"{len(personas['admin'])} admins; mix per 11 users {json.dumps(PERSONA_WEIGHTS)}")
+
+    runner = LoadRunner(base_url, personas, tokens, args.think_scale, args.metrics_token, args.random_seed)
+    print(f"{'users':>6} {'requests':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}"
+          + (f" {'pool wait':>10} {'timeouts':>8}" if runner.scrape_pool_metrics() else ""))
+    results = []
+    for concurrency in steps:
+        step = runner.run_step(concurrency, args.step_seconds, args.warmup_seconds)
+        results.append(step)
+        print_step(step, args.verbose)
+
+    knee = find_knee(results)
+    if knee is results[-1]:
+        print(f"Throughput was still growing at {knee['users']} users ({knee['rps']} req/s); add larger steps")
+    elif knee:
+        print(f"Throughput stopped growing after {knee['users']} users ({knee['rps']} req/s, p95 {knee['p95Ms']} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"target": base_url, "thinkScale": args.think_scale, "stepSeconds": args.step_seconds,
+                       "personaWeights": PERSONA_WEIGHTS, "steps": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import and_, case, delete, func, insert, select
+
+from .models import db, Project, ProjectStatus, WorkOrder, WorkOrderStatus, ProjectMetricSnapshot
+from .progress import HEALTH_INDEX_CAP, HEALTH_WEIGHTS, RISK_WEIGHTS
+from .progress_vectorized import compute_progress_many
+from .status_analytics import refresh_all_status_analytics
+
+# Projects processed (and committed) per round
+SNAPSHOT_BATCH_SIZE = 1000
+
+# Cancelled and archived projects no longer change, so they are not snapshotted
+SKIPPED_STATUSES = (ProjectStatus.CANCELLED, ProjectStatus.ARCHIVED)
+
+HISTORY_INTERVALS = ("day", "week", "month")
+HISTORY_AGGREGATES = ("last", "avg")
+
+# Fields averaged when agg=avg; the work order counts always take the bucket's last value
+_AVERAGED_FIELDS = ("SPI", "CPI", "EV", "PV", "AC", "overallProgress", "healthScore", "riskIndex")
+
+
+def _risk_counts(project_ids: List[int], today: date) -> Dict[int, tuple]:
+    """(total, active, overdue, overruns) per project, counted the way progress.compute_risk_indicators does"""
+    active = case((WorkOrder.status.notin_([WorkOrderStatus.COMPLETED, WorkOrderStatus.CANCELLED]), 1), else_=0)
+    overdue = case((and_(WorkOrder.status != WorkOrderStatus.COMPLETED, WorkOrder.endDate < today), 1), else_=0)
+    overrun = case((and_(WorkOrder.actualCost != 0, WorkOrder.estimatedBudget != 0, WorkOrder.actualCost > WorkOrder.estimatedBudget), 1), else_=0)
+    rows = db.session.execute(
+        select(WorkOrder.projectId, func.count(WorkOrder.id), func.sum(active), func.sum(overdue), func.sum(overrun))
+        .where(WorkOrder.projectId.in_(project_ids))
+        .group_by(WorkOrder.projectId)
+    ).all()
+    return {pid: (total or 0, act or 0, over or 0, runs or 0) for pid, total, act, over, runs in rows}
+
+
+def health_scores(spi: np.ndarray, cpi: np.ndarray, completion: np.ndarray, risk_index: np.ndarray) -> np.ndarray:
+    """progress.blend_health_score's weighted blend, for arrays of projects"""
+    schedule_health = np.clip(spi, 0, HEALTH_INDEX_CAP) / HEALTH_INDEX_CAP
+    cost_health = np.clip(cpi, 0, HEALTH_INDEX_CAP) / HEALTH_INDEX_CAP
+    completion_health = np.clip(completion, 0, 1)
+    risk_penalty = np.maximum(0, 1 - risk_index / 100)
+    return (
+        schedule_health * HEALTH_WEIGHTS["schedule"]
+        + cost_health * HEALTH_WEIGHTS["cost"]
+        + completion_health * HEALTH_WEIGHTS["completion"]
+        + risk_penalty * HEALTH_WEIGHTS["risk"]
+    ) * 100
+
+
+def _snapshot_rows(projects: List[Project], snapshot_date: date) -> List[dict]:
+    progress = compute_progress_many(projects, today=snapshot_date)
+    risk = _risk_counts([p.id for p in projects], snapshot_date)
+
+    ids = [p.id for p in projects]
+    spi = np.array([progress[pid]["SPI"] for pid in ids])
+    cpi = np.array([progress[pid]["CPI"] for pid in ids])
+    completion = np.array([progress[pid]["workOrderCompletion"] for pid in ids])
+    counts = np.array([risk.get(pid, (0, 0, 0, 0)) for pid in ids], dtype=float).reshape(len(ids), 4)
+    total, active, overdue, overruns = counts.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        overdue_ratio = np.where(active > 0, overdue / active, 0.0)
+        overrun_ratio = np.where(total > 0, overruns / total, 0.0)
+    risk_index = (overdue_ratio * RISK_WEIGHTS["overdue"] + overrun_ratio * RISK_WEIGHTS["cost_overrun"]) * 100
+    health = health_scores(spi, cpi, completion, risk_index)
+
+    return [{
+        "projectId": pid,
+        "snapshotDate": snapshot_date,
+        "spi": float(spi[i]),
+        "cpi": float(cpi[i]),
+        "earnedValue": progress[pid]["EV"],
+        "plannedValue": progress[pid]["PV"],
+        "actualCost": progress[pid]["AC"],
+        "overallProgress": progress[pid]["overallProgress"],
+        "healthScore": float(health[i]),
+        "riskIndex": float(risk_index[i]),
+        "totalWorkOrders": int(progress[pid]["total"]),
+        "completedWorkOrders": int(progress[pid]["completed"]),
+    } for i, pid in enumerate(ids)]
+
+
+def take_metric_snapshots(snapshot_date: Optional[date] = None, project_ids: Optional[List[int]] = None) -> dict:
+    """Store today's SPI, CPI, EV, PV, AC, health and risk for every live project.
+
+    Re-running on the same day replaces that day's rows. Values reflect the current state of the
+    work orders, so snapshots are only meaningful for the day they are taken.
+    """
+    snapshot_date = snapshot_date or date.today()
+    # Reads replay status changes the stats table hasn't caught up with; fold them in while we're here
+    refresh_all_status_analytics()
+    query = Project.query.filter(Project.isActive == True, Project.status.notin_(SKIPPED_STATUSES)).order_by(Project.id)
+    if project_ids is not None:
+        query = query.filter(Project.id.in_(project_ids))
+
+    written = 0
+    last_id = 0
+    while True:
+        batch = query.filter(Project.id > last_id).limit(SNAPSHOT_BATCH_SIZE).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        rows = _snapshot_rows(batch, snapshot_date)
+        db.session.execute(delete(ProjectMetricSnapshot).where(
+            ProjectMetricSnapshot.snapshotDate == snapshot_date,
+            ProjectMetricSnapshot.projectId.in_([p.id for p in batch]),
+        ))
+        db.session.execute(insert(ProjectMetricSnapshot), rows)
+        db.session.commit()
+        written += len(rows)
+
+    return {"snapshotDate": snapshot_date.isoformat(), "projectsSnapshotted": written}
+
+
+def _bucket_start(day: date, interval: str) -> date:
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def default_interval(start: date, end: date) -> str:
+    """Daily points for up to a quarter, weekly up to two years, monthly beyond"""
+    span = (end - start).days
+    if span <= 92:
+        return "day"
+    if span <= 730:
+        return "week"
+    return "month"
+
+
+def load_metric_history(project_id: int, start: date, end: date, interval: str = "day", agg: str = "last") -> List[Dict[str, Any]]:
+    """Snapshots for a project between start and end (inclusive), downsampled to one point per interval.
+
+    agg=last keeps the final snapshot in each bucket (right for cumulative EV/PV/AC burn-up);
+    agg=avg averages the metrics across the bucket.
+    """
+    snapshots = (
+        ProjectMetricSnapshot.query
+        .filter(
+            ProjectMetricSnapshot.projectId == project_id,
+            ProjectMetricSnapshot.snapshotDate >= start,
+            ProjectMetricSnapshot.snapshotDate <= end,
+        )
+        .order_by(ProjectMetricSnapshot.snapshotDate)
+        .all()
+    )
+
+    buckets: Dict[date, List[ProjectMetricSnapshot]] = {}
+    for snapshot in snapshots:
+        buckets.setdefault(_bucket_start(snapshot.snapshotDate, interval), []).append(snapshot)
+
+    points = []
+    for bucket, members in buckets.items():
+        point = members[-1].to_dict()
+        if agg == "avg" and len(members) > 1:
+            dicts = [m.to_dict() for m in members]
+            for field in _AVERAGED_FIELDS:
+                point[field] = sum(d[field] for d in dicts) / len(dicts)
+        point["date"] = bucket.isoformat()
+        point["samples"] = len(members)
+        points.append(point)
+    return points
@@ -229,8 +229,8 @@ class WorkOrder(db.Model):
         except Exception:
             return []
 
-    def to_dict(self) -> dict:
-        return {
+    def to_dict(self, include_project: bool = True) -> dict:
+        data = {
             "id": self.id,
             "name": self.name,
             "description": self.description,
@@ -245,12 +245,15 @@ class WorkOrder(db.Model):
             "estimatedBudget": float(self.estimatedBudget) if self.estimatedBudget else None,
             "actualCost": float(self.actualCost) if self.actualCost else None,
             "projectId": self.projectId,
-            "project": self.project.to_dict() if self.project else None,
             "assignedWorkers": self.get_assigned_workers(),
             "createdAt": self.createdAt.isoformat() if self.createdAt else None,
             "updatedAt": self.updatedAt.isoformat() if self.updatedAt else None,
             "isActive": self.isActive,
         }
+        # Callers that already send the project once (reports, exports) can skip re-embedding it per row
+        if include_project:
+            data["project"] = self.project.to_dict() if self.project else None
+        return data
 
 
 class WorkOrderWorker(db.Model):
@@ -282,6 +285,34 @@ class WorkOrderWorker(db.Model):
         }
 
 
+class WorkOrderDependency(db.Model):
+    """Finish-to-start link: the successor cannot start until lagDays after the predecessor ends"""
+    __tablename__ = "work_order_dependencies"
+
+    id = db.Column(db.Integer, primary_key=True)
+    projectId = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    predecessorId = db.Column(db.Integer, db.ForeignKey('work_orders.id'), nullable=False, index=True)
+    successorId = db.Column(db.Integer, db.ForeignKey('work_orders.id'), nullable=False, index=True)
+    lagDays = db.Column(db.Integer, default=0, nullable=False)
+
+    # Metadata
+    createdBy = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('predecessorId', 'successorId', name='unique_work_order_dependency'),)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "projectId": self.projectId,
+            "predecessorId": self.predecessorId,
+            "successorId": self.successorId,
+            "lagDays": self.lagDays,
+            "createdBy": self.createdBy,
+            "createdAt": self.createdAt.isoformat() if self.createdAt else None,
+        }
+
+
 class WorkOrderBuildingSupply(db.Model):
     __tablename__ = "work_order_building_supplies"
 
@@ -484,6 +515,9 @@ class Audit(db.Model):
     user = db.relationship('User', backref=db.backref('audit_logs', lazy=True))
     project = db.relationship('Project', backref=db.backref('audit_logs', lazy=True))
 
+    # Serves the project history query: WHERE projectId = ? ORDER BY createdAt DESC, id DESC
+    __table_args__ = (db.Index('ix_audit_logs_project_created', 'projectId', 'createdAt', 'id'),)
+
     def to_dict(self, work_orders: dict = None, supplies: dict = None) -> dict:
         """Convert audit log to dictionary.
         
@@ -736,6 +770,128 @@ class ElectricalSupply(db.Model):
         }
 
 
+class AuditArchiveSegment(db.Model):
+    """Manifest entry for a gzip'd NDJSON file of audit rows moved out of audit_logs.
+
+    One segment holds a single project's rows for a single calendar month from one archive run.
+    """
+    __tablename__ = "audit_archive_segments"
+
+    id = db.Column(db.Integer, primary_key=True)
+    projectId = db.Column(db.Integer, nullable=True, index=True)  # None for rows not tied to a project
+    periodStart = db.Column(db.Date, nullable=False, index=True)  # First day of the month covered
+    path = db.Column(db.String(500), nullable=False)  # Relative to AUDIT_ARCHIVE_DIR
+    rowCount = db.Column(db.Integer, nullable=False)
+    minCreatedAt = db.Column(db.DateTime, nullable=False)
+    maxCreatedAt = db.Column(db.DateTime, nullable=False)
+    minAuditId = db.Column(db.Integer, nullable=False)
+    maxAuditId = db.Column(db.Integer, nullable=False)
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index('ix_audit_archive_project_period', 'projectId', 'periodStart'),)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "projectId": self.projectId,
+            "periodStart": self.periodStart.isoformat() if self.periodStart else None,
+            "path": self.path,
+            "rowCount": self.rowCount,
+            "minCreatedAt": self.minCreatedAt.isoformat() if self.minCreatedAt else None,
+            "maxCreatedAt": self.maxCreatedAt.isoformat() if self.maxCreatedAt else None,
+            "createdAt": self.createdAt.isoformat() if self.createdAt else None,
+        }
+
+
+class WorkOrderStatusStats(db.Model):
+    """Running status history for one work order, replayed from its status audit entries.
+
+    Maintained incrementally by status_analytics.refresh_status_analytics; lastAuditId is the
+    newest audit row already folded in.
+    """
+    __tablename__ = "work_order_status_stats"
+
+    workOrderId = db.Column(db.Integer, db.ForeignKey('work_orders.id'), primary_key=True)
+    projectId = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    currentStatus = db.Column(db.String(20), nullable=False)
+    statusSince = db.Column(db.DateTime, nullable=False)
+
+    # Closed time spent in each status, in seconds (the open interval is added when reading)
+    pendingSeconds = db.Column(db.BigInteger, default=0, nullable=False)
+    inProgressSeconds = db.Column(db.BigInteger, default=0, nullable=False)
+    onHoldSeconds = db.Column(db.BigInteger, default=0, nullable=False)
+    completedSeconds = db.Column(db.BigInteger, default=0, nullable=False)
+    cancelledSeconds = db.Column(db.BigInteger, default=0, nullable=False)
+
+    transitionCount = db.Column(db.Integer, default=0, nullable=False)
+    reopenCount = db.Column(db.Integer, default=0, nullable=False)  # completed -> any other status
+    startedAt = db.Column(db.DateTime, nullable=True)  # first move to in_progress
+    firstCompletedAt = db.Column(db.DateTime, nullable=True)
+    completedAt = db.Column(db.DateTime, nullable=True)  # latest move to completed
+    lastAuditId = db.Column(db.Integer, nullable=False, index=True)
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "workOrderId": self.workOrderId,
+            "projectId": self.projectId,
+            "currentStatus": self.currentStatus,
+            "statusSince": self.statusSince.isoformat() if self.statusSince else None,
+            "transitionCount": self.transitionCount,
+            "reopenCount": self.reopenCount,
+            "startedAt": self.startedAt.isoformat() if self.startedAt else None,
+            "firstCompletedAt": self.firstCompletedAt.isoformat() if self.firstCompletedAt else None,
+            "completedAt": self.completedAt.isoformat() if self.completedAt else None,
+        }
+
+
+class ProjectMetricSnapshot(db.Model):
+    """One day's EVM and health figures for a project, written by metric_snapshots.take_metric_snapshots"""
+    __tablename__ = "project_metric_snapshots"
+
+    id = db.Column(db.Integer, primary_key=True)
+    projectId = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    snapshotDate = db.Column(db.Date, nullable=False)
+
+    spi = db.Column(db.Float, nullable=False)
+    cpi = db.Column(db.Float, nullable=False)
+    earnedValue = db.Column(db.Float, nullable=False)
+    plannedValue = db.Column(db.Float, nullable=False)
+    actualCost = db.Column(db.Float, nullable=False)
+    overallProgress = db.Column(db.Float, nullable=False)
+    healthScore = db.Column(db.Float, nullable=False)
+    riskIndex = db.Column(db.Float, nullable=False)
+    totalWorkOrders = db.Column(db.Integer, nullable=False)
+    completedWorkOrders = db.Column(db.Integer, nullable=False)
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('projectId', 'snapshotDate', name='uq_project_metric_snapshot_day'),)
+
+    def to_dict(self) -> dict:
+        return {
+            "date": self.snapshotDate.isoformat() if self.snapshotDate else None,
+            "SPI": self.spi,
+            "CPI": self.cpi,
+            "EV": self.earnedValue,
+            "PV": self.plannedValue,
+            "AC": self.actualCost,
+            "overallProgress": self.overallProgress,
+            "healthScore": self.healthScore,
+            "riskIndex": self.riskIndex,
+            "totalWorkOrders": self.totalWorkOrders,
+            "completedWorkOrders": self.completedWorkOrders,
+        }
+
+
+class ProjectVersion(db.Model):
+    """Change counter for a project's data, bumped by project_versions in the same transaction as the write"""
+    __tablename__ = "project_versions"
+
+    projectId = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    version = db.Column(db.BigInteger, default=0, nullable=False)
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 class PasswordReset(db.Model):
     __tablename__ = "password_resets"
 
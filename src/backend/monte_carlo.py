@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .models import db, Project, WorkOrder, WorkOrderStatus, WorkOrderStatusStats
+from .forecasting import project_state_version
+from .prometheus_metrics import record_cache
+from .status_analytics import load_status_stats
+
+DEFAULT_ITERATIONS = 10000
+MAX_ITERATIONS = 100000
+PERCENTILES = (50, 80, 95)
+
+# Fewer historical samples than this in the project falls back to every project's history
+MIN_HISTORY_SAMPLES = 5
+MAX_HISTORY_SAMPLES = 5000
+
+# Spread of the lognormal used when there is no history at all (centred on the plan)
+DEFAULT_RATIO_SIGMA = 0.3
+
+# Largest (iterations x work orders) block simulated at once, to bound memory
+MAX_BLOCK_CELLS = 2_000_000
+
+_EPOCH = date(1970, 1, 1)
+
+# In-memory LRU of simulation results per project, holding only the project's current version and,
+# within it, the most recent (iterations, seed, date) combinations. Both bounds cap memory no matter
+# what parameters clients send.
+MAX_CACHED_PROJECTS = 256
+MAX_RESULTS_PER_PROJECT = 8
+_result_cache: "OrderedDict[int, dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_ttl = timedelta(minutes=10)
+
+
+def _day(value: date) -> float:
+    return float((value - _EPOCH).days)
+
+
+def _from_day(value: float) -> str:
+    return (_EPOCH + timedelta(days=int(np.ceil(value)))).isoformat()
+
+
+def _ratio(started: datetime, completed: datetime, start: date, end: date) -> float:
+    return max((completed - started).total_seconds() / 86400, 0) / max((end - start).days, 1)
+
+
+def _project_duration_ratios(stats_by_id: Dict[int, WorkOrderStatusStats]) -> np.ndarray:
+    """_duration_ratios for one project, from its up-to-date stats (see load_status_stats)"""
+    done = sorted(
+        (stats for stats in stats_by_id.values()
+         if stats.currentStatus == WorkOrderStatus.COMPLETED.value and stats.startedAt and stats.completedAt),
+        key=lambda stats: stats.completedAt, reverse=True,
+    )[:MAX_HISTORY_SAMPLES]
+    if not done:
+        return np.empty(0)
+    dates = {
+        wo_id: (start, end) for wo_id, start, end in
+        db.session.query(WorkOrder.id, WorkOrder.startDate, WorkOrder.endDate)
+        .filter(WorkOrder.id.in_([stats.workOrderId for stats in done]))
+        .all()
+    }
+    return np.array([
+        _ratio(stats.startedAt, stats.completedAt, *dates[stats.workOrderId])
+        for stats in done if stats.workOrderId in dates
+    ], dtype=float)
+
+
+def _duration_ratios(project_id: Optional[int]) -> np.ndarray:
+    """Actual / planned duration for completed work orders with a recorded start and completion.
+
+    Reads the persisted stats, which trail the audit log until the next snapshot or archive run.
+    That is close enough for history pooled across projects.
+    """
+    query = (
+        db.session.query(WorkOrderStatusStats.startedAt, WorkOrderStatusStats.completedAt, WorkOrder.startDate, WorkOrder.endDate)
+        .join(WorkOrder, WorkOrder.id == WorkOrderStatusStats.workOrderId)
+        .filter(
+            WorkOrderStatusStats.currentStatus == WorkOrderStatus.COMPLETED.value,
+            WorkOrderStatusStats.startedAt.isnot(None),
+            WorkOrderStatusStats.completedAt.isnot(None),
+        )
+    )
+    if project_id is not None:
+        query = query.filter(WorkOrderStatusStats.projectId == project_id)
+    rows = query.order_by(WorkOrderStatusStats.completedAt.desc()).limit(MAX_HISTORY_SAMPLES).all()
+    return np.array([_ratio(*row) for row in rows], dtype=float)
+
+
+def _cost_ratios(project_id: Optional[int]) -> np.ndarray:
+    """Actual / estimated cost for completed work orders that have both"""
+    query = db.session.query(WorkOrder.actualCost, WorkOrder.estimatedBudget).filter(
+        WorkOrder.status == WorkOrderStatus.COMPLETED,
+        WorkOrder.actualCost.isnot(None),
+        WorkOrder.estimatedBudget > 0,
+    )
+    if project_id is not None:
+        query = query.filter(WorkOrder.projectId == project_id)
+    rows = query.order_by(WorkOrder.updatedAt.desc()).limit(MAX_HISTORY_SAMPLES).all()
+    return np.array([float(actual) / float(estimated) for actual, estimated in rows], dtype=float)
+
+
+def load_history(project_id: int, stats_by_id: Dict[int, WorkOrderStatusStats]) -> Dict[str, Any]:
+    """Historical duration and cost ratios, from the project itself if it has enough, else from all projects"""
+    history = {}
+    project_samples = {"duration": _project_duration_ratios(stats_by_id), "cost": _cost_ratios(project_id)}
+    for key, loader in (("duration", _duration_ratios), ("cost", _cost_ratios)):
+        samples, source = project_samples[key], "project"
+        if samples.size < MIN_HISTORY_SAMPLES:
+            samples, source = loader(None), "organization"
+        if samples.size < MIN_HISTORY_SAMPLES:
+            samples, source = np.empty(0), "default"
+        history[key] = samples
+        history[f"{key}Source"] = source
+    return history
+
+
+def load_remaining_work(project: Project, today: date, stats_by_id: Dict[int, WorkOrderStatusStats]) -> Dict[str, np.ndarray]:
+    """Start day, planned duration, estimate and cost so far for each open work order"""
+    rows = (
+        WorkOrder.query
+        .filter(
+            WorkOrder.projectId == project.id,
+            WorkOrder.isActive == True,
+            WorkOrder.status.notin_([WorkOrderStatus.COMPLETED, WorkOrderStatus.CANCELLED]),
+        )
+        .all()
+    )
+    today_day = _day(today)
+    start, planned, in_progress, estimated, spent = [], [], [], [], []
+    for wo in rows:
+        started_at = stats_by_id[wo.id].startedAt if wo.id in stats_by_id else None
+        planned.append(max((wo.endDate - wo.startDate).days, 1))
+        if wo.status == WorkOrderStatus.IN_PROGRESS:
+            actual_start = wo.actualStartDate or (started_at.date() if started_at else None) or wo.startDate
+            start.append(_day(actual_start))
+            in_progress.append(True)
+        else:
+            # Pending and on-hold work orders cannot start before today
+            start.append(max(today_day, _day(wo.startDate)))
+            in_progress.append(False)
+        estimated.append(float(wo.estimatedBudget or 0))
+        spent.append(float(wo.actualCost or 0))
+    return {
+        "start": np.array(start, dtype=float),
+        "planned": np.array(planned, dtype=float),
+        "inProgress": np.array(in_progress, dtype=bool),
+        "estimated": np.array(estimated, dtype=float),
+        "spent": np.array(spent, dtype=float),
+    }
+
+
+def _sample(rng: np.random.Generator, samples: np.ndarray, shape) -> np.ndarray:
+    """Bootstrap from the historical ratios, or a lognormal around 1.0 without history"""
+    if samples.size:
+        return rng.choice(samples, size=shape)
+    return rng.lognormal(0.0, DEFAULT_RATIO_SIGMA, size=shape)
+
+
+def simulate(work: Dict[str, np.ndarray], duration_samples: np.ndarray, cost_samples: np.ndarray,
+             today_day: float, actual_cost: float, iterations: int, seed: Optional[int]) -> Dict[str, np.ndarray]:
+    """Vectorized Monte Carlo over the open work orders.
+
+    Each iteration draws a duration ratio and a cost ratio per work order. Work orders run
+    independently from their (actual or earliest possible) start, so the project finishes when
+    the last one does; the final cost is AC plus each open work order's remaining spend.
+    Returns per-iteration finish day numbers and costs.
+    """
+    rng = np.random.default_rng(seed)
+    n = work["start"].size
+    if n == 0:
+        return {"finish": np.full(iterations, today_day), "cost": np.full(iterations, actual_cost)}
+
+    finish = np.empty(iterations)
+    cost = np.empty(iterations)
+    block = max(1, MAX_BLOCK_CELLS // n)
+    for lo in range(0, iterations, block):
+        hi = min(lo + block, iterations)
+        shape = (hi - lo, n)
+        wo_finish = work["start"] + work["planned"] * _sample(rng, duration_samples, shape)
+        # An in-progress work order that "should" already be done still finishes today at the earliest
+        wo_finish = np.where(work["inProgress"], np.maximum(wo_finish, today_day), wo_finish)
+        finish[lo:hi] = np.maximum(wo_finish.max(axis=1), today_day)
+
+        final_cost = np.maximum(work["spent"], work["estimated"] * _sample(rng, cost_samples, shape))
+        cost[lo:hi] = actual_cost + (final_cost - work["spent"]).sum(axis=1)
+    return {"finish": finish, "cost": cost}
+
+
+def _cached_result(project_id: int, version: tuple, key: tuple) -> Optional[Dict[str, Any]]:
+    with _cache_lock:
+        entry = _result_cache.get(project_id)
+        if entry is None or entry["version"] != version:
+            return None
+        _result_cache.move_to_end(project_id)
+        result = entry["results"].get(key)
+        if result is None or datetime.now() - result["timestamp"] >= _cache_ttl:
+            return None
+        entry["results"].move_to_end(key)
+        return result["data"]
+
+
+def _store_result(project_id: int, version: tuple, key: tuple, data: Dict[str, Any]) -> None:
+    with _cache_lock:
+        entry = _result_cache.get(project_id)
+        if entry is None or entry["version"] != version:
+            # Results for an older version can never be served again
+            entry = _result_cache[project_id] = {"version": version, "results": OrderedDict()}
+        _result_cache.move_to_end(project_id)
+        entry["results"][key] = {"data": data, "timestamp": datetime.now()}
+        entry["results"].move_to_end(key)
+        while len(entry["results"]) > MAX_RESULTS_PER_PROJECT:
+            entry["results"].popitem(last=False)
+        while len(_result_cache) > MAX_CACHED_PROJECTS:
+            _result_cache.popitem(last=False)
+
+
+def monte_carlo_forecast(project: Project, iterations: int = DEFAULT_ITERATIONS, seed: Optional[int] = None,
+                         today: Optional[date] = None) -> Dict[str, Any]:
+    """P50/P80/P95 completion dates and costs for a project, cached until the project changes"""
+    today = today or date.today()
+    cache_key = (iterations, seed, today)
+    version = project_state_version(project.id)
+    cached = _cached_result(project.id, version, cache_key)
+    record_cache("monte_carlo", cached is not None)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    started = datetime.now()
+    stats_by_id = load_status_stats(project.id)
+    history = load_history(project.id, stats_by_id)
+    work = load_remaining_work(project, today, stats_by_id)
+    actual_cost = float(project.actualCost or 0)
+    # One vectorized run is cheaper inline than pickling the inputs to a worker process
+    result = simulate(work, history["duration"], history["cost"], _day(today), actual_cost, iterations, seed)
+
+    finish_pct = np.percentile(result["finish"], PERCENTILES)
+    cost_pct = np.percentile(result["cost"], PERCENTILES)
+    budget = float(project.estimatedBudget) if project.estimatedBudget else None
+
+    data = {
+        "projectId": project.id,
+        "asOf": today.isoformat(),
+        "iterations": iterations,
+        "remainingWorkOrders": int(work["start"].size),
+        "completionDate": {f"P{p}": _from_day(v) for p, v in zip(PERCENTILES, finish_pct)},
+        "cost": {f"P{p}": round(float(v), 2) for p, v in zip(PERCENTILES, cost_pct)},
+        "probabilityOnTime": float((result["finish"] <= _day(project.endDate)).mean()),
+        "probabilityWithinBudget": float((result["cost"] <= budget).mean()) if budget else None,
+        "history": {
+            "durationSamples": int(history["duration"].size),
+            "durationSource": history["durationSource"],
+            "costSamples": int(history["cost"].size),
+            "costSource": history["costSource"],
+        },
+        "elapsedMs": round((datetime.now() - started).total_seconds() * 1000, 1),
+    }
+    _store_result(project.id, version, cache_key, data)
+    return {**data, "cached": False}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from flask import current_app
 from flask_mail import Mail, Message
 
@@ -298,7 +298,12 @@ def should_send_notification(user_id: int, preference_key: Optional[str]) -> Tup
         return (True, True)
     
     preferences = NotificationPreference.query.filter_by(userId=user_id).first()
-    if not preferences:
+    return preference_flags(preferences, preference_key)
+
+
+def preference_flags(preferences: Optional[NotificationPreference], preference_key: Optional[str]) -> Tuple[bool, bool]:
+    """Resolve (in_app, email) flags from an already-loaded preference row"""
+    if not preference_key or not preferences:
         # No preferences means default to enabled
         return (True, True)
     
@@ -391,3 +396,135 @@ def notify_project_managers_of_change(
     # Return True if we have managers (in-app notifications will be filtered by preferences in the endpoint)
     return len(managers) > 0
 
+
+
+def send_project_change_digest(project: Project, manager: User, changed_by_user: User, change_lines: List[str], mail: Mail) -> bool:
+    """Send a single email listing several changes made to one project"""
+    app_url = current_app.config.get('APP_URL', 'http://localhost:3000')
+    project_url = f"{app_url}/projects/{project.id}"
+    timestamp = datetime.utcnow().strftime('%B %d, %Y at %I:%M %p UTC')
+    
+    html_items = "".join(f'<li style="margin: 5px 0;">{line}</li>' for line in change_lines)
+    text_items = "\n".join(f"- {line}" for line in change_lines)
+    
+    html_body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <h2 style="color: #2c3e50;">Project Update Notification</h2>
+            <p>Hello {manager.firstName},</p>
+            <p>{len(change_lines)} change(s) have been made to a project you manage:</p>
+            
+            <div style="background-color: #f8f9fa; padding: 15px; border-left: 4px solid #4CAF50; margin: 20px 0;">
+                <p style="margin: 0;"><strong>Project:</strong> {project.name}</p>
+                <ul style="margin: 10px 0; padding-left: 20px;">{html_items}</ul>
+                <p style="margin: 5px 0;"><strong>Changed by:</strong> {changed_by_user.firstName} {changed_by_user.lastName}</p>
+                <p style="margin: 5px 0;"><strong>Time:</strong> {timestamp}</p>
+            </div>
+            
+            <p>To view the project and see all changes, click the link below:</p>
+            <p><a href="{project_url}" style="background-color: #4CAF50; color: white; padding: 14px 20px; text-decoration: none; border-radius: 4px; display: inline-block;">View Project</a></p>
+            
+            <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
+            <p style="color: #666; font-size: 12px;">This is an automated notification from the Project Management System.</p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    text_body = f"""
+    Project Update Notification
+    
+    Hello {manager.firstName},
+    
+    {len(change_lines)} change(s) have been made to a project you manage:
+    
+    Project: {project.name}
+{text_items}
+    Changed by: {changed_by_user.firstName} {changed_by_user.lastName}
+    Time: {timestamp}
+    
+    To view the project, visit: {project_url}
+    
+    This is an automated notification from the Project Management System.
+    """
+    
+    try:
+        msg = Message(
+            subject=f"Project Update: {project.name}",
+            recipients=[manager.emailAddress],
+            html=html_body,
+            body=text_body
+        )
+        mail.send(msg)
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Failed to send notification email to {manager.emailAddress}: {str(e)}")
+        return False
+
+
+def notify_project_managers_of_changes(changes: List[dict], user_id: int) -> int:
+    """
+    Coalesce many changes into at most one email per manager per project.
+    
+    Used by bulk endpoints instead of calling notify_project_managers_of_change() per field,
+    which would query managers/preferences and send one email for every change.
+    
+    Args:
+        changes: Dicts with entity_type, project_id, field, old_value, new_value and
+                 optional entity_name
+        user_id: ID of the user who made the changes (excluded from recipients)
+    
+    Returns:
+        Number of emails sent
+    """
+    notable: Dict[int, List[dict]] = {}
+    for change in changes:
+        if not change.get("project_id"):
+            continue
+        if should_notify_for_change(change["entity_type"], change["field"], change.get("old_value"), change.get("new_value")):
+            notable.setdefault(change["project_id"], []).append(change)
+    
+    if not notable:
+        return 0
+    
+    changed_by_user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not changed_by_user:
+        return 0
+    
+    projects = {p.id: p for p in Project.query.filter(Project.id.in_(list(notable.keys())), Project.isActive == True).all()}
+    mail = Mail(current_app)
+    sent = 0
+    
+    for project_id, project_changes in notable.items():
+        project = projects.get(project_id)
+        if not project:
+            continue
+        
+        managers = get_project_managers(project_id, exclude_user_id=user_id)
+        if not managers:
+            continue
+        
+        # Load every manager's preferences in one query
+        preferences_by_user = {
+            pref.userId: pref
+            for pref in NotificationPreference.query.filter(
+                NotificationPreference.userId.in_([m.id for m in managers])
+            ).all()
+        }
+        
+        for manager in managers:
+            preferences = preferences_by_user.get(manager.id)
+            lines = []
+            for change in project_changes:
+                preference_key = get_user_preference_key(change["entity_type"], change["field"], change.get("new_value"))
+                _, should_email = preference_flags(preferences, preference_key)
+                if should_email:
+                    lines.append(format_change_description(
+                        change["field"], change.get("old_value"), change.get("new_value"), change.get("entity_name")
+                    ))
+            
+            if lines and send_project_change_digest(project, manager, changed_by_user, lines, mail):
+                sent += 1
+    
+    return sent
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def parse_limit(value: Optional[str], default: int, maximum: int) -> int:
+    """Parse a page size query parameter, clamped to [1, maximum]"""
+    if value in (None, ""):
+        return default
+    limit = int(value)
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque, URL-safe cursor for the sort key of the last row on a page"""
+    payload = [v.isoformat() if isinstance(v, date) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a cursor produced by encode_cursor (raises ValueError if malformed)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def decode_datetime_cursor(token: str) -> Tuple[datetime, int]:
+    """Decode a (createdAt, id) cursor"""
+    values = decode_cursor(token)
+    try:
+        created_at, row_id = values
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_before(time_column, id_column, created_at: datetime, row_id: int):
+    """Rows strictly after (created_at, row_id) in (time DESC, id DESC) order"""
+    return or_(time_column < created_at, and_(time_column == created_at, id_column < row_id))
+
+
+def keyset_after(column, id_column, value: Any, row_id: int, descending: bool = False):
+    """Rows strictly after (value, row_id) in (column, id) order, ascending or descending together"""
+    if descending:
+        return or_(column < value, and_(column == value, id_column < row_id))
+    return or_(column > value, and_(column == value, id_column > row_id))
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, case, false, func, or_, select
+
+from .models import db, Project, ProjectStatus, WorkOrder, WorkOrderStatus, ProjectManager, ProjectMember, User, UserRole
+from .progress_vectorized import STATUS_ORDER, compute_progress_arrays
+
+# SPI/CPI bands used for the distribution buckets
+BEHIND_THRESHOLD = 0.9
+AHEAD_THRESHOLD = 1.1
+
+PROJECT_COLUMNS = [
+    "id", "name", "status", "priority", "startDate", "endDate", "actualStartDate", "actualEndDate",
+    "completedAt", "archivedAt", "estimatedBudget", "actualCost",
+]
+
+
+def scoped_project_ids(user: User):
+    """Select statement for the project IDs a user may report on (None means every project)"""
+    if user.role == UserRole.ADMIN:
+        return None
+    if user.role == UserRole.PROJECT_MANAGER:
+        managed = select(ProjectManager.projectId).where(ProjectManager.userId == user.id, ProjectManager.isActive == True)
+        return select(Project.id).where(or_(Project.projectManagerId == user.id, Project.id.in_(managed)))
+    if user.role == UserRole.WORKER:
+        return select(ProjectMember.projectId).where(ProjectMember.userId == user.id, ProjectMember.isActive == True)
+    return select(Project.id).where(false())
+
+
+def load_project_frame(scope=None, status: Optional[ProjectStatus] = None) -> pd.DataFrame:
+    """One row per active project in scope"""
+    stmt = select(*[getattr(Project, col) for col in PROJECT_COLUMNS]).where(Project.isActive == True)
+    if scope is not None:
+        stmt = stmt.where(Project.id.in_(scope))
+    if status is not None:
+        stmt = stmt.where(Project.status == status)
+    rows = db.session.execute(stmt).all()
+    return pd.DataFrame(rows, columns=PROJECT_COLUMNS)
+
+
+def load_work_order_frame(scope=None, status: Optional[ProjectStatus] = None, today: Optional[date] = None) -> pd.DataFrame:
+    """Work order counts and budget sums per (project, status) from one grouped query"""
+    today = today or date.today()
+    overdue = case((and_(WorkOrder.status != WorkOrderStatus.COMPLETED, WorkOrder.endDate < today), 1), else_=0)
+    overrun = case((WorkOrder.actualCost > WorkOrder.estimatedBudget, 1), else_=0)
+
+    stmt = (
+        select(
+            WorkOrder.projectId,
+            WorkOrder.status,
+            func.count(WorkOrder.id),
+            func.coalesce(func.sum(WorkOrder.estimatedBudget), 0),
+            func.coalesce(func.sum(WorkOrder.actualCost), 0),
+            func.sum(overdue),
+            func.sum(overrun),
+        )
+        .join(Project, Project.id == WorkOrder.projectId)
+        .where(WorkOrder.isActive == True, Project.isActive == True)
+        .group_by(WorkOrder.projectId, WorkOrder.status)
+    )
+    if scope is not None:
+        stmt = stmt.where(WorkOrder.projectId.in_(scope))
+    if status is not None:
+        stmt = stmt.where(Project.status == status)
+
+    rows = db.session.execute(stmt).all()
+    frame = pd.DataFrame(rows, columns=["projectId", "status", "count", "estimated", "actual", "overdue", "overrun"])
+    frame["status"] = frame["status"].map(lambda s: s.value if s is not None else WorkOrderStatus.PENDING.value)
+    for col in ("estimated", "actual"):
+        frame[col] = frame[col].astype(float)
+    for col in ("count", "overdue", "overrun"):
+        frame[col] = frame[col].fillna(0).astype(np.int64)
+    return frame
+
+
+def _to_days(series: pd.Series) -> np.ndarray:
+    """Dates as integer day numbers (NaN where missing) for vectorized arithmetic"""
+    values = pd.to_datetime(series, errors="coerce")
+    days = (values - pd.Timestamp("1970-01-01")).dt.days
+    return days.to_numpy(dtype=float)
+
+
+def compute_portfolio_metrics(projects: pd.DataFrame, work_orders: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+    """Portfolio columns around compute_progress_arrays, fed from the grouped work order frame.
+
+    Returns one row per project with completion, PV/EV/AC, SPI, CPI and schedule outcome columns.
+    """
+    today = today or date.today()
+    ids = projects["id"].to_numpy()
+
+    def pivot(column: str) -> pd.DataFrame:
+        if work_orders.empty:
+            return pd.DataFrame(0, index=ids, columns=STATUS_ORDER)
+        table = work_orders.pivot_table(index="projectId", columns="status", values=column, aggfunc="sum", fill_value=0)
+        return table.reindex(index=ids, columns=STATUS_ORDER, fill_value=0)
+
+    counts = pivot("count")
+    estimated = pivot("estimated")
+    per_project = work_orders.groupby("projectId")[["actual", "overdue", "overrun"]].sum().reindex(ids, fill_value=0)
+
+    start = _to_days(projects["startDate"])
+    end = _to_days(projects["endDate"])
+    ac = projects["actualCost"].astype(float).fillna(0).to_numpy()
+    progress = compute_progress_arrays(
+        counts.to_numpy(dtype=float), estimated.to_numpy(dtype=float), start, end, ac, today
+    )
+    total = progress["total"]
+    completed = progress["completed"]
+    pv, ev = progress["PV"], progress["EV"]
+
+    # Finished projects (closed out or archived): same on-time rule as the report-data timeline
+    finish = _to_days(projects["completedAt"])
+    finish = np.where(np.isnan(finish), _to_days(projects["archivedAt"]), finish)
+    has_finish = ~np.isnan(finish)
+    on_time = np.where(has_finish, (finish - start) <= (end - start), False)
+
+    return pd.DataFrame({
+        "projectId": ids,
+        "name": projects["name"].to_numpy(),
+        "status": projects["status"].map(lambda s: s.value if s else ProjectStatus.PLANNING.value).to_numpy(),
+        "estimatedBudget": projects["estimatedBudget"].astype(float).fillna(0).to_numpy(),
+        "actualCost": ac,
+        "workOrders": total,
+        "completedWorkOrders": completed,
+        "overdueWorkOrders": per_project["overdue"].to_numpy(dtype=np.int64),
+        "costOverruns": per_project["overrun"].to_numpy(dtype=np.int64),
+        "workOrderActualCost": per_project["actual"].to_numpy(dtype=float),
+        "workOrderCompletion": progress["workOrderCompletion"],
+        "plannedValue": pv,
+        "earnedValue": ev,
+        "SPI": progress["SPI"],
+        "CPI": progress["CPI"],
+        "hasPlannedValue": pv > 0,
+        "hasActualCost": ac > 0,
+        "finished": has_finish,
+        "onTime": on_time,
+    })
+
+
+def _distribution(values: np.ndarray) -> Dict[str, Any]:
+    """Summary statistics and behind/on-track/ahead buckets for SPI or CPI values"""
+    if values.size == 0:
+        return {"count": 0, "mean": None, "median": None, "min": None, "max": None,
+                "percentiles": {}, "buckets": {"behind": 0, "onTrack": 0, "ahead": 0}}
+    p10, p25, p75, p90 = np.percentile(values, [10, 25, 75, 90])
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "median": float(np.median(values)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {"p10": float(p10), "p25": float(p25), "p75": float(p75), "p90": float(p90)},
+        "buckets": {
+            "behind": int((values < BEHIND_THRESHOLD).sum()),
+            "onTrack": int(((values >= BEHIND_THRESHOLD) & (values <= AHEAD_THRESHOLD)).sum()),
+            "ahead": int((values > AHEAD_THRESHOLD).sum()),
+        },
+    }
+
+
+def summarize_portfolio(metrics: pd.DataFrame) -> Dict[str, Any]:
+    """Portfolio totals, SPI/CPI distributions and on-time rate"""
+    finished = int(metrics["finished"].sum())
+    total_budget = float(metrics["estimatedBudget"].sum())
+    total_actual = float(metrics["actualCost"].sum())
+    return {
+        "projectCount": int(len(metrics)),
+        "byStatus": {k: int(v) for k, v in metrics["status"].value_counts().items()},
+        "totals": {
+            "estimatedBudget": total_budget,
+            "actualCost": total_actual,
+            "variance": total_budget - total_actual,
+            "plannedValue": float(metrics["plannedValue"].sum()),
+            "earnedValue": float(metrics["earnedValue"].sum()),
+            "workOrders": int(metrics["workOrders"].sum()),
+            "completedWorkOrders": int(metrics["completedWorkOrders"].sum()),
+            "overdueWorkOrders": int(metrics["overdueWorkOrders"].sum()),
+            "costOverruns": int(metrics["costOverruns"].sum()),
+        },
+        # Only projects where the index is defined (PV > 0 / AC > 0) count toward the distributions
+        "SPI": _distribution(metrics.loc[metrics["hasPlannedValue"], "SPI"].to_numpy(dtype=float)),
+        "CPI": _distribution(metrics.loc[metrics["hasActualCost"], "CPI"].to_numpy(dtype=float)),
+        "onTime": {
+            "finishedProjects": finished,
+            "onTimeProjects": int(metrics["onTime"].sum()),
+            "onTimeRate": float(metrics["onTime"].sum() / finished) if finished else None,
+        },
+    }
+
+
+def project_rows(metrics: pd.DataFrame, limit: Optional[int] = None) -> list:
+    """Per-project rows for the response, worst SPI first"""
+    ordered = metrics.sort_values(["SPI", "projectId"])
+    if limit:
+        ordered = ordered.head(limit)
+    columns = ["projectId", "name", "status", "estimatedBudget", "actualCost", "workOrders", "completedWorkOrders",
+               "overdueWorkOrders", "workOrderCompletion", "SPI", "CPI"]
+    return [
+        {col: (value.item() if hasattr(value, "item") else value) for col, value in zip(columns, row)}
+        for row in ordered[columns].itertuples(index=False, name=None)
+    ]
+
+
+def build_portfolio_report(user: User, status: Optional[ProjectStatus] = None, today: Optional[date] = None,
+                           include_projects: bool = False, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Two grouped queries plus vectorized math, regardless of how many projects are in scope"""
+    today = today or date.today()
+    scope = scoped_project_ids(user)
+    projects = load_project_frame(scope, status)
+    work_orders = load_work_order_frame(scope, status, today)
+    metrics = compute_portfolio_metrics(projects, work_orders, today)
+
+    report = {"asOf": today.isoformat(), "summary": summarize_portfolio(metrics)}
+    if include_projects:
+        report["projects"] = project_rows(metrics, limit)
+    return report
@@ -4,6 +4,8 @@ from decimal import Decimal, getcontext
 from typing import Dict, Any, Optional, List
 
 from .models import db, Project, WorkOrder, WorkOrderStatus, ProjectStatus, ProjectMember, BuildingSupply, ElectricalSupply, WorkOrderBuildingSupply, WorkOrderElectricalSupply, SupplyStatus
+from .status_analytics import compute_status_analytics
+from .capacity_index import get_capacity_index
 
 # precision for Decimal math
 getcontext().prec = 28
@@ -18,6 +20,23 @@ DEFAULT_WEIGHTS = {
     "earned_value": Decimal("0.30"),
 }
 
+# weights of the overdue and cost-overrun ratios in the 0-100 risk index
+RISK_WEIGHTS = {
+    "overdue": 0.5,
+    "cost_overrun": 0.5,
+}
+
+# weights of the 0-1 components in the 0-100 health score
+HEALTH_WEIGHTS = {
+    "schedule": 0.35,
+    "cost": 0.35,
+    "completion": 0.20,
+    "risk": 0.10,
+}
+
+# SPI and CPI at or above this count as full schedule / cost health
+HEALTH_INDEX_CAP = 2.0
+
 # --- helper functions ---
 
 def to_decimal(value) -> Decimal:
@@ -71,38 +90,50 @@ def fetch_work_orders(project_id: int) -> list[WorkOrder]:
 
 # --- calculations ---
 
+def compute_supply_cost_total(work_order_ids: List[int]) -> Decimal:
+    """Total budget of approved building and electrical supplies linked to the given work orders"""
+    supply_cost_total = Decimal("0")
+    if not work_order_ids:
+        return supply_cost_total
+
+    # Get all approved building supplies linked to these work orders
+    building_supply_links = WorkOrderBuildingSupply.query.filter(
+        WorkOrderBuildingSupply.workOrderId.in_(work_order_ids),
+        WorkOrderBuildingSupply.isActive == True
+    ).all()
+    
+    for link in building_supply_links:
+        supply = BuildingSupply.query.get(link.buildingSupplyId)
+        if supply and supply.status == SupplyStatus.APPROVED:
+            supply_cost_total += to_decimal(supply.budget)
+    
+    # Get all approved electrical supplies linked to these work orders
+    electrical_supply_links = WorkOrderElectricalSupply.query.filter(
+        WorkOrderElectricalSupply.workOrderId.in_(work_order_ids),
+        WorkOrderElectricalSupply.isActive == True
+    ).all()
+    
+    for link in electrical_supply_links:
+        supply = ElectricalSupply.query.get(link.electricalSupplyId)
+        if supply and supply.status == SupplyStatus.APPROVED:
+            supply_cost_total += to_decimal(supply.budget)
+    return supply_cost_total
+
+
 def compute_work_order_rollup(work_orders: list[WorkOrder]) -> Dict[str, Any]:
     """Summarize work orders into counts and budget totals"""
+    work_order_ids = [wo.id for wo in work_orders] if work_orders else []
+    return rollup_work_orders(work_orders, compute_supply_cost_total(work_order_ids))
+
+
+def rollup_work_orders(work_orders, supply_cost_total: Decimal = Decimal("0")) -> Dict[str, Any]:
+    """compute_work_order_rollup without database access.
+
+    work_orders can be any objects with status, estimatedBudget and actualCost attributes,
+    e.g. in-memory copies used for what-if scenarios.
+    """
     total = completed = in_progress = on_hold = pending = cancelled = 0
     est_total = est_completed = est_in_progress_raw = actual_cost_total = Decimal("0")
-    supply_cost_total = Decimal("0")
-
-    # Get all work order IDs
-    work_order_ids = [wo.id for wo in work_orders] if work_orders else []
-    
-    # Calculate total supply costs for all work orders (only approved supplies)
-    if work_order_ids:
-        # Get all approved building supplies linked to these work orders
-        building_supply_links = WorkOrderBuildingSupply.query.filter(
-            WorkOrderBuildingSupply.workOrderId.in_(work_order_ids),
-            WorkOrderBuildingSupply.isActive == True
-        ).all()
-        
-        for link in building_supply_links:
-            supply = BuildingSupply.query.get(link.buildingSupplyId)
-            if supply and supply.status == SupplyStatus.APPROVED:
-                supply_cost_total += to_decimal(supply.budget)
-        
-        # Get all approved electrical supplies linked to these work orders
-        electrical_supply_links = WorkOrderElectricalSupply.query.filter(
-            WorkOrderElectricalSupply.workOrderId.in_(work_order_ids),
-            WorkOrderElectricalSupply.isActive == True
-        ).all()
-        
-        for link in electrical_supply_links:
-            supply = ElectricalSupply.query.get(link.electricalSupplyId)
-            if supply and supply.status == SupplyStatus.APPROVED:
-                supply_cost_total += to_decimal(supply.budget)
 
     for wo in work_orders:
         total += 1
@@ -206,6 +237,11 @@ def compute_project_progress(project_id: int, weights: Optional[Dict[str, Decima
     project = fetch_project(project_id)
     work_orders = fetch_work_orders(project_id)
     rollup = compute_work_order_rollup(work_orders)
+    return summarize_progress(project, rollup, weights=weights, today=today)
+
+
+def summarize_progress(project, rollup: Dict[str, Any], weights: Optional[Dict[str, Decimal]] = None, today: Optional[date] = None) -> Dict[str, Any]:
+    """Schedule, earned value and weighted progress for a work order rollup (no database access)"""
     schedule = compute_schedule_stats(project, today=today)
     ev = compute_earned_value(rollup, project, schedule)
 
@@ -368,8 +404,8 @@ def compute_cost_variance(project: Project, project_id: int) -> Dict[str, Any]:
     }
 
 
-def compute_workforce_metrics(project_id: int) -> Dict[str, Any]:
-    """Calculate workforce and resource efficiency metrics"""
+def compute_workforce_metrics(project_id: int, analytics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Calculate workforce and resource efficiency metrics; pass analytics to reuse an existing compute_status_analytics result"""
     try:
         project = fetch_project(project_id)
         work_orders = fetch_work_orders(project_id)
@@ -386,13 +422,22 @@ def compute_workforce_metrics(project_id: int) -> Dict[str, Any]:
         active_wo_per_worker = len(active_work_orders) / team_size if team_size > 0 else 0
         
         # Average work order duration
-        # Calculate using createdAt and updatedAt for completed work orders
-        # This represents the total lifecycle from creation to completion
-        completed_orders = [wo for wo in work_orders if wo.status == WorkOrderStatus.COMPLETED and wo.createdAt and wo.updatedAt]
-        avg_duration = None
-        if completed_orders:
-            durations = [(wo.updatedAt.date() - wo.createdAt.date()).days for wo in completed_orders]
-            avg_duration = sum(durations) / len(durations)
+        # Lead time from creation to completion, measured from the status audit trail
+        if analytics is None:
+            analytics = compute_status_analytics(project_id)
+        avg_duration = analytics["leadTime"]["averageDays"]
+        avg_cycle_time = analytics["cycleTime"]["averageDays"]
+        if avg_duration is None:
+            # No recorded completions yet: fall back to createdAt/updatedAt for completed work orders
+            completed_orders = [wo for wo in work_orders if wo.status == WorkOrderStatus.COMPLETED and wo.createdAt and wo.updatedAt]
+            if completed_orders:
+                durations = [(wo.updatedAt.date() - wo.createdAt.date()).days for wo in completed_orders]
+                avg_duration = sum(durations) / len(durations)
+        
+        # Members booked above capacity (on this or any other project) before the project ends
+        window_end = max(date.today(), project.endDate) if project.endDate else date.today()
+        members = {m.userId for m in active_members} if team_size else set()
+        overallocated = [w for w in get_capacity_index().overallocated(date.today(), window_end) if w["userId"] in members]
         
         # Distribution by status
         status_distribution = {
@@ -407,6 +452,9 @@ def compute_workforce_metrics(project_id: int) -> Dict[str, Any]:
             "teamSize": team_size,
             "activeWorkOrdersPerWorker": float(active_wo_per_worker),
             "averageWorkOrderDurationDays": avg_duration,
+            "averageCycleTimeDays": avg_cycle_time,
+            "throughputPerWeek": analytics["throughput"]["averagePerWeek"],
+            "overallocatedWorkers": len(overallocated),
             "statusDistribution": status_distribution,
             "totalWorkOrders": len(work_orders),
             "activeWorkOrders": len(active_work_orders)
@@ -417,6 +465,9 @@ def compute_workforce_metrics(project_id: int) -> Dict[str, Any]:
             "teamSize": 0,
             "activeWorkOrdersPerWorker": 0.0,
             "averageWorkOrderDurationDays": None,
+            "averageCycleTimeDays": None,
+            "throughputPerWeek": 0.0,
+            "overallocatedWorkers": 0,
             "statusDistribution": {
                 "pending": 0,
                 "in_progress": 0,
@@ -429,23 +480,38 @@ def compute_workforce_metrics(project_id: int) -> Dict[str, Any]:
         }
 
 
-def compute_quality_metrics(project_id: int) -> Dict[str, Any]:
-    """Calculate quality and risk indicators"""
+def compute_quality_metrics(project_id: int, analytics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Calculate quality and risk indicators; pass analytics to reuse an existing compute_status_analytics result"""
     work_orders = fetch_work_orders(project_id)
     
-    # Rework rate - orders marked completed then changed back
-    # This is approximated by checking orders that went from completed to another status
+    # Rework rate - share of work orders ever completed that were later moved back out of completed
     completed_orders = [wo for wo in work_orders if wo.status == WorkOrderStatus.COMPLETED]
     total_completed = len(completed_orders)
     
-    # Note: Full rework tracking would require audit logs
-    # For now, we'll return current status distribution
-    rework_rate = 0  # Would need audit logs to calculate properly
+    if analytics is None:
+        analytics = compute_status_analytics(project_id)
+    rework_rate = analytics["reworkRate"]
+    
+    risk = compute_risk_indicators(work_orders)
+    
+    return {
+        "reworkRate": rework_rate,
+        "reopenedOrders": analytics["reopenedOrders"],
+        "overdueOrders": risk["overdueOrders"],
+        "costOverruns": risk["costOverruns"],
+        "riskIndex": risk["riskIndex"],
+        "totalCompleted": total_completed
+    }
+
+
+def compute_risk_indicators(work_orders, today: Optional[date] = None) -> Dict[str, Any]:
+    """Overdue work orders, cost overruns and the combined risk index (no database access)"""
+    today = today or date.today()
     
     # Risk indicators
     overdue_orders = 0
     for wo in work_orders:
-        if wo.status != WorkOrderStatus.COMPLETED and wo.endDate < date.today():
+        if wo.status != WorkOrderStatus.COMPLETED and wo.endDate < today:
             overdue_orders += 1
     
     # Cost overruns (work orders over budget)
@@ -459,18 +525,46 @@ def compute_quality_metrics(project_id: int) -> Dict[str, Any]:
     total_active = len([wo for wo in work_orders if wo.status != WorkOrderStatus.COMPLETED and wo.status != WorkOrderStatus.CANCELLED])
     overdue_ratio = overdue_orders / total_active if total_active > 0 else 0
     cost_overrun_ratio = cost_overruns / len(work_orders) if len(work_orders) > 0 else 0
-    risk_score = float(overdue_ratio * 0.5 + cost_overrun_ratio * 0.5) * 100
+    risk_score = float(overdue_ratio * RISK_WEIGHTS["overdue"] + cost_overrun_ratio * RISK_WEIGHTS["cost_overrun"]) * 100
     
     return {
-        "reworkRate": rework_rate,
         "overdueOrders": overdue_orders,
         "costOverruns": cost_overruns,
         "riskIndex": risk_score,
-        "totalCompleted": total_completed
     }
 
 
-def compute_project_health_score(project_id: int, progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def blend_health_score(spi: float, cpi: float, work_order_completion: float, risk_index: float) -> Dict[str, Any]:
+    """Weighted 0-100 health score and its components"""
+    # Calculate health components (0-1 scale)
+    schedule_health = min(max(spi, 0), HEALTH_INDEX_CAP) / HEALTH_INDEX_CAP  # Normalize SPI to 0-1
+    cost_health = min(max(cpi, 0), HEALTH_INDEX_CAP) / HEALTH_INDEX_CAP  # Normalize CPI to 0-1
+    completion_health = max(0, min(1, work_order_completion))  # Clamp to 0-1
+    
+    # Risk penalty
+    risk_penalty = max(0, 1 - (risk_index / 100))
+    
+    # Weighted health score
+    overall_health = (
+        schedule_health * HEALTH_WEIGHTS["schedule"] +
+        cost_health * HEALTH_WEIGHTS["cost"] +
+        completion_health * HEALTH_WEIGHTS["completion"] +
+        risk_penalty * HEALTH_WEIGHTS["risk"]
+    ) * 100
+    
+    return {
+        "healthScore": float(overall_health),
+        "components": {
+            "scheduleHealth": float(schedule_health * 100),
+            "costHealth": float(cost_health * 100),
+            "completionHealth": float(completion_health * 100),
+            "riskScore": float(risk_index)
+        },
+    }
+
+
+def compute_project_health_score(project_id: int, progress: Optional[Dict[str, Any]] = None,
+                                 quality: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Compute overall project health score (0-100)"""
     try:
         project = fetch_project(project_id)
@@ -491,33 +585,13 @@ def compute_project_health_score(project_id: int, progress: Optional[Dict[str, A
         # Get metrics
         schedule_var = compute_schedule_variance(project, spi=spi)
         cost_var = compute_cost_variance(project, project_id)
-        quality = compute_quality_metrics(project_id)
-        
-        # Calculate health components (0-1 scale)
-        schedule_health = min(max(spi, 0), 2) / 2.0  # Normalize SPI to 0-1
-        cost_health = min(max(cpi, 0), 2) / 2.0  # Normalize CPI to 0-1
-        completion_health = max(0, min(1, work_order_completion))  # Clamp to 0-1
+        if quality is None:
+            quality = compute_quality_metrics(project_id)
         
-        # Risk penalty
-        risk_index = float(quality.get("riskIndex", 0))
-        risk_penalty = max(0, 1 - (risk_index / 100))
-        
-        # Weighted health score
-        overall_health = (
-            schedule_health * 0.35 +
-            cost_health * 0.35 +
-            completion_health * 0.20 +
-            risk_penalty * 0.10
-        ) * 100
+        health = blend_health_score(spi, cpi, work_order_completion, float(quality.get("riskIndex", 0)))
         
         return {
-            "healthScore": float(overall_health),
-            "components": {
-                "scheduleHealth": float(schedule_health * 100),
-                "costHealth": float(cost_health * 100),
-                "completionHealth": float(completion_health * 100),
-                "riskScore": float(risk_index)
-            },
+            **health,
             "metrics": {
                 "SPI": spi,
                 "CPI": cpi,
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import db, Project, WorkOrder, WorkOrderStatus
+from .progress import DEFAULT_WEIGHTS, IN_PROGRESS_CREDIT, normalize_weights
+
+# Column order of the per-project status matrices
+STATUS_ORDER = [s.value for s in WorkOrderStatus]
+STATUS_INDEX = {value: i for i, value in enumerate(STATUS_ORDER)}
+_COMPLETED = STATUS_INDEX[WorkOrderStatus.COMPLETED.value]
+_IN_PROGRESS = STATUS_INDEX[WorkOrderStatus.IN_PROGRESS.value]
+_CANCELLED = STATUS_INDEX[WorkOrderStatus.CANCELLED.value]
+
+# The scalar functions work in Decimal and these in float64, so results agree to within
+# this relative tolerance (plus the same absolute tolerance for values near zero)
+PROGRESS_TOLERANCE = 1e-9
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day_number(value: Optional[date]) -> float:
+    return float((value - _EPOCH).days) if value else np.nan
+
+
+def load_work_order_arrays(project_ids: Sequence[int]) -> Dict[str, np.ndarray]:
+    """(projectId, status, estimatedBudget, actualCost) for every work order of the given projects.
+
+    Matches fetch_work_orders: inactive work orders are included. Returns parallel arrays.
+    """
+    if not project_ids:
+        return {
+            "projectId": np.empty(0, dtype=np.int64),
+            "status": np.empty(0, dtype=np.int64),
+            "estimatedBudget": np.empty(0, dtype=float),
+            "actualCost": np.empty(0, dtype=float),
+        }
+    rows = db.session.execute(
+        select(WorkOrder.projectId, WorkOrder.status, WorkOrder.estimatedBudget, WorkOrder.actualCost)
+        .where(WorkOrder.projectId.in_(list(project_ids)))
+    ).all()
+    pending = STATUS_INDEX[WorkOrderStatus.PENDING.value]
+    return {
+        "projectId": np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+        "status": np.fromiter((STATUS_INDEX[r[1].value] if r[1] else pending for r in rows), dtype=np.int64, count=len(rows)),
+        "estimatedBudget": np.fromiter((float(r[2]) if r[2] is not None else 0.0 for r in rows), dtype=float, count=len(rows)),
+        "actualCost": np.fromiter((float(r[3]) if r[3] is not None else 0.0 for r in rows), dtype=float, count=len(rows)),
+    }
+
+
+def group_by_status(project_ids: np.ndarray, work_orders: Dict[str, np.ndarray]):
+    """Per-project, per-status work order counts and estimated budget sums as (projects x statuses) matrices"""
+    n_projects, n_statuses = len(project_ids), len(STATUS_ORDER)
+    counts = np.zeros((n_projects, n_statuses))
+    estimated = np.zeros((n_projects, n_statuses))
+    if n_projects == 0 or work_orders["projectId"].size == 0:
+        return counts, estimated
+
+    order = np.argsort(project_ids)
+    pos = np.searchsorted(project_ids, work_orders["projectId"], sorter=order)
+    pos = np.clip(pos, 0, n_projects - 1)
+    row = order[pos]
+    known = project_ids[row] == work_orders["projectId"]
+
+    cell = row[known] * n_statuses + work_orders["status"][known]
+    size = n_projects * n_statuses
+    counts = np.bincount(cell, minlength=size).reshape(n_projects, n_statuses).astype(float)
+    estimated = np.bincount(cell, weights=work_orders["estimatedBudget"][known], minlength=size).reshape(n_projects, n_statuses)
+    return counts, estimated
+
+
+def compute_progress_arrays(
+    counts: np.ndarray,
+    estimated: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    actual_cost: np.ndarray,
+    today: date,
+    weights: Optional[Dict[str, Any]] = None,
+) -> Dict[str, np.ndarray]:
+    """Array form of compute_work_order_rollup + compute_schedule_stats + compute_earned_value.
+
+    counts/estimated are (projects x statuses) in STATUS_ORDER; start/end are day numbers;
+    actual_cost is the project-level actual cost used as AC. Returns one array per metric.
+    """
+    credit = float(IN_PROGRESS_CREDIT)
+    completed = counts[:, _COMPLETED]
+    in_progress = counts[:, _IN_PROGRESS]
+    total = counts.sum(axis=1)
+    active_total = total - counts[:, _CANCELLED]
+
+    # Cancelled work orders are excluded from the budget baseline
+    est_total = estimated.sum(axis=1) - estimated[:, _CANCELLED]
+    ev = estimated[:, _COMPLETED] + credit * estimated[:, _IN_PROGRESS]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        completion = np.where(active_total > 0, np.clip((completed + credit * in_progress) / active_total, 0, 1), 0.0)
+
+        days_planned = np.maximum(end - start, 1)
+        elapsed = np.minimum(np.maximum(_day_number(today), start), end) - start
+        planned_pct = np.clip(elapsed / days_planned, 0, 1)
+
+        pv = planned_pct * est_total
+        spi = np.where(pv > 0, ev / pv, 0.0)
+        cpi = np.where(actual_cost > 0, ev / actual_cost, 0.0)
+        ev_progress = np.where(est_total > 0, np.clip(ev / est_total, 0, 1), 0.0)
+
+    w = normalize_weights(weights or DEFAULT_WEIGHTS)
+    overall = np.clip(
+        float(w["work_orders"]) * completion + float(w["schedule"]) * planned_pct + float(w["earned_value"]) * ev_progress,
+        0, 1,
+    )
+
+    return {
+        "total": total.astype(np.int64),
+        "completed": completed.astype(np.int64),
+        "in_progress": in_progress.astype(np.int64),
+        "estTotal": est_total,
+        "workOrderCompletion": completion,
+        "scheduleProgress": planned_pct,
+        "daysPlanned": days_planned,
+        "earnedValueProgress": ev_progress,
+        "PV": pv,
+        "EV": ev,
+        "AC": actual_cost,
+        "SPI": spi,
+        "CPI": cpi,
+        "overallProgress": overall,
+    }
+
+
+def compute_progress_many(projects: List[Project], today: Optional[date] = None,
+                          weights: Optional[Dict[str, Any]] = None) -> Dict[int, Dict[str, float]]:
+    """Progress metrics for many projects from one work order query and grouped array math.
+
+    Agrees with compute_project_progress to within PROGRESS_TOLERANCE. Supply costs are not
+    loaded, since they only feed actual_cost_total, which progress does not use.
+    """
+    today = today or date.today()
+    if not projects:
+        return {}
+
+    project_ids = np.fromiter((p.id for p in projects), dtype=np.int64, count=len(projects))
+    counts, estimated = group_by_status(project_ids, load_work_order_arrays(project_ids.tolist()))
+    start = np.fromiter((_day_number(p.startDate) for p in projects), dtype=float, count=len(projects))
+    end = np.fromiter((_day_number(p.endDate) for p in projects), dtype=float, count=len(projects))
+    actual_cost = np.fromiter((float(p.actualCost) if p.actualCost is not None else 0.0 for p in projects), dtype=float, count=len(projects))
+
+    arrays = compute_progress_arrays(counts, estimated, start, end, actual_cost, today, weights)
+    columns = list(arrays)
+    return {
+        int(pid): {col: arrays[col][i].item() for col in columns}
+        for i, pid in enumerate(project_ids)
+    }
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from .models import (
+    db, Project, ProjectVersion, ProjectMember, ProjectManager, ProjectInvitation, WorkOrder, WorkOrderWorker,
+    WorkOrderDependency, BuildingSupply, ElectricalSupply, WorkOrderBuildingSupply, WorkOrderElectricalSupply,
+)
+
+# Rows that belong to a project, and the column holding its ID. Derived tables (audit logs,
+# status stats, metric snapshots) are left out so reads that maintain them do not bump versions.
+PROJECT_COLUMNS = {
+    Project: "id",
+    WorkOrder: "projectId",
+    WorkOrderDependency: "projectId",
+    ProjectMember: "projectId",
+    ProjectManager: "projectId",
+    ProjectInvitation: "projectId",
+    BuildingSupply: "projectId",
+    ElectricalSupply: "projectId",
+}
+
+# Link rows that only know their work order
+WORK_ORDER_COLUMNS = {
+    WorkOrderWorker: "workOrderId",
+    WorkOrderBuildingSupply: "workOrderId",
+    WorkOrderElectricalSupply: "workOrderId",
+}
+
+_versions = ProjectVersion.__table__
+
+
+def bump_project_versions(project_ids: Iterable[Optional[int]], connection=None) -> None:
+    """Increment the version of each project inside the current transaction.
+
+    The ORM does this on flush; call it directly after Core update()/insert() statements on project data.
+    """
+    ids = sorted({int(pid) for pid in project_ids if pid is not None})
+    if not ids:
+        return
+    connection = connection if connection is not None else db.session.connection()
+    now = datetime.utcnow()
+    # Sorted IDs so concurrent writers lock version rows in the same order
+    result = connection.execute(
+        update(_versions).where(_versions.c.projectId.in_(ids)).values(version=_versions.c.version + 1, updatedAt=now)
+    )
+    if result.rowcount < len(ids):
+        # Projects written for the first time (or created before versions existed)
+        existing = set(connection.execute(select(_versions.c.projectId).where(_versions.c.projectId.in_(ids))).scalars())
+        missing = [pid for pid in ids if pid not in existing]
+        if missing:
+            connection.execute(insert(_versions), [{"projectId": pid, "version": 1, "updatedAt": now} for pid in missing])
+
+
+def _column_values(obj, column: str, changed_only: bool) -> Set[int]:
+    """Current and, for edits, previous values of the column (a work order can move projects)"""
+    if changed_only:
+        history = inspect(obj).attrs[column].history
+        values = set(history.added) | set(history.deleted) | set(history.unchanged)
+        return values or {getattr(obj, column)}
+    return {getattr(obj, column)}
+
+
+def _collect(session: Session, objects, changed_only: bool) -> None:
+    projects, work_orders = session.info["_version_projects"], session.info["_version_work_orders"]
+    for obj in objects:
+        model = type(obj)
+        if model in PROJECT_COLUMNS:
+            target, column = projects, PROJECT_COLUMNS[model]
+        elif model in WORK_ORDER_COLUMNS:
+            target, column = work_orders, WORK_ORDER_COLUMNS[model]
+        else:
+            continue
+        if changed_only and not session.is_modified(obj, include_collections=False):
+            continue
+        target |= _column_values(obj, column, changed_only)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    # Edits and deletes are read before the flush, while their old values are still loaded
+    session.info["_version_projects"] = set()
+    session.info["_version_work_orders"] = set()
+    _collect(session, session.dirty, changed_only=True)
+    _collect(session, session.deleted, changed_only=False)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    # New rows are read after the flush, once their IDs and foreign keys are assigned
+    if "_version_projects" not in session.info:
+        return
+    _collect(session, session.new, changed_only=False)
+    projects = session.info.pop("_version_projects")
+    work_orders = {wid for wid in session.info.pop("_version_work_orders") if wid is not None}
+    connection = session.connection()
+    if work_orders:
+        projects |= set(connection.execute(select(WorkOrder.projectId).where(WorkOrder.id.in_(work_orders))).scalars())
+    bump_project_versions(projects, connection)
+
+
+def init_project_versions() -> None:
+    """Bump project versions on every ORM flush that touches project data"""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "after_flush", _after_flush)
+
+
+def get_project_version(project_id: int) -> int:
+    """Current version of a project (0 if nothing has been written since versions were introduced)"""
+    return db.session.query(ProjectVersion.version).filter(ProjectVersion.projectId == project_id).scalar() or 0
+
+
+def get_project_versions(project_ids: Iterable[int]) -> Dict[int, int]:
+    ids = {int(pid) for pid in project_ids}
+    if not ids:
+        return {}
+    rows = db.session.query(ProjectVersion.projectId, ProjectVersion.version).filter(ProjectVersion.projectId.in_(ids)).all()
+    versions = {pid: 0 for pid in ids}
+    versions.update(dict(rows))
+    return versions
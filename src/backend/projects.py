@@ -2,17 +2,16 @@ from __future__ import annotations
 
 import json
 import uuid
-from collections import defaultdict
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import Dict, Any, List, Optional, Tuple
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
-from .models import db, User, Project, ProjectStatus, UserRole, WorkOrder, WorkOrderStatus, Audit, AuditEntityType, ProjectMember, ProjectInvitation, SupplyStatus, BuildingSupply, ElectricalSupply, WorkOrderBuildingSupply, WorkOrderElectricalSupply, ProjectManager, WorkerType, NotificationPreference, NotificationDismissal
+from .models import db, User, Project, ProjectStatus, UserRole, WorkOrder, WorkOrderStatus, WorkOrderDependency, Audit, AuditEntityType, ProjectMember, ProjectInvitation, SupplyStatus, BuildingSupply, ElectricalSupply, WorkOrderBuildingSupply, WorkOrderElectricalSupply, ProjectManager, WorkerType, NotificationPreference, NotificationDismissal
 
 # Simple in-memory cache for catalog queries
 _catalog_cache = {}
@@ -23,7 +22,21 @@ from .progress import (
     compute_project_progress
 )
 from .email_service import create_project_invitation, send_invitation_email, validate_invitation_token, accept_invitation
-from .notification_service import notify_project_managers_of_change
+from .audit_buffer import record_audit
+from .prometheus_metrics import record_cache
+from .report_export import EXPORT_FORMATS, build_report_metrics, export_stream
+from .portfolio import build_portfolio_report
+from .pagination import parse_limit, encode_cursor, decode_datetime_cursor, keyset_before
+from .audit_archive import ArchiveNotConfiguredError, archive_audit_logs, archive_cutoff, load_archived_audits, archived_audit_to_dict
+from .assignment_service import load_users_by_id
+from .status_analytics import DEFAULT_THROUGHPUT_WEEKS, compute_status_analytics
+from .progress_vectorized import compute_progress_many
+from .forecasting import MAX_SCENARIOS, forecast_project
+from .monte_carlo import DEFAULT_ITERATIONS, MAX_ITERATIONS, monte_carlo_forecast
+from .scheduling import MAX_DELAY_DAYS, ScheduleCycleError, build_schedule_report, cascade_delay, invalidate_schedule, would_create_cycle
+from .conditional import conditional, project_validators, project_metrics_validators, user_projects_validators
+from .serializers import PROJECT_SERIALIZER, BUILDING_SUPPLY_SERIALIZER, ELECTRICAL_SUPPLY_SERIALIZER, parse_selection, serialize
+from .metric_snapshots import HISTORY_AGGREGATES, HISTORY_INTERVALS, default_interval, load_metric_history, take_metric_snapshots
 
 projects_bp = Blueprint("projects", __name__, url_prefix="/api/projects")
 
@@ -46,42 +59,22 @@ def can_edit_frozen_project(user, data):
 
 
 def create_audit_log(entity_type: AuditEntityType, entity_id: int, user_id: int, field: str, old_value: str, new_value: str, session_id: str = None, project_id: int = None):
-    """Helper function to create an audit log entry and notify project managers"""
-    audit_log = Audit(
-        entityType=entity_type,
-        entityId=entity_id,
-        userId=user_id,
-        field=field,
-        oldValue=old_value,
-        newValue=new_value,
-        sessionId=session_id,
-        projectId=project_id
-    )
-    db.session.add(audit_log)
+    """Helper function to queue an audit log entry; it is written when the session commits.
 
-    # Notify project managers of important changes
-    # Only notify for project-level changes (not work order changes from this file)
-    if entity_type == AuditEntityType.PROJECT and project_id:
-        try:
-            # Get entity name if it's a project
-            project = Project.query.get(project_id) if project_id else None
-            entity_name = project.name if project else None
-
-            notify_project_managers_of_change(
-                entity_type=entity_type,
-                entity_id=entity_id,
-                project_id=project_id,
-                user_id=user_id,
-                field=field,
-                old_value=old_value,
-                new_value=new_value,
-                entity_name=entity_name
-            )
-        except Exception as e:
-            # Log error but don't fail the audit log creation
-            import traceback
-            print(f"Failed to send notification for audit log: {str(e)}")
-            print(traceback.format_exc())
+    Only project-level changes notify managers (work order changes notify from workorders.py),
+    consolidated with the other changes made in the same request.
+    """
+    record_audit(
+        entity_type,
+        entity_id,
+        user_id,
+        field,
+        old_value,
+        new_value,
+        session_id,
+        project_id,
+        notify=entity_type == AuditEntityType.PROJECT and bool(project_id)
+    )
 
 
 def get_crew_member_names(crew_json: str) -> str:
@@ -238,6 +231,7 @@ def delete_project(project_id):
 
 @projects_bp.get("/")
 @jwt_required()
+@conditional(user_projects_validators)
 def get_projects():
     """Get projects based on user role:
     - Project managers: projects they manage
@@ -249,15 +243,21 @@ def get_projects():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    try:
+        selection = parse_selection(request.args, PROJECT_SERIALIZER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    options = PROJECT_SERIALIZER.query_options(selection)
+
     if user.role == UserRole.PROJECT_MANAGER:
         # Project managers see projects they manage
-        projects = Project.query.filter_by(projectManagerId=user_id, isActive=True).all()
+        projects = Project.query.options(*options).filter_by(projectManagerId=user_id, isActive=True).all()
     elif user.role == UserRole.WORKER:
         # Workers only see projects they are members of
         project_memberships = ProjectMember.query.filter_by(userId=user_id, isActive=True).all()
         project_ids = [pm.projectId for pm in project_memberships]
         if project_ids:
-            projects = Project.query.filter(
+            projects = Project.query.options(*options).filter(
                 Project.id.in_(project_ids),
                 Project.isActive == True
             ).all()
@@ -265,16 +265,17 @@ def get_projects():
             projects = []
     elif user.role == UserRole.ADMIN:
         # Admins see all projects
-        projects = Project.query.filter_by(isActive=True).all()
+        projects = Project.query.options(*options).filter_by(isActive=True).all()
     else:
         # Unknown role - return empty list
         projects = []
 
-    return jsonify({"projects": [project.to_dict() for project in projects]}), 200
+    return jsonify({"projects": serialize(projects, selection)}), 200
 
 
 @projects_bp.get("/<int:project_id>")
 @jwt_required()
+@conditional(project_validators)
 def get_project(project_id):
     """Get a specific project by ID (with access control)"""
 
@@ -288,20 +289,7 @@ def get_project(project_id):
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
-    # Access control: Check if user has permission to view this project
-    if user.role == UserRole.ADMIN:
-        # Admins can view all projects
-        pass
-    elif user.role == UserRole.PROJECT_MANAGER:
-        # Project managers can only view projects they manage (check both legacy and new relation)
-        if not is_project_manager(user_id, project_id):
-            return jsonify({"error": "You do not have permission to view this project"}), 403
-    elif user.role == UserRole.WORKER:
-        # Workers can only view projects they are members of
-        if not is_project_member(user_id, project_id):
-            return jsonify({"error": "You do not have permission to view this project"}), 403
-    else:
-        # Unknown role - deny access
+    if not user_can_view_project(user, project):
         return jsonify({"error": "You do not have permission to view this project"}), 403
 
     # Recalculate project actual cost if it's NULL (for existing projects)
@@ -318,6 +306,7 @@ def get_project(project_id):
 
 @projects_bp.get("/my-projects")
 @jwt_required()
+@conditional(user_projects_validators)
 def get_my_projects():
     """Get projects for the current user:
     - Project managers: projects they manage
@@ -329,16 +318,23 @@ def get_my_projects():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    try:
+        selection = parse_selection(request.args, PROJECT_SERIALIZER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # actualCost is always read below to backfill missing costs
+    options = PROJECT_SERIALIZER.query_options(selection, extra_columns=("actualCost",))
+
     if user.role == UserRole.ADMIN:
         # Admins can see all projects
-        projects = Project.query.filter_by(isActive=True).all()
+        projects = Project.query.options(*options).filter_by(isActive=True).all()
     elif user.role == UserRole.WORKER:
         # Workers ONLY see projects where they are active members (not managers or invited)
         member_proj_ids = [m.projectId for m in ProjectMember.query.filter_by(userId=user_id, isActive=True).all()]
         if not member_proj_ids:
             projects = []
         else:
-            projects = Project.query.filter(Project.isActive == True, Project.id.in_(member_proj_ids)).all()
+            projects = Project.query.options(*options).filter(Project.isActive == True, Project.id.in_(member_proj_ids)).all()
     else:
         # Project managers: Combine projects where user is a manager (new table + legacy field)
         manager_proj_ids = [pm.projectId for pm in ProjectManager.query.filter_by(userId=user_id, isActive=True).all()]
@@ -360,7 +356,7 @@ def get_my_projects():
         if not proj_ids:
             projects = []
         else:
-            projects = Project.query.filter(Project.isActive == True, Project.id.in_(list(proj_ids))).all()
+            projects = Project.query.options(*options).filter(Project.isActive == True, Project.id.in_(list(proj_ids))).all()
 
     # Recalculate actual costs for projects that have NULL (for existing projects)
     updated_any = False
@@ -376,7 +372,7 @@ def get_my_projects():
             if project.actualCost is None:
                 db.session.refresh(project)
 
-    return jsonify({"projects": [project.to_dict() for project in projects]}), 200
+    return jsonify({"projects": serialize(projects, selection)}), 200
 
 
 @projects_bp.put("/<int:project_id>")
@@ -515,7 +511,8 @@ def update_project(project_id):
                         "teamMembers", 
                         old_member_names, 
                         new_member_names, 
-                        session_id
+                        session_id,
+                        project_id
                     )
                     project.set_crew_members(member_ids)
                     print(f"[DEBUG] Set crew members to: {member_ids}")
@@ -622,6 +619,20 @@ def worker_update_project(project_id):
     return jsonify({"error": "Workers are not allowed to update project details"}), 403
 
 
+AUDIT_PAGE_SIZE = 100
+AUDIT_MAX_PAGE_SIZE = 500
+
+
+def _parse_audit_bound(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """Parse a since/until filter given as YYYY-MM-DD or a full ISO timestamp"""
+    if not value:
+        return None
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return day + timedelta(days=1) - timedelta(microseconds=1) if end_of_day else day
+    return datetime.fromisoformat(value)
+
+
 @projects_bp.get("/<int:project_id>/audit-logs")
 @jwt_required()
 def get_project_audit_logs(project_id):
@@ -651,38 +662,69 @@ def get_project_audit_logs(project_id):
         if not has_access:
             return jsonify({"error": "Access denied"}), 403
 
-        # Get audit logs for this project (project, work order, and supply logs)
-        # Use eager loading to avoid N+1 queries for user relationships
-        project_audit_logs = Audit.query.options(
-            joinedload(Audit.user)
-        ).filter_by(
-            entityType=AuditEntityType.PROJECT,
-            entityId=project_id
-        ).all()
-
-        # Get work order audit logs for work orders in this project
-        work_order_audit_logs = Audit.query.options(
-            joinedload(Audit.user)
-        ).filter(
-            Audit.entityType == AuditEntityType.WORK_ORDER,
-            Audit.projectId == project_id
-        ).all()
-
-        # Get supply audit logs for supplies in this project
-        supply_audit_logs = Audit.query.options(
-            joinedload(Audit.user)
-        ).filter(
-            Audit.entityType == AuditEntityType.SUPPLY,
-            Audit.projectId == project_id
-        ).all()
+        try:
+            limit = parse_limit(request.args.get("limit"), AUDIT_PAGE_SIZE, AUDIT_MAX_PAGE_SIZE)
+            cursor = decode_datetime_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+            since = _parse_audit_bound(request.args.get("since"))
+            until = _parse_audit_bound(request.args.get("until"), end_of_day=True)
+            entity_types = [AuditEntityType(t) for t in request.args.get("entityType", "").split(",") if t]
+            user_filter = int(request.args["userId"]) if request.args.get("userId") else None
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+        fields = [f for f in request.args.get("field", "").split(",") if f]
+        include_archived = request.args.get("includeArchived", "true").lower() != "false"
+
+        # One query over every entity type, a plain equality so it stays on ix_audit_logs_project_created.
+        # Older project-level rows written without projectId must be backfilled (see docs/BackendAPI.md).
+        query = Audit.query.options(joinedload(Audit.user)).filter(Audit.projectId == project_id)
+        if entity_types:
+            query = query.filter(Audit.entityType.in_(entity_types))
+        if fields:
+            query = query.filter(Audit.field.in_(fields))
+        if user_filter is not None:
+            query = query.filter(Audit.userId == user_filter)
+        if since:
+            query = query.filter(Audit.createdAt >= since)
+        if until:
+            query = query.filter(Audit.createdAt <= until)
+        if cursor:
+            query = query.filter(keyset_before(Audit.createdAt, Audit.id, *cursor))
+
+        # Fetch one extra row to know whether another page exists
+        all_audit_logs = query.order_by(Audit.createdAt.desc(), Audit.id.desc()).limit(limit + 1).all()
+
+        # Once the hot table runs out, continue into archived segments with the same filters.
+        # Archived rows are always older than hot rows, so one (createdAt, id) cursor spans both.
+        archived_logs = []
+        archive_incomplete = False
+        if len(all_audit_logs) <= limit and include_archived:
+            boundary = (all_audit_logs[-1].createdAt, all_audit_logs[-1].id) if all_audit_logs else cursor
+            archived_logs, archive_incomplete = load_archived_audits(
+                project_id,
+                limit + 1 - len(all_audit_logs),
+                entity_types=entity_types,
+                fields=fields,
+                user_id=user_filter,
+                since=since,
+                until=until,
+                before=boundary,
+            )
 
-        # Combine and sort all audit logs by creation date
-        all_audit_logs = project_audit_logs + work_order_audit_logs + supply_audit_logs
-        all_audit_logs.sort(key=lambda log: log.createdAt if log.createdAt else datetime.min, reverse=True)
+        has_more = len(all_audit_logs) + len(archived_logs) > limit
+        all_audit_logs = all_audit_logs[:limit]
+        archived_logs = archived_logs[:limit - len(all_audit_logs)]
+        next_cursor = None
+        if has_more:
+            if archived_logs:
+                next_cursor = encode_cursor(archived_logs[-1]["createdAt"], archived_logs[-1]["id"])
+            else:
+                next_cursor = encode_cursor(all_audit_logs[-1].createdAt, all_audit_logs[-1].id)
 
         # Batch load work orders and supplies to avoid N+1 queries
         work_order_ids = {log.entityId for log in all_audit_logs if log.entityType == AuditEntityType.WORK_ORDER}
         supply_ids = {log.entityId for log in all_audit_logs if log.entityType == AuditEntityType.SUPPLY}
+        work_order_ids |= {row["entityId"] for row in archived_logs if row["entityType"] == AuditEntityType.WORK_ORDER.value}
+        supply_ids |= {row["entityId"] for row in archived_logs if row["entityType"] == AuditEntityType.SUPPLY.value}
 
         work_orders = {}
         if work_order_ids:
@@ -724,7 +766,18 @@ def get_project_audit_logs(project_id):
                     "error": "Failed to load full details"
                 })
 
-        return jsonify({"auditLogs": audit_logs_dict}), 200
+        if archived_logs:
+            users_by_id = load_users_by_id(row["userId"] for row in archived_logs if row["userId"])
+            audit_logs_dict.extend(
+                archived_audit_to_dict(row, users_by_id, work_orders, supplies) for row in archived_logs
+            )
+
+        return jsonify({
+            "auditLogs": audit_logs_dict,
+            "nextCursor": next_cursor,
+            "hasMore": has_more,
+            "archiveIncomplete": archive_incomplete,
+        }), 200
 
     except Exception as e:
         import traceback
@@ -1157,18 +1210,15 @@ def _parse_weights_from_query(args) -> Optional[Dict[str, Decimal]]:
     return normalize_weights(w)
 
 
-def _summary_shape(project: Project, rollup: Dict[str, Any], schedule: Dict[str, Any], ev: Dict[str, Any]) -> Dict[str, Any]:
-    wo_completion = float(rollup["completion_ratio"])
-    schedule_progress = float(schedule["planned_pct_time_elapsed"])
-    est_total = to_decimal(rollup["budget"]["est_total"])
-    ev_progress = float((ev["ev"] / est_total) if est_total > 0 else Decimal("0"))
-
-    spi = float(ev["spi"])
-    cpi = float(ev["cpi"])
+def _summary_shape(project: Project, metrics: Dict[str, Any], weighted: bool = False) -> Dict[str, Any]:
+    """Dashboard row from one project's compute_progress_many entry"""
+    spi = metrics["SPI"]
+    cpi = metrics["CPI"]
     schedule_health = "ahead" if spi > 1.02 else "behind" if spi < 0.98 else "on_track"
     cost_health = "under" if cpi > 1.02 else "over" if cpi < 0.98 else "on_budget"
 
-    overall = round((0.5 * wo_completion) + (0.2 * schedule_progress) + (0.3 * ev_progress), 4)
+    # Custom weights are reported unrounded; the default 50/20/30 blend is rounded for display
+    overall = metrics["overallProgress"] if weighted else round(metrics["overallProgress"], 4)
 
     return {
         "projectId": project.id,
@@ -1176,15 +1226,15 @@ def _summary_shape(project: Project, rollup: Dict[str, Any], schedule: Dict[str,
         "status": project.status.value if project.status else None,
         "priority": project.priority,
         "overallProgress": overall,
-        "workOrderCompletion": wo_completion,
-        "scheduleProgress": schedule_progress,
+        "workOrderCompletion": metrics["workOrderCompletion"],
+        "scheduleProgress": metrics["scheduleProgress"],
         "SPI": spi,
         "CPI": cpi,
         "badges": {"schedule": schedule_health, "cost": cost_health},
         "counts": {
-            "total": rollup["counts"]["total"],
-            "completed": rollup["counts"]["completed"],
-            "in_progress": rollup["counts"]["in_progress"],
+            "total": metrics["total"],
+            "completed": metrics["completed"],
+            "in_progress": metrics["in_progress"],
         },
     }
 
@@ -1213,6 +1263,53 @@ def _paginate(items: List[dict], page: int, page_size: int) -> Tuple[List[dict],
     return items[start:end], total
 
 
+@projects_bp.get("/portfolio")
+@jwt_required()
+def get_portfolio_report():
+    """
+    Portfolio rollup across every project the user can see.
+
+    Query params (optional):
+      status=planning|initiated|regulatory_scoping|design_procurement|construction_prep|
+             in_construction|commissioning|energized|closeout|on_hold|cancelled|archived
+      date=YYYY-MM-DD
+      includeProjects=true|false
+      limit=N   (max per-project rows when includeProjects=true)
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    status = None
+    if request.args.get("status"):
+        try:
+            status = ProjectStatus(request.args.get("status"))
+        except ValueError:
+            return jsonify({"error": "Invalid status value"}), 400
+
+    try:
+        today = _parse_iso_date(request.args.get("date"))
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify({"error": "Invalid date (YYYY-MM-DD) or limit value"}), 400
+
+    try:
+        report = build_portfolio_report(
+            user,
+            status=status,
+            today=today,
+            include_projects=request.args.get("includeProjects", "false").lower() == "true",
+            limit=limit,
+        )
+        return jsonify(report), 200
+    except Exception as e:
+        import traceback
+        print(f"Error in get_portfolio_report: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": f"Failed to build portfolio report: {str(e)}"}), 500
+
+
 @projects_bp.get("/dashboard")
 @jwt_required()
 def get_dashboard_progress():
@@ -1283,30 +1380,9 @@ def get_dashboard_progress():
         if not projects:
             return jsonify({"count": 0, "page": page, "pageSize": page_size, "results": []}), 200
 
-        proj_ids = [p.id for p in projects]
-        wos = db.session.execute(select(WorkOrder).where(WorkOrder.projectId.in_(proj_ids))).scalars().all()
-        by_project: Dict[int, List[WorkOrder]] = defaultdict(list)
-        for w in wos:
-            by_project[w.projectId].append(w)
-
-        results: List[dict] = []
-        for p in projects:
-            rollup = compute_work_order_rollup(by_project.get(p.id, []))
-            schedule = compute_schedule_stats(p, today=today)
-            ev = compute_earned_value(rollup, p, schedule)
-            item = _summary_shape(p, rollup, schedule, ev)
-
-            if weights:
-                wo = float(rollup["completion_ratio"])
-                sc = float(schedule["planned_pct_time_elapsed"])
-                est_total = to_decimal(rollup["budget"]["est_total"])
-                ev_prog = float((ev["ev"] / est_total) if est_total > 0 else Decimal("0"))
-                overall = float(
-                    min(1.0, max(0.0, weights["work_orders"] * wo + weights["schedule"] * sc + weights["earned_value"] * ev_prog))
-                )
-                item["overallProgress"] = overall
-
-            results.append(item)
+        # One work order query and grouped array math for every project on the dashboard
+        progress_by_id = compute_progress_many(projects, today=today, weights=weights)
+        results: List[dict] = [_summary_shape(p, progress_by_id[p.id], weighted=bool(weights)) for p in projects]
 
         results = _apply_sort(results, sort_str)
         page_items, total = _paginate(results, page, page_size)
@@ -1340,20 +1416,7 @@ def get_project_progress_detail(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         wos = WorkOrder.query.filter_by(projectId=project_id, isActive=True).all()
@@ -1405,6 +1468,18 @@ def is_project_member(user_id: int, project_id: int) -> bool:
     return membership is not None
 
 
+def user_can_view_project(user: User, project: Project) -> bool:
+    """Read access to a project: admins see every project, project managers the ones they manage,
+    workers the ones they are members of; any other role is denied"""
+    if user.role == UserRole.ADMIN:
+        return True
+    if user.role == UserRole.PROJECT_MANAGER:
+        return is_project_manager(user.id, project.id)
+    if user.role == UserRole.WORKER:
+        return is_project_member(user.id, project.id)
+    return False
+
+
 @projects_bp.get("/<int:project_id>/members")
 @jwt_required()
 def get_project_members(project_id: int):
@@ -1888,6 +1963,7 @@ def get_supplies_catalog():
     # Check cache for categories (categories don't change often)
     categories_cache_key = _get_categories_cache_key(supply_type)
     cached_categories = _catalog_cache.get(categories_cache_key)
+    record_cache("catalog_categories", _is_cache_valid(cached_categories))
     if _is_cache_valid(cached_categories):
         categories_data = cached_categories["data"]
     else:
@@ -1929,6 +2005,8 @@ def get_supplies_catalog():
 
     # Only use cache if no search term and no category filter (most common case)
     use_cache = not search_term and not category and _is_cache_valid(cached_data)
+    if not search_term and not category:
+        record_cache("catalog_page", use_cache)
 
     if use_cache:
         return jsonify(cached_data["data"]), 200
@@ -2033,6 +2111,7 @@ def get_supplies_catalog():
 
 @projects_bp.get("/<int:project_id>/supplies")
 @jwt_required()
+@conditional(project_validators)
 def get_project_supplies(project_id):
     """Get all supplies for a project (pending + approved). Optionally filter by workOrderId."""
     user_id = int(get_jwt_identity())
@@ -2044,28 +2123,25 @@ def get_project_supplies(project_id):
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
-    # Access control: Check if user has permission to view this project
-    if user.role == UserRole.ADMIN:
-        # Admins can view all projects
-        pass
-    elif user.role == UserRole.PROJECT_MANAGER:
-        # Project managers can only view projects they manage
-        if not is_project_manager(user_id, project_id):
-            return jsonify({"error": "You do not have permission to view this project"}), 403
-    elif user.role == UserRole.WORKER:
-        # Workers can only view projects they are members of
-        if not is_project_member(user_id, project_id):
-            return jsonify({"error": "You do not have permission to view this project"}), 403
-    else:
-        # Unknown role - deny access
+    if not user_can_view_project(user, project):
         return jsonify({"error": "You do not have permission to view this project"}), 403
 
     # Get optional workOrderId from query parameters
     work_order_id = request.args.get("workOrderId", type=int)
 
-    # Query both BuildingSupply and ElectricalSupply
-    building_query = BuildingSupply.query.filter_by(projectId=project_id)
-    electrical_query = ElectricalSupply.query.filter_by(projectId=project_id)
+    # Both supply tables share field names, so one selection applies to each
+    try:
+        selection = parse_selection(request.args, BUILDING_SUPPLY_SERIALIZER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Query both BuildingSupply and ElectricalSupply (createdAt is the sort key)
+    building_query = BuildingSupply.query.options(
+        *BUILDING_SUPPLY_SERIALIZER.query_options(selection, extra_columns=("createdAt",))
+    ).filter_by(projectId=project_id)
+    electrical_query = ElectricalSupply.query.options(
+        *ELECTRICAL_SUPPLY_SERIALIZER.query_options(selection, extra_columns=("createdAt",))
+    ).filter_by(projectId=project_id)
 
     # Filter by work order if provided (using appropriate junction tables)
     if work_order_id:
@@ -2089,7 +2165,7 @@ def get_project_supplies(project_id):
     all_supplies = list(building_supplies) + list(electrical_supplies)
     all_supplies.sort(key=lambda s: s.createdAt, reverse=True)
 
-    return jsonify({"supplies": [s.to_dict() for s in all_supplies]}), 200
+    return jsonify({"supplies": serialize(all_supplies, selection)}), 200
 
 
 
@@ -2499,6 +2575,7 @@ def update_project_supply(project_id, supply_id):
 
 @projects_bp.get("/<int:project_id>/workorders/<int:workorder_id>/supplies")
 @jwt_required()
+@conditional(project_validators)
 def get_workorder_supplies(project_id, workorder_id):
     """Get all supplies assigned to a specific work order."""
     user_id = get_jwt_identity()
@@ -2511,13 +2588,20 @@ def get_workorder_supplies(project_id, workorder_id):
     if not workorder:
         return jsonify({"error": "Work order not found or does not belong to this project"}), 404
 
+    try:
+        selection = parse_selection(request.args, BUILDING_SUPPLY_SERIALIZER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Get building supplies linked to this work order
     building_links = WorkOrderBuildingSupply.query.filter_by(
         workOrderId=workorder_id,
         isActive=True
     ).all()
     building_supply_ids = [link.buildingSupplyId for link in building_links]
-    building_supplies = BuildingSupply.query.filter(
+    building_supplies = BuildingSupply.query.options(
+        *BUILDING_SUPPLY_SERIALIZER.query_options(selection, extra_columns=("createdAt",))
+    ).filter(
         BuildingSupply.id.in_(building_supply_ids),
         BuildingSupply.projectId == project_id
     ).all() if building_supply_ids else []
@@ -2528,7 +2612,9 @@ def get_workorder_supplies(project_id, workorder_id):
         isActive=True
     ).all()
     electrical_supply_ids = [link.electricalSupplyId for link in electrical_links]
-    electrical_supplies = ElectricalSupply.query.filter(
+    electrical_supplies = ElectricalSupply.query.options(
+        *ELECTRICAL_SUPPLY_SERIALIZER.query_options(selection, extra_columns=("createdAt",))
+    ).filter(
         ElectricalSupply.id.in_(electrical_supply_ids),
         ElectricalSupply.projectId == project_id
     ).all() if electrical_supply_ids else []
@@ -2537,7 +2623,7 @@ def get_workorder_supplies(project_id, workorder_id):
     all_supplies = list(building_supplies) + list(electrical_supplies)
     all_supplies.sort(key=lambda s: s.createdAt, reverse=True)
 
-    return jsonify({"supplies": [s.to_dict() for s in all_supplies]}), 200
+    return jsonify({"supplies": serialize(all_supplies, selection)}), 200
 
 
 @projects_bp.post("/<int:project_id>/workorders/<int:workorder_id>/supplies/<int:supply_id>")
@@ -2698,20 +2784,7 @@ def get_schedule_metrics(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         metrics = compute_schedule_variance(project)
@@ -2735,20 +2808,7 @@ def get_cost_metrics(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         metrics = compute_cost_variance(project, project_id)
@@ -2772,20 +2832,7 @@ def get_workforce_metrics(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         metrics = compute_workforce_metrics(project_id)
@@ -2809,20 +2856,7 @@ def get_quality_metrics(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         metrics = compute_quality_metrics(project_id)
@@ -2831,6 +2865,389 @@ def get_quality_metrics(project_id: int):
         return jsonify({"error": str(e)}), 500
 
 
+@projects_bp.get("/<int:project_id>/metrics/status-analytics")
+@jwt_required()
+def get_status_analytics(project_id: int):
+    """Get rework rate, time in status, cycle time and throughput from the status audit trail"""
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        try:
+            weeks = int(request.args.get("weeks", DEFAULT_THROUGHPUT_WEEKS))
+        except ValueError:
+            return jsonify({"error": "weeks must be a number"}), 400
+        if weeks < 1 or weeks > 104:
+            return jsonify({"error": "weeks must be between 1 and 104"}), 400
+
+        metrics = compute_status_analytics(project_id, weeks=weeks)
+        return jsonify(metrics), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.post("/<int:project_id>/forecast")
+@jwt_required()
+def forecast_project_scenarios(project_id: int):
+    """
+    What-if forecast: apply proposed work order / project changes in memory and report
+    the resulting SPI, CPI, EV/PV/AC, forecastEndDate, health and risk. Nothing is saved.
+
+    Body:
+      scenarios: [{ name?, workOrders: [{ id, status?, startDate?, endDate?, estimatedBudget?, actualCost? }],
+                    project?: { startDate?, endDate? } }]
+      date: YYYY-MM-DD (optional, evaluation date)
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        scenarios = payload.get("scenarios")
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({"error": "scenarios must be a non-empty list"}), 400
+        if len(scenarios) > MAX_SCENARIOS:
+            return jsonify({"error": f"At most {MAX_SCENARIOS} scenarios per request"}), 400
+
+        try:
+            today = _parse_iso_date(payload.get("date"))
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        report, errors = forecast_project(project_id, scenarios, today=today)
+        if errors:
+            return jsonify({"error": "One or more scenarios are invalid", "errors": errors}), 400
+        return jsonify(report), 200
+    except Exception as e:
+        import traceback
+        print(f"Error in forecast_project_scenarios: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.get("/<int:project_id>/forecast/monte-carlo")
+@jwt_required()
+def get_monte_carlo_forecast(project_id: int):
+    """
+    Probabilistic completion date and cost: P50/P80/P95 from a Monte Carlo simulation that
+    resamples historical actual-vs-planned durations and actual-vs-estimated costs.
+
+    Query params:
+      iterations: number of simulated outcomes (default 10000, max 100000)
+      seed: optional integer for reproducible results
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        try:
+            iterations = int(request.args.get("iterations", DEFAULT_ITERATIONS))
+            seed = request.args.get("seed")
+            seed = int(seed) if seed not in (None, "") else None
+        except ValueError:
+            return jsonify({"error": "iterations and seed must be integers"}), 400
+        if iterations < 1 or iterations > MAX_ITERATIONS:
+            return jsonify({"error": f"iterations must be between 1 and {MAX_ITERATIONS}"}), 400
+        if seed is not None and seed < 0:
+            return jsonify({"error": "seed must be a non-negative integer"}), 400
+
+        return jsonify(monte_carlo_forecast(project, iterations=iterations, seed=seed)), 200
+    except Exception as e:
+        import traceback
+        print(f"Error in get_monte_carlo_forecast: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.get("/<int:project_id>/schedule")
+@jwt_required()
+def get_project_schedule(project_id: int):
+    """
+    Critical path schedule: early/late start and finish, total and free slack for every
+    work order, computed from the work order dependencies.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        return jsonify(build_schedule_report(project)), 200
+    except ScheduleCycleError:
+        return jsonify({"error": "Work order dependencies form a cycle; remove one to compute the schedule"}), 409
+    except Exception as e:
+        import traceback
+        print(f"Error in get_project_schedule: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.post("/<int:project_id>/schedule/impact")
+@jwt_required()
+def get_schedule_impact(project_id: int):
+    """
+    Cascade a slip through the dependency graph without saving anything.
+
+    Body:
+      workOrderId: the work order that slips
+      delayDays: days its finish moves (negative to finish early)
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        try:
+            work_order_id = int(payload.get("workOrderId"))
+            delay_days = int(payload.get("delayDays"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "workOrderId and delayDays must be integers"}), 400
+        if abs(delay_days) > MAX_DELAY_DAYS:
+            return jsonify({"error": f"delayDays must be between -{MAX_DELAY_DAYS} and {MAX_DELAY_DAYS}"}), 400
+
+        try:
+            impact = cascade_delay(project, work_order_id, delay_days)
+        except KeyError:
+            return jsonify({"error": "Work order not found in this project's schedule"}), 404
+        return jsonify(impact), 200
+    except ScheduleCycleError:
+        return jsonify({"error": "Work order dependencies form a cycle; remove one to compute the schedule"}), 409
+    except Exception as e:
+        import traceback
+        print(f"Error in get_schedule_impact: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.get("/<int:project_id>/schedule/dependencies")
+@jwt_required()
+def get_schedule_dependencies(project_id: int):
+    """List the finish-to-start dependencies between this project's work orders"""
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        dependencies = WorkOrderDependency.query.filter_by(projectId=project_id).order_by(WorkOrderDependency.id).all()
+        return jsonify({"dependencies": [d.to_dict() for d in dependencies]}), 200
+    except Exception as e:
+        import traceback
+        print(f"Error in get_schedule_dependencies: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+
+@projects_bp.post("/<int:project_id>/schedule/dependencies")
+@jwt_required()
+def add_schedule_dependency(project_id: int):
+    """Add a finish-to-start dependency between two work orders (only project managers can do this)"""
+    # Check if user is a project manager
+    auth_error = require_project_manager()
+    if auth_error:
+        return auth_error
+
+    # Check if project exists
+    project = Project.query.filter_by(id=project_id, isActive=True).first()
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    # Check if current user is a manager of this project
+    user_id = int(get_jwt_identity())
+    if not is_project_manager(user_id, project_id):
+        return jsonify({"error": "You can only change dependencies on projects you manage"}), 403
+
+    if is_project_frozen(project):
+        return jsonify({"error": "Cannot change dependencies on archived or cancelled projects"}), 400
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        predecessor_id = int(payload.get("predecessorId"))
+        successor_id = int(payload.get("successorId"))
+        lag_days = int(payload.get("lagDays") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "predecessorId, successorId and lagDays must be integers"}), 400
+    if predecessor_id == successor_id:
+        return jsonify({"error": "A work order cannot depend on itself"}), 400
+    if abs(lag_days) > MAX_DELAY_DAYS:
+        return jsonify({"error": f"lagDays must be between -{MAX_DELAY_DAYS} and {MAX_DELAY_DAYS}"}), 400
+
+    work_orders = WorkOrder.query.filter(
+        WorkOrder.id.in_([predecessor_id, successor_id]), WorkOrder.projectId == project_id, WorkOrder.isActive == True
+    ).all()
+    if len(work_orders) != 2:
+        return jsonify({"error": "Both work orders must belong to this project"}), 404
+
+    if WorkOrderDependency.query.filter_by(predecessorId=predecessor_id, successorId=successor_id).first():
+        return jsonify({"error": "This dependency already exists"}), 409
+    try:
+        if would_create_cycle(project_id, predecessor_id, successor_id):
+            return jsonify({"error": "This dependency would create a cycle"}), 409
+    except ScheduleCycleError:
+        return jsonify({"error": "Work order dependencies form a cycle; remove one before adding more"}), 409
+
+    dependency = WorkOrderDependency(
+        projectId=project_id,
+        predecessorId=predecessor_id,
+        successorId=successor_id,
+        lagDays=lag_days,
+        createdBy=user_id,
+    )
+    db.session.add(dependency)
+    names = {wo.id: wo.name for wo in work_orders}
+    record_audit(AuditEntityType.WORK_ORDER, successor_id, user_id, "dependency_added", None,
+                 f"{names[predecessor_id]} (+{lag_days}d)", project_id=project_id)
+    db.session.commit()
+    invalidate_schedule(project_id)
+
+    return jsonify({"dependency": dependency.to_dict(), "message": "Dependency added successfully"}), 201
+
+
+@projects_bp.delete("/<int:project_id>/schedule/dependencies/<int:dependency_id>")
+@jwt_required()
+def remove_schedule_dependency(project_id: int, dependency_id: int):
+    """Remove a work order dependency (only project managers can do this)"""
+    # Check if user is a project manager
+    auth_error = require_project_manager()
+    if auth_error:
+        return auth_error
+
+    # Check if project exists
+    project = Project.query.filter_by(id=project_id, isActive=True).first()
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    # Check if current user is a manager of this project
+    user_id = int(get_jwt_identity())
+    if not is_project_manager(user_id, project_id):
+        return jsonify({"error": "You can only change dependencies on projects you manage"}), 403
+
+    if is_project_frozen(project):
+        return jsonify({"error": "Cannot change dependencies on archived or cancelled projects"}), 400
+
+    dependency = WorkOrderDependency.query.filter_by(id=dependency_id, projectId=project_id).first()
+    if not dependency:
+        return jsonify({"error": "Dependency not found"}), 404
+
+    predecessor = WorkOrder.query.filter_by(id=dependency.predecessorId).first()
+    record_audit(AuditEntityType.WORK_ORDER, dependency.successorId, user_id, "dependency_removed",
+                 predecessor.name if predecessor else str(dependency.predecessorId), None, project_id=project_id)
+    db.session.delete(dependency)
+    db.session.commit()
+    invalidate_schedule(project_id)
+
+    return jsonify({"message": "Dependency removed successfully"}), 200
+
+
+@projects_bp.get("/<int:project_id>/metrics/history")
+@jwt_required()
+def get_metric_history(project_id: int):
+    """
+    Daily SPI/CPI/EV/PV/AC/health/risk snapshots for trend and burn-up charts.
+
+    Query params (optional):
+      from=YYYY-MM-DD  to=YYYY-MM-DD  (default: the last 90 days)
+      interval=day|week|month  (default: chosen from the range length)
+      agg=last|avg
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        user = User.query.filter_by(id=user_id, isActive=True).first()
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        project = Project.query.filter_by(id=project_id, isActive=True).first()
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+
+        if not user_can_view_project(user, project):
+            return jsonify({"error": "You do not have permission to view this project"}), 403
+
+        try:
+            end = _parse_iso_date(request.args.get("to")) or date.today()
+            start = _parse_iso_date(request.args.get("from")) or end - timedelta(days=90)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        if start > end:
+            return jsonify({"error": "from must be on or before to"}), 400
+
+        interval = request.args.get("interval") or default_interval(start, end)
+        if interval not in HISTORY_INTERVALS:
+            return jsonify({"error": f"interval must be one of: {', '.join(HISTORY_INTERVALS)}"}), 400
+        agg = request.args.get("agg", "last")
+        if agg not in HISTORY_AGGREGATES:
+            return jsonify({"error": f"agg must be one of: {', '.join(HISTORY_AGGREGATES)}"}), 400
+
+        points = load_metric_history(project_id, start, end, interval, agg)
+        return jsonify({
+            "projectId": project_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "interval": interval,
+            "agg": agg,
+            "points": points,
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @projects_bp.get("/<int:project_id>/metrics/health")
 @jwt_required()
 def get_health_score(project_id: int):
@@ -2846,20 +3263,7 @@ def get_health_score(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         health = compute_project_health_score(project_id)
@@ -2870,6 +3274,7 @@ def get_health_score(project_id: int):
 
 @projects_bp.get("/<int:project_id>/metrics/all")
 @jwt_required()
+@conditional(project_metrics_validators)
 def get_all_metrics(project_id: int):
     """Get all metrics for a project"""
     try:
@@ -2883,20 +3288,7 @@ def get_all_metrics(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Access control: Check if user has permission to view this project
-        if user.role == UserRole.ADMIN:
-            # Admins can view all projects
-            pass
-        elif user.role == UserRole.PROJECT_MANAGER:
-            # Project managers can only view projects they manage
-            if not is_project_manager(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        elif user.role == UserRole.WORKER:
-            # Workers can only view projects they are members of
-            if not is_project_member(user_id, project_id):
-                return jsonify({"error": "You do not have permission to view this project"}), 403
-        else:
-            # Unknown role - deny access
+        if not user_can_view_project(user, project):
             return jsonify({"error": "You do not have permission to view this project"}), 403
 
         # Try to get base progress first
@@ -2905,13 +3297,17 @@ def get_all_metrics(project_id: int):
         # Safely get SPI value with fallback
         spi_value = progress.get("SPI", 0) if isinstance(progress, dict) else 0
         
+        # Replaying the status history is the expensive part, so workforce, quality and health share one pass
+        analytics = compute_status_analytics(project_id)
+        quality = compute_quality_metrics(project_id, analytics=analytics)
+        
         all_metrics = {
             "progress": progress,
             "schedule": compute_schedule_variance(project, spi=spi_value),
             "cost": compute_cost_variance(project, project_id),
-            "workforce": compute_workforce_metrics(project_id),
-            "quality": compute_quality_metrics(project_id),
-            "health": compute_project_health_score(project_id, progress=progress)
+            "workforce": compute_workforce_metrics(project_id, analytics=analytics),
+            "quality": quality,
+            "health": compute_project_health_score(project_id, progress=progress, quality=quality)
         }
         
         return jsonify(all_metrics), 200
@@ -2921,6 +3317,15 @@ def get_all_metrics(project_id: int):
         print(traceback.format_exc())
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
+def _can_view_report(user: User, project: Project) -> bool:
+    """Report access: admins and project managers, or workers on the project crew"""
+    if user.role in (UserRole.ADMIN, UserRole.PROJECT_MANAGER):
+        return True
+    if user.role == UserRole.WORKER:
+        return user.id in project.get_crew_members()
+    return False
+
+
 @projects_bp.get("/<int:project_id>/report-data")
 @jwt_required()
 def get_project_report_data(project_id: int):
@@ -2936,78 +3341,22 @@ def get_project_report_data(project_id: int):
         if not project:
             return jsonify({"error": "Project not found"}), 404
 
-        # Check access
-        has_access = False
-        if user.role == UserRole.ADMIN:
-            has_access = True
-        elif user.role == UserRole.PROJECT_MANAGER:
-            has_access = True
-        elif user.role == UserRole.WORKER:
-            crew_members = project.get_crew_members()
-            if int(user_id) in crew_members:
-                has_access = True
-
-        if not has_access:
+        if not _can_view_report(user, project):
             return jsonify({"error": "Access denied"}), 403
 
-        # Get all work orders for this project
-        work_orders = WorkOrder.query.filter_by(projectId=project_id, isActive=True).all()
-
-        # Calculate work order statistics
-        wo_stats = {
-            'total': len(work_orders),
-            'pending': sum(1 for wo in work_orders if wo.status == WorkOrderStatus.PENDING),
-            'in_progress': sum(1 for wo in work_orders if wo.status == WorkOrderStatus.IN_PROGRESS),
-            'on_hold': sum(1 for wo in work_orders if wo.status == WorkOrderStatus.ON_HOLD),
-            'completed': sum(1 for wo in work_orders if wo.status == WorkOrderStatus.COMPLETED),
-            'cancelled': sum(1 for wo in work_orders if wo.status == WorkOrderStatus.CANCELLED),
-        }
-
-        # Calculate completion rate (excluding cancelled)
-        completable = wo_stats['total'] - wo_stats['cancelled']
-        wo_stats['completion_rate'] = (wo_stats['completed'] / completable * 100) if completable > 0 else 0
-
-        # Calculate cost totals
-        wo_estimated_total = sum(float(wo.estimatedBudget or 0) for wo in work_orders)
-        wo_actual_total = sum(float(wo.actualCost or 0) for wo in work_orders)
-
-        supplies_total = float(project.suppliesCost or 0) + float(project.equipmentCost or 0) + float(project.otherExpenses or 0)
-        total_actual = wo_actual_total + supplies_total
-
-        # Calculate timeline metrics
-        timeline_metrics = {}
-        if project.startDate and project.endDate:
-            scheduled_duration = (project.endDate - project.startDate).days
-            timeline_metrics['scheduled_duration_days'] = scheduled_duration
-
-            completion_date = project.completedAt or project.archivedAt
-            if completion_date:
-                actual_duration = (completion_date.date() - project.startDate).days
-                timeline_metrics['actual_duration_days'] = actual_duration
-                timeline_metrics['variance_days'] = actual_duration - scheduled_duration
-                timeline_metrics['status'] = 'on_time' if actual_duration <= scheduled_duration else 'delayed'
-            else:
-                timeline_metrics['status'] = 'in_progress'
+        # Get all work orders for this project (workers loaded in one extra query)
+        work_orders = (
+            WorkOrder.query
+            .options(selectinload(WorkOrder.workers))
+            .filter_by(projectId=project_id, isActive=True)
+            .all()
+        )
 
-        # Build response
+        # Build response; the project is sent once rather than embedded in every work order
         return jsonify({
             'project': project.to_dict(),
-            'workOrders': [wo.to_dict() for wo in work_orders],
-            'metrics': {
-                'workOrders': wo_stats,
-                'costs': {
-                    'allocatedBudget': float(project.estimatedBudget) if project.estimatedBudget else 0,
-                    'workOrdersEstimated': wo_estimated_total,
-                    'workOrdersActual': wo_actual_total,
-                    'suppliesCost': float(project.suppliesCost or 0),
-                    'equipmentCost': float(project.equipmentCost or 0),
-                    'otherExpenses': float(project.otherExpenses or 0),
-                    'totalActual': total_actual,
-                    'variance': float(project.estimatedBudget or 0) - total_actual,
-                    'utilizationRate': (total_actual / float(project.estimatedBudget) * 100) if project.estimatedBudget else 0
-                },
-                'timeline': timeline_metrics
-            }
+            'workOrders': [wo.to_dict(include_project=False) for wo in work_orders],
+            'metrics': build_report_metrics(project)
         }), 200
 
     except Exception as e:
@@ -3015,6 +3364,95 @@ def get_project_report_data(project_id: int):
         return jsonify({"error": f"Failed to generate report data: {str(e)}"}), 500
 
 
+@projects_bp.get("/<int:project_id>/report-data/export")
+@jwt_required()
+def export_project_report_data(project_id: int):
+    """Stream a project's work orders as NDJSON, CSV or XLSX in constant memory"""
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    project = Project.query.filter_by(id=project_id, isActive=True).first()
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    if not _can_view_report(user, project):
+        return jsonify({"error": "Access denied"}), 403
+
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    safe_name = "".join(c if c.isalnum() else "_" for c in project.name) or "project"
+    filename = f"{safe_name}_report_{date.today().isoformat()}.{export_format}"
+
+    response = Response(
+        stream_with_context(export_stream(project, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@projects_bp.post("/audit-logs/archive")
+@jwt_required()
+def archive_old_audit_logs():
+    """Move audit logs older than the retention window to compressed archive files (admin only)"""
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+
+    if not user or user.role != UserRole.ADMIN:
+        return jsonify({"error": "Only admins can archive audit logs"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        retention_days = int(payload["olderThanDays"]) if payload.get("olderThanDays") is not None else None
+        if retention_days is not None and retention_days < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({"error": "olderThanDays must be a positive number"}), 400
+
+    try:
+        summary = archive_audit_logs(archive_cutoff(retention_days=retention_days))
+    except ArchiveNotConfiguredError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        import traceback
+        print(f"Error archiving audit logs: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": f"Failed to archive audit logs: {str(e)}"}), 500
+
+    return jsonify({
+        "message": f"Archived {summary['rowsArchived']} audit log(s) into {summary['segmentsWritten']} segment(s)",
+        **summary
+    }), 200
+
+
+@projects_bp.post("/metrics/snapshots")
+@jwt_required()
+def snapshot_project_metrics():
+    """Store today's EVM and health figures for every live project (admin only)"""
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+
+    if not user or user.role != UserRole.ADMIN:
+        return jsonify({"error": "Only admins can snapshot project metrics"}), 403
+
+    try:
+        summary = take_metric_snapshots()
+    except Exception as e:
+        import traceback
+        print(f"Error snapshotting project metrics: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({"error": f"Failed to snapshot project metrics: {str(e)}"}), 500
+
+    return jsonify({
+        "message": f"Snapshotted metrics for {summary['projectsSnapshotted']} project(s)",
+        **summary
+    }), 200
+
+
 @projects_bp.post("/recalculate-costs")
 @jwt_required()
 def recalculate_all_project_costs():
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Flask, current_app, g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+from .instrumentation import LATENCY_BUCKETS_MS
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # /metrics answers 503 and the record_* helpers do nothing
+    prometheus_client = None
+
+metrics_bp = Blueprint("prometheus", __name__)
+
+# Under gunicorn every worker writes its samples to files in this directory and /metrics merges them.
+# prometheus_client reads it at import time, so it must be in the environment before the app loads.
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = tuple(ms / 1000 for ms in LATENCY_BUCKETS_MS)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        "todd_http_request_duration_seconds", "Time from before_request to the last after_request hook",
+        ["blueprint", "route", "method", "status"], buckets=LATENCY_BUCKETS,
+    )
+    POOL_CHECKOUT_WAIT = Histogram(
+        "todd_db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool",
+        buckets=CHECKOUT_BUCKETS,
+    )
+    POOL_TIMEOUTS = Counter("todd_db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout")
+    # livesum: the total across running workers; a dead worker's share is dropped by mark_process_dead
+    POOL_CHECKED_OUT = Gauge("todd_db_pool_checked_out", "Connections currently checked out",
+                             multiprocess_mode="livesum")
+    POOL_CAPACITY = Gauge("todd_db_pool_capacity", "pool_size plus max_overflow", multiprocess_mode="livesum")
+    CACHE_LOOKUPS = Counter("todd_cache_lookups_total", "In-process cache lookups", ["cache", "result"])
+    NOTIFICATION_QUEUE = Gauge("todd_email_queue_depth", "Audit notifications waiting to be emailed",
+                               multiprocess_mode="livesum")
+    NOTIFICATION_CHANGES = Counter("todd_notification_changes_total", "Notifiable changes handed to dispatch")
+    NOTIFICATION_FANOUT = Histogram(
+        "todd_notification_fanout_emails", "Emails sent per notification dispatch", buckets=FANOUT_BUCKETS,
+    )
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # set, not inc: engine.dispose() builds a replacement pool; each worker reports its own
+        POOL_CAPACITY.set(self.size() + max(self._max_overflow, 0))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKED_OUT.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    POOL_CHECKED_OUT.dec()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if prometheus_client is not None:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+@contextmanager
+def notification_queue(changes: int):
+    """Count notifications as queued while they are being emailed"""
+    if prometheus_client is None:
+        yield
+        return
+    NOTIFICATION_CHANGES.inc(changes)
+    NOTIFICATION_QUEUE.inc(changes)
+    try:
+        yield
+    finally:
+        NOTIFICATION_QUEUE.dec(changes)
+
+
+def record_notification_fanout(emails_sent: int) -> None:
+    if prometheus_client is not None:
+        NOTIFICATION_FANOUT.observe(emails_sent)
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.get("_metrics_started")
+    if started is not None:
+        REQUEST_LATENCY.labels(
+            blueprint=request.blueprint or "",
+            route=request.url_rule.rule if request.url_rule else "<unmatched>",
+            method=request.method,
+            status=str(response.status_code),
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    """Prometheus request, pool, cache and notification metrics.
+
+    Call before db.init_app so the engine is built with TimedQueuePool, and before the other hooks
+    are registered so the request timer runs first and observes last.
+    """
+    if prometheus_client is None:
+        print("prometheus_client is not installed; /metrics is disabled")
+        return
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    # Flask-SQLAlchemy still swaps in StaticPool for in-memory SQLite
+    options.setdefault("poolclass", TimedQueuePool)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    if not event.contains(Pool, "checkout", _on_checkout):
+        event.listen(Pool, "checkout", _on_checkout)
+        event.listen(Pool, "checkin", _on_checkin)
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+
+
+def _registry():
+    if os.environ.get(MULTIPROC_ENV):
+        # A fresh registry per scrape: the collector reads every worker's files each time
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+@metrics_bp.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition; protected by METRICS_TOKEN (as a bearer token) when it is set"""
+    if prometheus_client is None or not current_app.config.get("METRICS_ENABLED", True):
+        return jsonify({"error": "Metrics are not enabled"}), 503
+
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({"error": "Invalid metrics token"}), 401
+
+    body = prometheus_client.generate_latest(_registry())
+    return current_app.response_class(body, content_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def mark_worker_dead(pid: int) -> None:
+    """gunicorn child_exit hook: drop the live gauges of a worker that exited"""
+    if prometheus_client is not None and os.environ.get(MULTIPROC_ENV):
+        multiprocess.mark_process_dead(pid)
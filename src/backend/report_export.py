@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import tempfile
+from typing import Iterator
+
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+
+from .models import db, Project, WorkOrder, WorkOrderStatus
+
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Rows fetched per round trip while streaming; memory stays bounded by this, not by project size
+EXPORT_BATCH_SIZE = 500
+
+# Chunk size used when streaming the finished XLSX file back to the client
+XLSX_READ_CHUNK = 64 * 1024
+
+EXPORT_COLUMNS = [
+    "id", "name", "description", "location", "status", "priority",
+    "startDate", "endDate", "actualStartDate", "actualEndDate",
+    "estimatedBudget", "actualCost", "assignedWorkers", "createdAt", "updatedAt",
+]
+
+
+def build_report_metrics(project: Project) -> dict:
+    """Compute the report-data metrics block with SQL aggregates instead of loading work orders"""
+    status_counts = dict(
+        db.session.query(WorkOrder.status, func.count(WorkOrder.id))
+        .filter(WorkOrder.projectId == project.id, WorkOrder.isActive == True)
+        .group_by(WorkOrder.status)
+        .all()
+    )
+    estimated_sum, actual_sum = db.session.query(
+        func.coalesce(func.sum(WorkOrder.estimatedBudget), 0),
+        func.coalesce(func.sum(WorkOrder.actualCost), 0),
+    ).filter(WorkOrder.projectId == project.id, WorkOrder.isActive == True).one()
+
+    wo_stats = {
+        'total': sum(status_counts.values()),
+        'pending': status_counts.get(WorkOrderStatus.PENDING, 0),
+        'in_progress': status_counts.get(WorkOrderStatus.IN_PROGRESS, 0),
+        'on_hold': status_counts.get(WorkOrderStatus.ON_HOLD, 0),
+        'completed': status_counts.get(WorkOrderStatus.COMPLETED, 0),
+        'cancelled': status_counts.get(WorkOrderStatus.CANCELLED, 0),
+    }
+
+    # Calculate completion rate (excluding cancelled)
+    completable = wo_stats['total'] - wo_stats['cancelled']
+    wo_stats['completion_rate'] = (wo_stats['completed'] / completable * 100) if completable > 0 else 0
+
+    wo_estimated_total = float(estimated_sum or 0)
+    wo_actual_total = float(actual_sum or 0)
+
+    supplies_total = float(project.suppliesCost or 0) + float(project.equipmentCost or 0) + float(project.otherExpenses or 0)
+    total_actual = wo_actual_total + supplies_total
+
+    # Calculate timeline metrics
+    timeline_metrics = {}
+    if project.startDate and project.endDate:
+        scheduled_duration = (project.endDate - project.startDate).days
+        timeline_metrics['scheduled_duration_days'] = scheduled_duration
+
+        completion_date = project.completedAt or project.archivedAt
+        if completion_date:
+            actual_duration = (completion_date.date() - project.startDate).days
+            timeline_metrics['actual_duration_days'] = actual_duration
+            timeline_metrics['variance_days'] = actual_duration - scheduled_duration
+            timeline_metrics['status'] = 'on_time' if actual_duration <= scheduled_duration else 'delayed'
+        else:
+            timeline_metrics['status'] = 'in_progress'
+
+    return {
+        'workOrders': wo_stats,
+        'costs': {
+            'allocatedBudget': float(project.estimatedBudget) if project.estimatedBudget else 0,
+            'workOrdersEstimated': wo_estimated_total,
+            'workOrdersActual': wo_actual_total,
+            'suppliesCost': float(project.suppliesCost or 0),
+            'equipmentCost': float(project.equipmentCost or 0),
+            'otherExpenses': float(project.otherExpenses or 0),
+            'totalActual': total_actual,
+            'variance': float(project.estimatedBudget or 0) - total_actual,
+            'utilizationRate': (total_actual / float(project.estimatedBudget) * 100) if project.estimatedBudget else 0
+        },
+        'timeline': timeline_metrics
+    }
+
+
+def iter_report_work_orders(project_id: int) -> Iterator[WorkOrder]:
+    """Yield a project's active work orders in id-keyset chunks, with workers loaded per chunk
+
+    Each chunk is a plain LIMIT query rather than one yield_per cursor: the selectin load for
+    workers runs on the same connection, and a server-side cursor would lose its unread rows.
+    """
+    last_id = 0
+    while True:
+        chunk = (
+            WorkOrder.query
+            .options(selectinload(WorkOrder.workers))
+            .filter(WorkOrder.projectId == project_id, WorkOrder.isActive == True, WorkOrder.id > last_id)
+            .order_by(WorkOrder.id)
+            .limit(EXPORT_BATCH_SIZE)
+            .all()
+        )
+        for work_order in chunk:
+            yield work_order
+            # Drop rows already written so the identity map doesn't grow with the export
+            db.session.expunge(work_order)
+        if len(chunk) < EXPORT_BATCH_SIZE:
+            break
+        last_id = chunk[-1].id
+
+
+def _export_row(work_order: WorkOrder) -> list:
+    data = work_order.to_dict(include_project=False)
+    data["assignedWorkers"] = " ".join(str(w) for w in data["assignedWorkers"])
+    return [data[col] for col in EXPORT_COLUMNS]
+
+
+def stream_ndjson(project: Project) -> Iterator[str]:
+    """One JSON object per line: the project, its metrics, then each work order"""
+    yield json.dumps({"type": "project", "project": project.to_dict()}) + "\n"
+    yield json.dumps({"type": "metrics", "metrics": build_report_metrics(project)}) + "\n"
+    for work_order in iter_report_work_orders(project.id):
+        yield json.dumps({"type": "workOrder", "workOrder": work_order.to_dict(include_project=False)}) + "\n"
+
+
+def stream_csv(project: Project) -> Iterator[str]:
+    """Work orders as CSV rows, written through a reused line buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+    for work_order in iter_report_work_orders(project.id):
+        writer.writerow(_export_row(work_order))
+        yield flush()
+
+
+def stream_xlsx(project: Project) -> Iterator[bytes]:
+    """Build the workbook with openpyxl's write-only mode on disk, then stream the file in chunks"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Work Orders")
+    sheet.append(EXPORT_COLUMNS)
+    for work_order in iter_report_work_orders(project.id):
+        sheet.append(_export_row(work_order))
+
+    summary = workbook.create_sheet("Summary")
+    metrics = build_report_metrics(project)
+    summary.append(["Project", project.name])
+    for section, values in metrics.items():
+        for key, value in values.items():
+            summary.append([f"{section}.{key}", value])
+
+    with tempfile.TemporaryFile(suffix=".xlsx") as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while True:
+            chunk = handle.read(XLSX_READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_stream(project: Project, export_format: str):
+    """Return the row generator for a supported export format"""
+    if export_format == "ndjson":
+        return stream_ndjson(project)
+    if export_format == "csv":
+        return stream_csv(project)
+    return stream_xlsx(project)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import gzip
+import time
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, List
+
+import numpy as np
+from flask import Flask, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+from .instrumentation import add_serialization_time
+
+try:
+    import orjson
+except ImportError:  # the stdlib provider is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # only gzip is offered
+    brotli = None
+
+# Bodies worth compressing; streamed exports (CSV/NDJSON generators) are skipped regardless
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/csv", "text/plain", "text/html", "application/x-ndjson"}
+
+
+def _encode_default(obj: Any) -> Any:
+    """Types handlers return without converting: Decimal money columns, dates, model enums, numpy scalars"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        # np.float64, np.int64, np.bool_ ... from the vectorized metrics
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    return DefaultJSONProvider.default(obj)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's json module, with Decimal as a number and dates as ISO strings like to_dict sends them"""
+
+    default = staticmethod(_encode_default)
+
+    def response(self, *args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        response = super().response(*args, **kwargs)
+        add_serialization_time(time.perf_counter() - start)
+        return response
+
+
+class OrjsonJSONProvider(StdlibJSONProvider):
+    """orjson encodes dates, enums, dataclasses and numpy natively; Decimal goes through _encode_default"""
+
+    def _options(self) -> int:
+        # Same output as the stdlib provider: sorted keys, int keys allowed, indented in debug
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            # Explicit json.dumps arguments (indent, separators, ...) keep stdlib behaviour
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_encode_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_encode_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        add_serialization_time(time.perf_counter() - start)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    "stdlib": StdlibJSONProvider,
+    "orjson": OrjsonJSONProvider,
+}
+
+
+def available_json_providers() -> List[str]:
+    return [name for name in JSON_PROVIDERS if name != "orjson" or orjson is not None]
+
+
+def available_encodings() -> List[str]:
+    """Content-Encodings we can produce, preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def compress_body(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=current_app.config["BROTLI_QUALITY"])
+    return gzip.compress(data, compresslevel=current_app.config["GZIP_LEVEL"], mtime=0)
+
+
+def compress_response(response):
+    """Compress buffered text responses above COMPRESS_MIN_SIZE with the best encoding the client accepts"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    # The body now depends on Accept-Encoding, whichever encoding this client gets
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_response_layer(app: Flask) -> None:
+    """Install the configured JSON provider and response compression"""
+    name = app.config.get("JSON_PROVIDER", "orjson")
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of {', '.join(JSON_PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        print("orjson is not installed; falling back to the stdlib JSON provider")
+        name = "stdlib"
+    app.json = JSON_PROVIDERS[name](app)
+
+    if app.config.get("COMPRESS_RESPONSES", True):
+        app.after_request(compress_response)
+
+
+def benchmark_endpoints(app: Flask, user_id: int, urls: List[str], repeat: int = 20) -> List[Dict[str, Any]]:
+    """Encode time per provider and body size per encoding for real endpoint payloads.
+
+    Each URL is requested once as user_id to capture the object its handler passes to jsonify;
+    that object is then encoded `repeat` times by every available provider.
+    """
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+    providers = {name: JSON_PROVIDERS[name](app) for name in available_json_providers()}
+    client = app.test_client()
+
+    results = []
+    for url in urls:
+        captured = []
+        active = app.json
+        original_response = active.response
+
+        def capture(*args, **kwargs):
+            captured.append(active._prepare_response_obj(args, kwargs))
+            return original_response(*args, **kwargs)
+
+        active.response = capture
+        try:
+            status = client.get(url, headers=headers).status_code
+        finally:
+            del active.response
+        if not captured:
+            results.append({"url": url, "status": status, "error": "no JSON payload captured"})
+            continue
+
+        payload = captured[-1]
+        row: Dict[str, Any] = {"url": url, "status": status, "encodeMs": {}, "bytes": {}, "compressMs": {}}
+        with app.app_context():
+            for name, provider in providers.items():
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    body = provider.response(payload).get_data()
+                row["encodeMs"][name] = round((time.perf_counter() - start) * 1000 / repeat, 3)
+            row["bytes"]["identity"] = len(body)
+            for encoding in available_encodings():
+                start = time.perf_counter()
+                row["bytes"][encoding] = len(compress_body(body, encoding))
+                row["compressMs"][encoding] = round((time.perf_counter() - start) * 1000, 3)
+        results.append(row)
+    return results
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+from .models import db, Project, WorkOrder, WorkOrderStatus, WorkOrderDependency
+from .forecasting import project_state_version
+from .prometheus_metrics import record_cache
+
+# Work orders whose dates are already fixed by actual progress; their predecessors cannot move them
+FIXED_START_STATUSES = (WorkOrderStatus.IN_PROGRESS, WorkOrderStatus.COMPLETED)
+
+MAX_DELAY_DAYS = 3650
+
+# Simple in-memory cache of computed schedules, invalidated when the project, its work orders or dependencies change
+_schedule_cache = {}
+_cache_ttl = timedelta(minutes=10)
+
+
+class ScheduleCycleError(ValueError):
+    """The dependency graph has a cycle, so no schedule exists"""
+
+
+def invalidate_schedule(project_id: int) -> None:
+    _schedule_cache.pop(project_id, None)
+
+
+def load_schedule_graph(project_id: int) -> Dict[str, Any]:
+    """Work orders as dense indexes with day-number constraints, plus successor/predecessor lists.
+
+    Cancelled and deleted work orders are left out, along with any dependency touching them.
+    """
+    rows = db.session.query(
+        WorkOrder.id, WorkOrder.name, WorkOrder.status, WorkOrder.startDate, WorkOrder.endDate,
+        WorkOrder.actualStartDate, WorkOrder.actualEndDate,
+    ).filter(
+        WorkOrder.projectId == project_id,
+        WorkOrder.isActive == True,
+        WorkOrder.status != WorkOrderStatus.CANCELLED,
+    ).order_by(WorkOrder.id).all()
+
+    ids, names, statuses, min_start, duration, fixed = [], [], [], [], [], []
+    for wo_id, name, status, start, end, actual_start, actual_end in rows:
+        if status in FIXED_START_STATUSES:
+            start = actual_start or start
+        if status == WorkOrderStatus.COMPLETED:
+            end = actual_end or end
+        ids.append(wo_id)
+        names.append(name)
+        statuses.append(status.value)
+        min_start.append(start.toordinal())
+        duration.append(max((end - start).days, 0))
+        fixed.append(status in FIXED_START_STATUSES)
+
+    index = {wo_id: i for i, wo_id in enumerate(ids)}
+    successors: List[List[tuple]] = [[] for _ in ids]
+    predecessors: List[List[tuple]] = [[] for _ in ids]
+    edges = 0
+    dependencies = db.session.query(
+        WorkOrderDependency.predecessorId, WorkOrderDependency.successorId, WorkOrderDependency.lagDays
+    ).filter(WorkOrderDependency.projectId == project_id).all()
+    for pred_id, succ_id, lag in dependencies:
+        if pred_id in index and succ_id in index:
+            p, s = index[pred_id], index[succ_id]
+            successors[p].append((s, lag or 0))
+            predecessors[s].append((p, lag or 0))
+            edges += 1
+
+    return {
+        "ids": ids, "names": names, "statuses": statuses, "index": index,
+        "minStart": min_start, "duration": duration, "fixed": fixed,
+        "successors": successors, "predecessors": predecessors, "edges": edges,
+    }
+
+
+def topological_order(successors: List[List[tuple]]) -> List[int]:
+    """Kahn's algorithm; raises ScheduleCycleError naming the work orders left in a cycle"""
+    indegree = [0] * len(successors)
+    for edges in successors:
+        for s, _ in edges:
+            indegree[s] += 1
+    queue = deque(i for i, d in enumerate(indegree) if d == 0)
+    order = []
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for s, _ in successors[i]:
+            indegree[s] -= 1
+            if indegree[s] == 0:
+                queue.append(s)
+    if len(order) != len(successors):
+        raise ScheduleCycleError([i for i, d in enumerate(indegree) if d > 0])
+    return order
+
+
+def _early_start(graph: Dict[str, Any], i: int, finish: List[int]) -> int:
+    """Earliest start of node i given its predecessors' finishes (fixed nodes keep their actual start)"""
+    start = graph["minStart"][i]
+    if graph["fixed"][i]:
+        return start
+    for p, lag in graph["predecessors"][i]:
+        start = max(start, finish[p] + lag)
+    return start
+
+
+def compute_cpm(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """CPM forward and backward pass in O(work orders + dependencies).
+
+    Work orders without predecessors start on their planned (or actual) start date; a successor
+    starts no earlier than lagDays after its latest predecessor finishes. Slack is measured against
+    the network finish, so zero (or negative) total slack marks the critical path.
+    """
+    n = len(graph["ids"])
+    order = topological_order(graph["successors"])
+    duration = graph["duration"]
+
+    es, ef = [0] * n, [0] * n
+    for i in order:
+        es[i] = _early_start(graph, i, ef)
+        ef[i] = es[i] + duration[i]
+    finish = max(ef) if n else None
+
+    lf, ls, free = [0] * n, [0] * n, [0] * n
+    for i in reversed(order):
+        successors = graph["successors"][i]
+        lf[i] = min((ls[s] - lag for s, lag in successors), default=finish)
+        ls[i] = lf[i] - duration[i]
+        free[i] = min((es[s] - lag for s, lag in successors), default=finish) - ef[i]
+
+    return {"order": order, "es": es, "ef": ef, "ls": ls, "lf": lf, "free": free, "finish": finish}
+
+
+def _critical_path(graph: Dict[str, Any], cpm: Dict[str, Any]) -> List[int]:
+    """Trace one chain of driving critical work orders back from the one that finishes last"""
+    es, ef, ls = cpm["es"], cpm["ef"], cpm["ls"]
+    candidates = [i for i in range(len(es)) if ef[i] == cpm["finish"] and ls[i] - es[i] <= 0]
+    if not candidates:
+        return []
+    node = min(candidates, key=lambda i: es[i])
+    path = [node]
+    while True:
+        driving = [p for p, lag in graph["predecessors"][node] if ef[p] + lag == es[node] and ls[p] - es[p] <= 0]
+        if not driving or graph["fixed"][node]:
+            break
+        node = min(driving, key=lambda p: es[p])
+        path.append(node)
+    return [graph["ids"][i] for i in reversed(path)]
+
+
+def _iso(day: Optional[int]) -> Optional[str]:
+    return date.fromordinal(day).isoformat() if day is not None else None
+
+
+def load_schedule(project_id: int) -> Dict[str, Any]:
+    """Graph plus CPM pass for a project, cached until anything in the project changes"""
+    # Dependency edits bump the project version too
+    version = project_state_version(project_id)
+    entry = _schedule_cache.get(project_id)
+    hit = bool(entry and entry["version"] == version and datetime.now() - entry["timestamp"] < _cache_ttl)
+    record_cache("schedule", hit)
+    if hit:
+        return entry["state"]
+
+    graph = load_schedule_graph(project_id)
+    state = {"graph": graph, "cpm": compute_cpm(graph)}
+    _schedule_cache[project_id] = {"version": version, "state": state, "timestamp": datetime.now()}
+    return state
+
+
+def build_schedule_report(project: Project) -> Dict[str, Any]:
+    """Early/late dates, total and free slack per work order, and the critical path"""
+    state = load_schedule(project.id)
+    graph, cpm = state["graph"], state["cpm"]
+    ids = graph["ids"]
+
+    work_orders = []
+    for i in cpm["order"]:
+        total_slack = cpm["ls"][i] - cpm["es"][i]
+        work_orders.append({
+            "id": ids[i],
+            "name": graph["names"][i],
+            "status": graph["statuses"][i],
+            "durationDays": graph["duration"][i],
+            "earlyStart": _iso(cpm["es"][i]),
+            "earlyFinish": _iso(cpm["ef"][i]),
+            "lateStart": _iso(cpm["ls"][i]),
+            "lateFinish": _iso(cpm["lf"][i]),
+            "totalSlackDays": total_slack,
+            "freeSlackDays": cpm["free"][i],
+            "critical": total_slack <= 0,
+            "predecessors": [ids[p] for p, _ in graph["predecessors"][i]],
+        })
+
+    finish = cpm["finish"]
+    return {
+        "projectId": project.id,
+        "workOrderCount": len(ids),
+        "dependencyCount": graph["edges"],
+        "startDate": _iso(min(cpm["es"])) if ids else None,
+        "finishDate": _iso(finish),
+        "plannedEndDate": project.endDate.isoformat() if project.endDate else None,
+        "finishVarianceDays": finish - project.endDate.toordinal() if finish is not None and project.endDate else None,
+        "criticalPath": _critical_path(graph, cpm),
+        "criticalCount": sum(1 for w in work_orders if w["critical"]),
+        "workOrders": work_orders,
+    }
+
+
+class _OverlayFinish:
+    """Finish lookup that prefers recomputed values over the cached forward pass"""
+
+    def __init__(self, base: List[int], overrides: Dict[int, int]):
+        self.base = base
+        self.overrides = overrides
+
+    def __getitem__(self, i: int) -> int:
+        return self.overrides.get(i, self.base[i])
+
+
+def cascade_delay(project: Project, work_order_id: int, delay_days: int) -> Dict[str, Any]:
+    """Push one work order's finish by delay_days and propagate only through the work orders it reaches.
+
+    Successors are revisited in topological order via a heap, and propagation stops as soon as a
+    work order's early start does not change, so the cost is proportional to the affected subgraph
+    rather than the whole project.
+    """
+    state = load_schedule(project.id)
+    graph, cpm = state["graph"], state["cpm"]
+    source = graph["index"].get(work_order_id)
+    if source is None:
+        raise KeyError(work_order_id)
+
+    position = {node: pos for pos, node in enumerate(cpm["order"])}
+    new_es: Dict[int, int] = {}
+    new_ef: Dict[int, int] = {source: cpm["ef"][source] + delay_days}
+
+    finish_of = _OverlayFinish(cpm["ef"], new_ef)
+    heap = [(position[s], s) for s, _ in graph["successors"][source]]
+    heapq.heapify(heap)
+    seen = set()
+    while heap:
+        _, node = heapq.heappop(heap)
+        if node in seen:
+            continue
+        seen.add(node)
+        start = _early_start(graph, node, finish_of)
+        if start == cpm["es"][node]:
+            continue
+        new_es[node] = start
+        new_ef[node] = start + graph["duration"][node]
+        for s, _ in graph["successors"][node]:
+            if s not in seen:
+                heapq.heappush(heap, (position[s], s))
+
+    ids = graph["ids"]
+    impacted = []
+    for node, ef in sorted(new_ef.items(), key=lambda item: position[item[0]]):
+        start = new_es.get(node, cpm["es"][node])
+        impacted.append({
+            "id": ids[node],
+            "name": graph["names"][node],
+            "earlyStart": _iso(cpm["es"][node]),
+            "earlyFinish": _iso(cpm["ef"][node]),
+            "newStart": _iso(start),
+            "newFinish": _iso(ef),
+            "shiftDays": ef - cpm["ef"][node],
+        })
+
+    new_finish = max(finish_of[i] for i in range(len(ids)))
+    return {
+        "projectId": project.id,
+        "workOrderId": work_order_id,
+        "delayDays": delay_days,
+        "totalSlackDays": cpm["ls"][source] - cpm["es"][source],
+        "finishDate": _iso(cpm["finish"]),
+        "newFinishDate": _iso(new_finish),
+        "finishShiftDays": new_finish - cpm["finish"],
+        "impactedWorkOrders": impacted,
+    }
+
+
+def would_create_cycle(project_id: int, predecessor_id: int, successor_id: int) -> bool:
+    """True when successor already reaches predecessor, so the new edge would close a loop.
+
+    Walks every dependency row of the project, not just the scheduled graph: an edge through a
+    cancelled or deleted work order comes back into the schedule if that work order is reactivated.
+    """
+    successors: Dict[int, List[int]] = {}
+    for pred_id, succ_id in db.session.query(WorkOrderDependency.predecessorId, WorkOrderDependency.successorId).filter(
+        WorkOrderDependency.projectId == project_id
+    ):
+        successors.setdefault(pred_id, []).append(succ_id)
+
+    stack, seen = [successor_id], {successor_id}
+    while stack:
+        node = stack.pop()
+        if node == predecessor_id:
+            return True
+        for s in successors.get(node, ()):
+            if s not in seen:
+                seen.add(s)
+                stack.append(s)
+    return False
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.orm import load_only, selectinload
+
+from .models import Project, ProjectManager, WorkOrder, BuildingSupply, ElectricalSupply
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _enum(value):
+    return value.value if value else None
+
+
+def _number(default=None):
+    return lambda value: float(value) if value else default
+
+
+class Field:
+    """One key of a model's to_dict: the columns it reads, or the relationships it walks and how to load them"""
+
+    __slots__ = ("getter", "columns", "loaders")
+
+    def __init__(self, getter: Callable[[Any], Any], columns: Sequence[str] = (), loaders: Sequence = ()):
+        self.getter = getter
+        self.columns = tuple(columns)
+        self.loaders = tuple(loaders)
+
+    @property
+    def is_relation(self) -> bool:
+        return bool(self.loaders)
+
+
+def column(name: str, fmt: Optional[Callable[[Any], Any]] = None) -> Field:
+    if fmt is None:
+        return Field(lambda obj: getattr(obj, name), (name,))
+    return Field(lambda obj: fmt(getattr(obj, name)), (name,))
+
+
+class ModelSerializer:
+    """Sparse projections of a model that match its to_dict key for key.
+
+    Fields are declared in to_dict order. A selection (from parse_selection) is a list of field
+    names; None means the full to_dict payload.
+    """
+
+    def __init__(self, model, fields: Dict[str, Field], full: Optional[Callable[[Any], dict]] = None):
+        self.model = model
+        self.fields = fields
+        self.full = full or (lambda obj: obj.to_dict())
+
+    @property
+    def scalar_fields(self) -> List[str]:
+        return [name for name, field in self.fields.items() if not field.is_relation]
+
+    @property
+    def relation_fields(self) -> List[str]:
+        return [name for name, field in self.fields.items() if field.is_relation]
+
+    def query_options(self, selection: Optional[List[str]], extra_columns: Iterable[str] = ()) -> list:
+        """load_only for the selected columns plus eager loads for the selected relationships.
+
+        extra_columns are columns the caller reads itself (sort keys, cost checks), so they are
+        not lazy-loaded row by row.
+        """
+        if selection is None:
+            # Full payload: keep every column, but batch the relationships to_dict walks
+            return [loader for field in self.fields.values() for loader in field.loaders]
+        columns, options = list(extra_columns), []
+        for name in selection:
+            columns.extend(self.fields[name].columns)
+            options.extend(self.fields[name].loaders)
+        options.insert(0, load_only(*[getattr(self.model, c) for c in dict.fromkeys(columns)]))
+        return options
+
+    def dump(self, obj, selection: Optional[List[str]]) -> dict:
+        if selection is None:
+            return self.full(obj)
+        return {name: self.fields[name].getter(obj) for name in selection}
+
+
+def _names(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def parse_selection(args, serializer: ModelSerializer, default: Optional[Sequence[str]] = None) -> Optional[List[str]]:
+    """Read the fields=/include= query parameters; raises ValueError with a message for the client.
+
+    - fields: the keys to return (id is always returned). Without it the default keys are returned,
+      or every column key when there is no default.
+    - include: related data to embed (managers, crew, assigned workers, ...). When fields is given,
+      related keys listed there are embedded too.
+    Returns None when neither is given and there is no default, meaning the full to_dict payload.
+    """
+    fields, include = _names(args.get("fields")), _names(args.get("include"))
+    if not fields and not include:
+        return list(default) if default is not None else None
+
+    unknown = sorted(set(fields) - set(serializer.fields))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    relations = serializer.relation_fields
+    not_relations = sorted(set(include) - set(relations))
+    if not_relations:
+        raise ValueError(f"include must be a comma-separated subset of {', '.join(relations)}")
+
+    wanted = {"id"} | set(include) | set(fields or default or serializer.scalar_fields)
+    return [name for name in serializer.fields if name in wanted]
+
+
+PROJECT_SERIALIZER = ModelSerializer(Project, {
+    "id": column("id"),
+    "name": column("name"),
+    "description": column("description"),
+    "location": column("location"),
+    "startDate": column("startDate", _iso),
+    "endDate": column("endDate", _iso),
+    "actualStartDate": column("actualStartDate", _iso),
+    "actualEndDate": column("actualEndDate", _iso),
+    "status": column("status", _enum),
+    "priority": column("priority"),
+    "estimatedBudget": column("estimatedBudget", _number()),
+    "actualCost": column("actualCost", _number()),
+    "completedAt": column("completedAt", _iso),
+    "archivedAt": column("archivedAt", _iso),
+    "suppliesCost": column("suppliesCost", _number(0.00)),
+    "equipmentCost": column("equipmentCost", _number(0.00)),
+    "otherExpenses": column("otherExpenses", _number(0.00)),
+    "projectManagerId": column("projectManagerId"),
+    "projectManager": Field(
+        lambda p: p.projectManager.to_dict() if p.projectManager else None,
+        ("projectManagerId",), (selectinload(Project.projectManager),),
+    ),
+    "projectManagerIds": Field(lambda p: [m.userId for m in p.managers], (), (selectinload(Project.managers),)),
+    "projectManagers": Field(
+        lambda p: [m.user.to_dict() for m in p.managers], (),
+        (selectinload(Project.managers).selectinload(ProjectManager.user),),
+    ),
+    "crewMembers": Field(lambda p: p.get_crew_members(), (), (selectinload(Project.members),)),
+    "createdAt": column("createdAt", _iso),
+    "updatedAt": column("updatedAt", _iso),
+    "isActive": column("isActive"),
+})
+
+WORKORDER_SERIALIZER = ModelSerializer(WorkOrder, {
+    "id": column("id"),
+    "name": column("name"),
+    "description": column("description"),
+    "location": column("location"),
+    "suppliesList": column("suppliesList"),
+    "startDate": column("startDate", _iso),
+    "endDate": column("endDate", _iso),
+    "actualStartDate": column("actualStartDate", _iso),
+    "actualEndDate": column("actualEndDate", _iso),
+    "status": column("status", _enum),
+    "priority": column("priority"),
+    "estimatedBudget": column("estimatedBudget", _number()),
+    "actualCost": column("actualCost", _number()),
+    "projectId": column("projectId"),
+    "assignedWorkers": Field(lambda wo: wo.get_assigned_workers(), (), (selectinload(WorkOrder.workers),)),
+    "createdAt": column("createdAt", _iso),
+    "updatedAt": column("updatedAt", _iso),
+    "isActive": column("isActive"),
+    "project": Field(
+        lambda wo: wo.project.to_dict() if wo.project else None,
+        ("projectId",), (selectinload(WorkOrder.project),),
+    ),
+})
+
+
+def _supply_serializer(model) -> ModelSerializer:
+    """Building and electrical supplies share a payload shape"""
+    assignments = selectinload(model.work_order_assignments)
+    return ModelSerializer(model, {
+        "id": column("id"),
+        "name": column("name"),
+        "vendor": column("vendor"),
+        "referenceCode": column("referenceCode"),
+        "supplyCategory": column("supplyCategory"),
+        "supplyType": column("supplyType"),
+        "supplySubtype": column("supplySubtype"),
+        "unitOfMeasure": column("unitOfMeasure"),
+        "budget": column("budget", _number(0.0)),
+        "status": column("status", _enum),
+        "projectId": column("projectId"),
+        "workOrderId": column("workOrderId"),
+        "workOrderIds": Field(lambda s: s.get_work_orders(), (), (assignments,)),
+        "workOrderAssignments": Field(lambda s: s.get_work_order_assignments(), (), (assignments,)),
+        "requestedBy": Field(
+            lambda s: s.requestedBy.to_dict() if s.requestedBy else None,
+            ("requestedById",), (selectinload(model.requestedBy),),
+        ),
+        "approvedBy": Field(
+            lambda s: s.approvedBy.to_dict() if s.approvedBy else None,
+            ("approvedById",), (selectinload(model.approvedBy),),
+        ),
+        "createdAt": column("createdAt", _iso),
+        "updatedAt": column("updatedAt", _iso),
+    })
+
+
+BUILDING_SUPPLY_SERIALIZER = _supply_serializer(BuildingSupply)
+ELECTRICAL_SUPPLY_SERIALIZER = _supply_serializer(ElectricalSupply)
+
+_serializers = {
+    Project: PROJECT_SERIALIZER,
+    WorkOrder: WORKORDER_SERIALIZER,
+    BuildingSupply: BUILDING_SUPPLY_SERIALIZER,
+    ElectricalSupply: ELECTRICAL_SUPPLY_SERIALIZER,
+}
+
+
+def serialize(rows: Iterable[Any], selection: Optional[List[str]]) -> List[dict]:
+    """Dump rows (of any registered model, mixed is fine) with one selection"""
+    return [_serializers[type(row)].dump(row, selection) for row in rows]
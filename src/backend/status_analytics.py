@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from .models import db, Audit, AuditEntityType, WorkOrder, WorkOrderStatus, WorkOrderStatusStats
+
+# Audit rows fetched per round trip while replaying
+REPLAY_BATCH_SIZE = 2000
+
+# Seconds column on WorkOrderStatusStats for each status
+STATUS_SECONDS_COLUMNS = {
+    WorkOrderStatus.PENDING.value: "pendingSeconds",
+    WorkOrderStatus.IN_PROGRESS.value: "inProgressSeconds",
+    WorkOrderStatus.ON_HOLD.value: "onHoldSeconds",
+    WorkOrderStatus.COMPLETED.value: "completedSeconds",
+    WorkOrderStatus.CANCELLED.value: "cancelledSeconds",
+}
+
+DEFAULT_THROUGHPUT_WEEKS = 8
+
+
+# Status changes recorded more recently than this are replayed on every read but not persisted yet.
+# Audit ids are allocated at insert but become visible at commit, so a watermark taken from the
+# newest rows could pass an id whose transaction commits a moment later and skip it for good.
+FOLD_SETTLE_TIME = timedelta(minutes=10)
+
+# A read that had to replay more transitions than this past the watermark folds the settled ones,
+# so projects stay cheap to read even when the snapshot and archive jobs are not scheduled
+FOLD_ON_READ_THRESHOLD = 500
+
+_STATS_COLUMNS = [column.key for column in WorkOrderStatusStats.__table__.columns]
+
+
+def _project_watermark(project_id: int) -> int:
+    """Newest status audit id already folded into the project's stats"""
+    return db.session.query(func.coalesce(func.max(WorkOrderStatusStats.lastAuditId), 0)).filter(
+        WorkOrderStatusStats.projectId == project_id
+    ).scalar() or 0
+
+
+def _settled_audit_id(now: Optional[datetime] = None) -> int:
+    """Highest audit id that every transaction below it has had FOLD_SETTLE_TIME to commit"""
+    cutoff = (now or datetime.utcnow()) - FOLD_SETTLE_TIME
+    # Walking the primary key down from the newest row only touches the last few minutes of audits
+    return db.session.query(Audit.id).filter(Audit.createdAt < cutoff).order_by(Audit.id.desc()).limit(1).scalar() or 0
+
+
+def _apply_transition(stats: WorkOrderStatusStats, new_status: str, at: datetime, audit_id: int) -> None:
+    """Close the open interval of the current status and move the work order to new_status"""
+    elapsed = max(0, int((at - stats.statusSince).total_seconds()))
+    column = STATUS_SECONDS_COLUMNS.get(stats.currentStatus)
+    if column:
+        setattr(stats, column, (getattr(stats, column) or 0) + elapsed)
+
+    if stats.currentStatus == WorkOrderStatus.COMPLETED.value and new_status != WorkOrderStatus.COMPLETED.value:
+        stats.reopenCount = (stats.reopenCount or 0) + 1
+    if new_status == WorkOrderStatus.IN_PROGRESS.value and stats.startedAt is None:
+        stats.startedAt = at
+    if new_status == WorkOrderStatus.COMPLETED.value:
+        stats.completedAt = at
+        if stats.firstCompletedAt is None:
+            stats.firstCompletedAt = at
+
+    stats.transitionCount = (stats.transitionCount or 0) + 1
+    stats.currentStatus = new_status
+    stats.statusSince = max(at, stats.statusSince)
+    stats.lastAuditId = audit_id
+
+
+def _replay(project_id: int, stats_by_id: Dict[int, WorkOrderStatusStats], after_id: int,
+            upto_id: Optional[int] = None) -> Tuple[int, List[WorkOrderStatusStats]]:
+    """Apply the project's status audit entries with after_id < id <= upto_id to stats_by_id.
+
+    The entries are streamed once, grouped by work order, so the cost is proportional to the
+    number of transitions replayed. Returns (transitions applied, stats rows created).
+    """
+    query = (
+        db.session.query(Audit.id, Audit.entityId, Audit.oldValue, Audit.newValue, Audit.createdAt, WorkOrder.createdAt.label("workOrderCreatedAt"))
+        .join(WorkOrder, WorkOrder.id == Audit.entityId)
+        .filter(
+            Audit.entityType == AuditEntityType.WORK_ORDER,
+            Audit.field == "status",
+            Audit.id > after_id,
+            WorkOrder.projectId == project_id,
+        )
+    )
+    if upto_id is not None:
+        query = query.filter(Audit.id <= upto_id)
+    rows = query.order_by(Audit.entityId, Audit.id).execution_options(yield_per=REPLAY_BATCH_SIZE)
+
+    applied = 0
+    created = []
+    with db.session.no_autoflush:
+        for row in rows:
+            if row.newValue not in STATUS_SECONDS_COLUMNS:
+                continue
+            stats = stats_by_id.get(row.entityId)
+            if stats is None:
+                # Before its first recorded transition the work order sat in the audit's old status
+                initial = row.oldValue if row.oldValue in STATUS_SECONDS_COLUMNS else WorkOrderStatus.PENDING.value
+                stats = WorkOrderStatusStats(
+                    workOrderId=row.entityId,
+                    projectId=project_id,
+                    currentStatus=initial,
+                    statusSince=min(row.workOrderCreatedAt, row.createdAt),
+                    pendingSeconds=0,
+                    inProgressSeconds=0,
+                    onHoldSeconds=0,
+                    completedSeconds=0,
+                    cancelledSeconds=0,
+                    transitionCount=0,
+                    reopenCount=0,
+                    lastAuditId=row.id,
+                )
+                stats_by_id[row.entityId] = stats
+                created.append(stats)
+            _apply_transition(stats, row.newValue, row.createdAt, row.id)
+            applied += 1
+    return applied, created
+
+
+def refresh_status_analytics(project_id: int, upto_id: Optional[int] = None) -> int:
+    """Fold settled status audit entries newer than the project's watermark into work_order_status_stats.
+
+    Called by the snapshot and archive jobs and by reads with a long unfolded tail. The stats rows
+    are locked before the watermark is taken, so two folds of the same project run one after the
+    other; if both insert the same new row, the loser rolls back and leaves the fold to the winner.
+    Returns the number of transitions applied.
+    """
+    if upto_id is None:
+        upto_id = _settled_audit_id()
+    if upto_id <= _project_watermark(project_id):
+        return 0
+
+    # Existing stats are loaded up front so nothing else hits the database while the cursor is open
+    stats_by_id = {
+        stats.workOrderId: stats
+        for stats in WorkOrderStatusStats.query.filter_by(projectId=project_id).with_for_update().all()
+    }
+    watermark = max((stats.lastAuditId for stats in stats_by_id.values()), default=0)
+    if upto_id <= watermark:
+        db.session.rollback()
+        return 0
+    applied, created = _replay(project_id, stats_by_id, watermark, upto_id)
+
+    if not applied:
+        db.session.rollback()
+        return 0
+    db.session.add_all(created)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return 0
+    return applied
+
+
+def refresh_all_status_analytics() -> int:
+    """Bring every project with status history up to date"""
+    upto_id = _settled_audit_id()
+    project_ids = [
+        pid for (pid,) in db.session.query(WorkOrder.projectId)
+        .join(Audit, Audit.entityId == WorkOrder.id)
+        .filter(Audit.entityType == AuditEntityType.WORK_ORDER, Audit.field == "status")
+        .distinct()
+        .all()
+    ]
+    return sum(refresh_status_analytics(pid, upto_id) for pid in project_ids)
+
+
+def load_status_stats(project_id: int) -> Dict[int, WorkOrderStatusStats]:
+    """Current status stats per work order id, without writing anything.
+
+    Persisted rows are copied into transient objects and the status entries newer than the
+    project's watermark are replayed onto the copies, so the result is always up to date.
+    When that tail is longer than FOLD_ON_READ_THRESHOLD, its settled part is folded into the
+    table afterwards so the next read starts from a newer watermark.
+    """
+    stats_by_id = {
+        stats.workOrderId: WorkOrderStatusStats(**{key: getattr(stats, key) for key in _STATS_COLUMNS})
+        for stats in WorkOrderStatusStats.query.filter_by(projectId=project_id).all()
+    }
+    watermark = max((stats.lastAuditId for stats in stats_by_id.values()), default=0)
+    applied, _ = _replay(project_id, stats_by_id, watermark)
+    # Folding commits, so it is skipped when the caller has writes of its own in flight
+    session = db.session
+    if applied > FOLD_ON_READ_THRESHOLD and not (session.new or session.dirty or session.deleted):
+        refresh_status_analytics(project_id)
+    return stats_by_id
+
+
+def _summarize_days(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"averageDays": None, "medianDays": None, "count": 0}
+    return {
+        "averageDays": round(sum(values) / len(values), 2),
+        "medianDays": round(median(values), 2),
+        "count": len(values),
+    }
+
+
+def compute_status_analytics(project_id: int, weeks: int = DEFAULT_THROUGHPUT_WEEKS, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Rework, time-in-status, cycle time and throughput for a project's work orders.
+
+    Work orders with no recorded transitions are counted in their current status since creation.
+    Cycle time runs from the first move to in_progress to the latest completion; lead time from
+    creation to the latest completion. Throughput counts completed work orders per week.
+    """
+    stats_by_id = load_status_stats(project_id)
+    now = now or datetime.utcnow()
+
+    rows = (
+        db.session.query(WorkOrder.id, WorkOrder.status, WorkOrder.createdAt)
+        .filter(WorkOrder.projectId == project_id, WorkOrder.isActive == True)
+        .all()
+    )
+
+    seconds = {status: 0 for status in STATUS_SECONDS_COLUMNS}
+    visited = {status: 0 for status in STATUS_SECONDS_COLUMNS}
+    ever_completed = reopened = total_reopens = 0
+    cycle_days: List[float] = []
+    lead_days: List[float] = []
+    completions: List[datetime] = []
+
+    for wo_id, status, created_at in rows:
+        stats = stats_by_id.get(wo_id)
+        if stats is None:
+            current = status.value if status else WorkOrderStatus.PENDING.value
+            seconds[current] += max(0, int((now - created_at).total_seconds()))
+            visited[current] += 1
+            if current == WorkOrderStatus.COMPLETED.value:
+                ever_completed += 1
+            continue
+
+        spent = {s: getattr(stats, column) or 0 for s, column in STATUS_SECONDS_COLUMNS.items()}
+        spent[stats.currentStatus] = spent.get(stats.currentStatus, 0) + max(0, int((now - stats.statusSince).total_seconds()))
+        for s, value in spent.items():
+            if value or s == stats.currentStatus:
+                seconds[s] += value
+                visited[s] += 1
+
+        if stats.firstCompletedAt is not None:
+            ever_completed += 1
+        if stats.reopenCount:
+            reopened += 1
+            total_reopens += stats.reopenCount
+
+        if stats.currentStatus == WorkOrderStatus.COMPLETED.value and stats.completedAt is not None:
+            completions.append(stats.completedAt)
+            lead_days.append((stats.completedAt - created_at).total_seconds() / 86400)
+            if stats.startedAt is not None and stats.startedAt <= stats.completedAt:
+                cycle_days.append((stats.completedAt - stats.startedAt).total_seconds() / 86400)
+
+    time_in_status = {
+        status: {
+            "totalHours": round(seconds[status] / 3600, 2),
+            "averageHours": round(seconds[status] / 3600 / visited[status], 2) if visited[status] else None,
+            "workOrders": visited[status],
+        }
+        for status in STATUS_SECONDS_COLUMNS
+    }
+
+    # Weekly buckets, Monday to Sunday, ending with the current week
+    weeks = max(1, weeks)
+    current_week = now.date() - timedelta(days=now.weekday())
+    week_starts = [current_week - timedelta(weeks=i) for i in range(weeks - 1, -1, -1)]
+    counts: Dict[date, int] = {start: 0 for start in week_starts}
+    for completed_at in completions:
+        start = completed_at.date() - timedelta(days=completed_at.weekday())
+        if start in counts:
+            counts[start] += 1
+
+    return {
+        "reworkRate": reopened / ever_completed if ever_completed else 0,
+        "reopenedOrders": reopened,
+        "totalReopens": total_reopens,
+        "everCompleted": ever_completed,
+        "timeInStatus": time_in_status,
+        "cycleTime": _summarize_days(cycle_days),
+        "leadTime": _summarize_days(lead_days),
+        "throughput": {
+            "weeks": [{"weekStart": start.isoformat(), "completed": counts[start]} for start in week_starts],
+            "averagePerWeek": round(sum(counts.values()) / weeks, 2),
+        },
+        "totalWorkOrders": len(rows),
+        "asOf": now.isoformat(),
+    }
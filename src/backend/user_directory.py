@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+from .models import db, User, Project, ProjectMember, ProjectManager
+from .prometheus_metrics import record_cache
+
+DEFAULT_DIRECTORY_LIMIT = 25
+MAX_DIRECTORY_LIMIT = 100
+
+# Highest code point, so term + _PREFIX_END bounds every token that starts with term
+_PREFIX_END = "\U0010ffff"
+
+
+def _sort_key(entry: dict) -> Tuple[str, str, int]:
+    return (entry["lastName"].lower(), entry["firstName"].lower(), entry["id"])
+
+
+class UserDirectory:
+    """In-memory snapshot of every user's compact projection, sorted by (last, first, id).
+
+    Prefix search goes through a sorted list of (token, user ID) pairs, which behaves like a trie
+    flattened into an array: every token sharing a prefix sits in one contiguous bisect range.
+    """
+
+    def __init__(self):
+        self.entries: List[dict] = []
+        self.sort_keys: List[Tuple[str, str, int]] = []
+        self.positions: Dict[int, int] = {}
+        self.tokens: List[Tuple[str, int]] = []
+        self.fingerprint = None
+        self.built_at: Optional[datetime] = None
+
+    @classmethod
+    def build(cls) -> "UserDirectory":
+        """A new directory loaded from the database.
+
+        Everything is built in locals and the caller publishes the finished object in one assignment,
+        so a search running on another thread never sees entries from one build and keys from another.
+        """
+        fingerprint = _directory_fingerprint()
+        rows = db.session.query(
+            User.id, User.firstName, User.lastName, User.emailAddress, User.profileImageUrl,
+            User.role, User.workerType, User.isActive,
+        ).all()
+        entries = [{
+            "id": user_id,
+            "firstName": first or "",
+            "lastName": last or "",
+            "emailAddress": email,
+            "profileImageUrl": avatar,
+            "role": role.value if role else None,
+            "workerType": worker_type.value if worker_type else None,
+            "isActive": is_active,
+        } for user_id, first, last, email, avatar, role, worker_type, is_active in rows]
+        entries.sort(key=_sort_key)
+
+        tokens = []
+        for entry in entries:
+            first, last = entry["firstName"].lower().strip(), entry["lastName"].lower().strip()
+            for token in {first, last, f"{first} {last}".strip(), (entry["emailAddress"] or "").lower()}:
+                if token:
+                    tokens.append((token, entry["id"]))
+        tokens.sort()
+
+        directory = cls()
+        directory.entries = entries
+        directory.sort_keys = [_sort_key(e) for e in entries]
+        directory.positions = {e["id"]: i for i, e in enumerate(entries)}
+        directory.tokens = tokens
+        directory.fingerprint = fingerprint
+        directory.built_at = datetime.now()
+        return directory
+
+    def _prefix_matches(self, term: str) -> Set[int]:
+        lo = bisect_left(self.tokens, (term,))
+        hi = bisect_left(self.tokens, (term + _PREFIX_END,))
+        return {user_id for _, user_id in self.tokens[lo:hi]}
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        role: Optional[str] = None,
+        worker_type: Optional[str] = None,
+        user_ids: Optional[Set[int]] = None,
+        include_inactive: bool = False,
+        after: Optional[Tuple[str, str, int]] = None,
+        limit: int = DEFAULT_DIRECTORY_LIMIT,
+    ) -> Tuple[List[dict], Optional[Tuple[str, str, int]]]:
+        """One page of users in (last, first, id) order.
+
+        Every whitespace-separated term in query must prefix-match a first name, last name, full
+        name or email. Returns (page, sort key of the last row if there may be more).
+        """
+        terms = (query or "").lower().split()
+        if terms:
+            matched = self._prefix_matches(terms[0])
+            for term in terms[1:]:
+                matched &= self._prefix_matches(term)
+            if user_ids is not None:
+                matched &= user_ids
+            positions = sorted(self.positions[uid] for uid in matched)
+        elif user_ids is not None:
+            positions = sorted(self.positions[uid] for uid in user_ids if uid in self.positions)
+        else:
+            positions = None
+
+        start = bisect_right(self.sort_keys, tuple(after)) if after else 0
+        if positions is None:
+            candidates = range(start, len(self.entries))
+        else:
+            candidates = positions[bisect_left(positions, start):]
+
+        page = []
+        for position in candidates:
+            entry = self.entries[position]
+            if not include_inactive and not entry["isActive"]:
+                continue
+            if role and entry["role"] != role:
+                continue
+            if worker_type and entry["workerType"] != worker_type:
+                continue
+            page.append(entry)
+            if len(page) > limit:
+                break
+
+        if len(page) > limit:
+            page = page[:limit]
+            return page, _sort_key(page[-1])
+        return page, None
+
+
+def _directory_fingerprint() -> tuple:
+    """Changes whenever a user is added or edited (updatedAt is bumped on every update)"""
+    return tuple(db.session.query(func.count(User.id), func.max(User.id), func.max(User.updatedAt)).one())
+
+
+_directory = UserDirectory()
+
+
+def get_user_directory() -> UserDirectory:
+    """The process-wide directory, rebuilt when users have changed since it was built"""
+    global _directory
+    directory = _directory
+    stale = directory.built_at is None or directory.fingerprint != _directory_fingerprint()
+    record_cache("user_directory", not stale)
+    if stale:
+        directory = _directory = UserDirectory.build()
+    return directory
+
+
+def project_user_ids(project_id: int) -> Set[int]:
+    """Active members and managers of a project (including the legacy single manager field)"""
+    members = db.session.query(ProjectMember.userId).filter_by(projectId=project_id, isActive=True)
+    managers = db.session.query(ProjectManager.userId).filter_by(projectId=project_id, isActive=True)
+    user_ids = {row[0] for row in members.union(managers).all()}
+    legacy_manager = db.session.query(Project.projectManagerId).filter_by(id=project_id).scalar()
+    if legacy_manager:
+        user_ids.add(legacy_manager)
+    return user_ids
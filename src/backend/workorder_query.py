@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import false, select, union
+
+from .models import User, UserRole, Project, ProjectManager, ProjectMember, WorkOrder, WorkOrderStatus, WorkOrderWorker
+from .pagination import parse_limit, encode_cursor, decode_cursor, keyset_after
+from .serializers import WORKORDER_SERIALIZER, parse_selection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sortable columns and how their cursor values are read back
+SORT_COLUMNS = {
+    "id": (WorkOrder.id, int),
+    "startDate": (WorkOrder.startDate, date.fromisoformat),
+    "endDate": (WorkOrder.endDate, date.fromisoformat),
+    "priority": (WorkOrder.priority, int),
+    "updatedAt": (WorkOrder.updatedAt, datetime.fromisoformat),
+}
+
+# The listing leaves out the embedded project unless fields/include ask for it
+DEFAULT_LIST_FIELDS = tuple(name for name in WORKORDER_SERIALIZER.fields if name != "project")
+
+
+def _int_list(value: Optional[str], name: str) -> List[int]:
+    try:
+        return [int(v) for v in value.split(",") if v.strip()] if value else []
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of numbers")
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+
+
+def parse_workorder_filters(args, user_id: int) -> Dict[str, Any]:
+    """Validate the listing query string; raises ValueError with a message for the client"""
+    try:
+        statuses = [WorkOrderStatus(s.strip().lower()) for s in args.get("status", "").split(",") if s.strip()]
+    except ValueError:
+        raise ValueError("status must be pending, in_progress, on_hold, completed or cancelled")
+
+    assignee = args.get("assigneeId")
+    if assignee == "me":
+        assignee = user_id
+    elif assignee:
+        try:
+            assignee = int(assignee)
+        except ValueError:
+            raise ValueError("assigneeId must be a number or 'me'")
+
+    sort = args.get("sort") or "id"
+    descending = sort.startswith("-")
+    sort = sort.lstrip("-")
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)} (prefix with - for descending)")
+
+    cursor = None
+    if args.get("cursor"):
+        values = decode_cursor(args["cursor"])
+        try:
+            value, row_id = values
+            cursor = (SORT_COLUMNS[sort][1](value), int(row_id))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+
+    fields = parse_selection(args, WORKORDER_SERIALIZER, default=DEFAULT_LIST_FIELDS)
+
+    start, end = _parse_day(args.get("from"), "from"), _parse_day(args.get("to"), "to")
+    if start and end and end < start:
+        raise ValueError("to must be on or after from")
+
+    try:
+        limit = parse_limit(args.get("limit"), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be a number")
+
+    return {
+        "projectIds": _int_list(args.get("projectId"), "projectId"),
+        "statuses": statuses,
+        "priorities": _int_list(args.get("priority"), "priority"),
+        "from": start,
+        "to": end,
+        "assigneeId": assignee,
+        "sort": sort,
+        "descending": descending,
+        "cursor": cursor,
+        "fields": fields,
+        "limit": limit,
+    }
+
+
+def accessible_project_ids(user: User):
+    """Subquery of the active projects a user may see, or None for admins (every active project)"""
+    active = select(Project.id).where(Project.isActive == True)
+    if user.role == UserRole.ADMIN:
+        return None
+    if user.role == UserRole.PROJECT_MANAGER:
+        scoped = union(
+            select(ProjectManager.projectId).where(ProjectManager.userId == user.id, ProjectManager.isActive == True),
+            select(Project.id).where(Project.projectManagerId == user.id),
+        )
+    elif user.role == UserRole.WORKER:
+        scoped = select(ProjectMember.projectId).where(ProjectMember.userId == user.id, ProjectMember.isActive == True)
+    else:
+        return select(Project.id).where(false())
+    return active.where(Project.id.in_(scoped))
+
+
+def query_workorders(user: User, filters: Dict[str, Any]) -> Tuple[List[WorkOrder], Optional[str]]:
+    """One page of active work orders the user can see, plus the cursor for the next page"""
+    query = WorkOrder.query.filter(WorkOrder.isActive == True)
+
+    scope = accessible_project_ids(user)
+    if scope is None:
+        query = query.filter(WorkOrder.projectId.in_(select(Project.id).where(Project.isActive == True)))
+    else:
+        query = query.filter(WorkOrder.projectId.in_(scope))
+
+    if filters["projectIds"]:
+        query = query.filter(WorkOrder.projectId.in_(filters["projectIds"]))
+    if filters["statuses"]:
+        query = query.filter(WorkOrder.status.in_(filters["statuses"]))
+    if filters["priorities"]:
+        query = query.filter(WorkOrder.priority.in_(filters["priorities"]))
+    # from/to select work orders whose planned dates overlap the window
+    if filters["from"]:
+        query = query.filter(WorkOrder.endDate >= filters["from"])
+    if filters["to"]:
+        query = query.filter(WorkOrder.startDate <= filters["to"])
+    if filters["assigneeId"] is not None:
+        query = query.filter(WorkOrder.id.in_(
+            select(WorkOrderWorker.workOrderId).where(
+                WorkOrderWorker.userId == filters["assigneeId"], WorkOrderWorker.isActive == True
+            )
+        ))
+
+    column = SORT_COLUMNS[filters["sort"]][0]
+    descending = filters["descending"]
+    if filters["cursor"]:
+        query = query.filter(keyset_after(column, WorkOrder.id, *filters["cursor"], descending=descending))
+    if column is WorkOrder.id:
+        order = (WorkOrder.id.desc(),) if descending else (WorkOrder.id,)
+    else:
+        order = (column.desc(), WorkOrder.id.desc()) if descending else (column, WorkOrder.id)
+
+    # Load only the requested columns (plus the sort key for the cursor) and batch any relationships
+    options = WORKORDER_SERIALIZER.query_options(filters["fields"], extra_columns=(filters["sort"],))
+
+    # Fetch one extra row to know whether another page exists
+    limit = filters["limit"]
+    rows = query.options(*options).order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, filters["sort"]), last.id)
+    return rows, next_cursor
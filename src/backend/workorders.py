@@ -1,54 +1,42 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from .models import db, User, Project, WorkOrder, WorkOrderWorker, WorkOrderStatus, UserRole, Audit, AuditEntityType, ProjectMember
-from .notification_service import notify_project_managers_of_change
+from sqlalchemy import func, or_
+
+from .models import db, User, Project, WorkOrder, WorkOrderWorker, WorkOrderStatus, WorkOrderDependency, WorkOrderStatusStats, UserRole, AuditEntityType, ProjectMember
+from .audit_buffer import record_audit
+from .assignment_service import load_assignment_rows, load_users_by_id, active_worker_ids, apply_worker_assignments
+from .workorder_query import parse_workorder_filters, query_workorders
+from .serializers import WORKORDER_SERIALIZER, parse_selection, serialize
+from .capacity_index import DEFAULT_WORKER_CAPACITY, assignment_conflicts, get_capacity_index, refresh_capacity
+from .import_service import ImportFileError, MAX_IMPORT_ROWS, iter_upload_rows, validate_import_row, insert_work_orders
 
 
 workorders_bp = Blueprint("workorders", __name__, url_prefix="/api/workorders")
 
 
 def create_audit_log(entity_type: AuditEntityType, entity_id: int, user_id: int, field: str, old_value: str, new_value: str, session_id: str = None, project_id: int = None):
-    """Helper function to create an audit log entry and notify project managers"""
-    audit_log = Audit(
-        entityType=entity_type,
-        entityId=entity_id,
-        userId=user_id,
-        field=field,
-        oldValue=old_value,
-        newValue=new_value,
-        sessionId=session_id,
-        projectId=project_id
+    """Helper function to queue an audit log entry; it is written when the session commits.
+
+    Work order changes are passed to the notification layer after the commit, consolidated
+    with the other changes made in the same request.
+    """
+    record_audit(
+        entity_type,
+        entity_id,
+        user_id,
+        field,
+        old_value,
+        new_value,
+        session_id,
+        project_id,
+        notify=entity_type == AuditEntityType.WORK_ORDER and bool(project_id)
     )
-    db.session.add(audit_log)
-    
-    # Notify project managers of important work order changes
-    if entity_type == AuditEntityType.WORK_ORDER and project_id:
-        try:
-            # Get work order name for better notification
-            work_order = WorkOrder.query.get(entity_id) if entity_id else None
-            entity_name = work_order.name if work_order else None
-            
-            notify_project_managers_of_change(
-                entity_type=entity_type,
-                entity_id=entity_id,
-                project_id=project_id,
-                user_id=user_id,
-                field=field,
-                old_value=old_value,
-                new_value=new_value,
-                entity_name=entity_name
-            )
-        except Exception as e:
-            # Log error but don't fail the audit log creation
-            import traceback
-            print(f"Failed to send notification for audit log: {str(e)}")
-            print(traceback.format_exc())
 
 
 def update_project_actual_cost(project_id: int):
@@ -76,6 +64,22 @@ def update_project_actual_cost(project_id: int):
         project.actualCost = total_actual_cost
 
 
+def update_projects_actual_cost(project_ids):
+    """Recompute actual cost for several projects with a single grouped SUM query"""
+    ids = {int(pid) for pid in project_ids}
+    if not ids:
+        return
+    
+    totals = dict(
+        db.session.query(WorkOrder.projectId, func.coalesce(func.sum(WorkOrder.actualCost), 0))
+        .filter(WorkOrder.projectId.in_(ids), WorkOrder.isActive == True)
+        .group_by(WorkOrder.projectId)
+        .all()
+    )
+    for project in Project.query.filter(Project.id.in_(ids), Project.isActive == True).all():
+        project.actualCost = Decimal(str(totals.get(project.id, 0) or 0))
+
+
 @workorders_bp.get("/test")
 def test_endpoint():
     """Test endpoint without JWT to verify routing works"""
@@ -188,9 +192,103 @@ def create_workorder():
 @workorders_bp.get("/")
 @jwt_required()
 def get_workorders():
-    """Get all work orders (accessible by all authenticated users)"""
-    workorders = WorkOrder.query.all()
-    return jsonify({"workorders": [workorder.to_dict() for workorder in workorders]}), 200
+    """List active work orders across the projects the user can see, one page at a time.
+
+    Query params: projectId, status, priority (comma-separated lists), from/to (YYYY-MM-DD, planned
+    dates overlap the window), assigneeId (number or "me"), sort (id, startDate, endDate, priority,
+    updatedAt; prefix "-" for descending), fields/include (sparse fieldsets), limit (max 200), cursor.
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    
+    try:
+        filters = parse_workorder_filters(request.args, user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    workorders, next_cursor = query_workorders(user, filters)
+    return jsonify({
+        "workorders": serialize(workorders, filters["fields"]),
+        "nextCursor": next_cursor,
+        "limit": filters["limit"],
+    }), 200
+
+
+@workorders_bp.post("/project/<int:project_id>/import")
+@jwt_required()
+def import_workorders(project_id):
+    """Create work orders for a project from an uploaded CSV or XLSX file.
+    
+    The file must have a header row with at least name, startDate, endDate and priority columns.
+    By default nothing is imported if any row is invalid; pass skipInvalid=true to import the
+    valid rows anyway, or dryRun=true to only validate.
+    """
+    auth_error = require_project_manager()
+    if auth_error:
+        return auth_error
+    
+    project = Project.query.filter_by(id=project_id, isActive=True).first()
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+    
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return jsonify({"error": "No file uploaded. Send the sheet in a 'file' form field"}), 400
+    
+    skip_invalid = request.args.get("skipInvalid", "false").lower() == "true"
+    dry_run = request.args.get("dryRun", "false").lower() == "true"
+    
+    valid_rows = []
+    errors = []
+    row_count = 0
+    try:
+        for row_number, row in iter_upload_rows(upload):
+            row_count += 1
+            if row_count > MAX_IMPORT_ROWS:
+                return jsonify({"error": f"Imports are limited to {MAX_IMPORT_ROWS} rows"}), 400
+            values, row_errors = validate_import_row(row, project)
+            if row_errors:
+                errors.append({"row": row_number, "errors": row_errors})
+            else:
+                valid_rows.append(values)
+    except ImportFileError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if row_count == 0:
+        return jsonify({"error": "The uploaded file has no work order rows"}), 400
+    
+    if errors and not skip_invalid:
+        return jsonify({
+            "error": "Some rows are invalid; no work orders were imported",
+            "errors": errors,
+            "validCount": len(valid_rows),
+        }), 400
+    
+    if dry_run:
+        return jsonify({"importedCount": 0, "validCount": len(valid_rows), "errors": errors, "dryRun": True}), 200
+    
+    created = insert_work_orders(valid_rows)
+    
+    # One audit batch and one cost recompute for the whole import
+    user_id = get_jwt_identity()
+    session_id = str(uuid.uuid4())
+    for wo in created:
+        record_audit(AuditEntityType.WORK_ORDER, wo.id, user_id, "work_order_created", None, wo.name,
+                     session_id, project_id, notify=True, entity_name=wo.name)
+
+    if any(wo.actualCost is not None for wo in created):
+        update_project_actual_cost(project_id)
+
+    db.session.commit()
+
+    return jsonify({
+        "importedCount": len(created),
+        "workorderIds": [wo.id for wo in created],
+        "errors": errors,
+        "message": f"Imported {len(created)} work order(s)",
+    }), 201
 
 
 @workorders_bp.get("/<int:workorder_id>")
@@ -213,27 +311,35 @@ def get_workorders_by_project(project_id):
     if not project:
         return jsonify({"error": "Project not found"}), 404
     
-    workorders = WorkOrder.query.filter_by(projectId=project_id, isActive=True).all()
-    return jsonify({"workorders": [workorder.to_dict() for workorder in workorders]}), 200
+    try:
+        selection = parse_selection(request.args, WORKORDER_SERIALIZER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    workorders = WorkOrder.query.options(*WORKORDER_SERIALIZER.query_options(selection)).filter_by(
+        projectId=project_id, isActive=True
+    ).all()
+    return jsonify({"workorders": serialize(workorders, selection)}), 200
 
-@workorders_bp.put("/<int:workorder_id>")
-@jwt_required()
-def update_workorder(workorder_id):
-    """Update a work order"""
-    # Check if user is a project manager
-    auth_error = require_project_manager()
-    if auth_error:
-        return auth_error
-    
-    workorder = WorkOrder.query.filter_by(id=workorder_id, isActive=True).first()
-    if not workorder:
-        return jsonify({"error": "Work order not found"}), 404
-    
-    user_id = get_jwt_identity()
-    # Generate a session ID for this update to group all changes together
-    session_id = str(uuid.uuid4())
-    payload = request.get_json(silent=True) or request.form.to_dict() or {}
+
+WORKORDER_UPDATE_FIELDS = (
+    "name", "description", "location", "suppliesList", "startDate", "endDate",
+    "actualStartDate", "actualEndDate", "status", "priority", "estimatedBudget", "actualCost",
+)
+
+# Fields workers may change through the worker update and batch endpoints
+WORKER_UPDATE_FIELDS = ("status", "actualCost")
+
+
+def apply_workorder_updates(workorder: WorkOrder, payload: dict, allowed_fields=WORKORDER_UPDATE_FIELDS):
+    """Validate a partial update payload and apply it to a work order.
+
+    Fields not in allowed_fields are ignored. Returns (changes, error) where changes is a list
+    of (field, old_value, new_value) tuples for audit logging and error is a message string
+    (or None). On error the work order may be partially modified; callers should roll back.
+    """
+    payload = {k: v for k, v in payload.items() if k in allowed_fields}
+    changes = []
     
     # Store original values for audit logging
     original_values = {
@@ -251,21 +357,20 @@ def update_workorder(workorder_id):
         "actualCost": f"{workorder.actualCost:.2f}" if workorder.actualCost else None,
     }
     
-    # Update fields if provided with audit logging
     if "name" in payload and payload["name"] != original_values["name"]:
-        create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "name", original_values["name"], payload["name"], session_id, workorder.projectId)
+        changes.append(("name", original_values["name"], payload["name"]))
         workorder.name = payload["name"]
     
     if "description" in payload and payload["description"] != original_values["description"]:
-        create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "description", original_values["description"], payload["description"], session_id, workorder.projectId)
+        changes.append(("description", original_values["description"], payload["description"]))
         workorder.description = payload["description"]
     
     if "location" in payload and payload["location"] != original_values["location"]:
-        create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "location", original_values["location"], payload["location"], session_id, workorder.projectId)
+        changes.append(("location", original_values["location"], payload["location"]))
         workorder.location = payload["location"]
     
     if "suppliesList" in payload and payload["suppliesList"] != original_values["suppliesList"]:
-        create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "suppliesList", original_values["suppliesList"], payload["suppliesList"], session_id, workorder.projectId)
+        changes.append(("suppliesList", original_values["suppliesList"], payload["suppliesList"]))
         workorder.suppliesList = payload["suppliesList"]
     
     if "startDate" in payload:
@@ -273,20 +378,20 @@ def update_workorder(workorder_id):
             new_start_date = datetime.strptime(payload["startDate"], "%Y-%m-%d").date()
             new_start_date_str = new_start_date.isoformat()
             if new_start_date_str != original_values["startDate"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "startDate", original_values["startDate"], new_start_date_str, session_id, workorder.projectId)
+                changes.append(("startDate", original_values["startDate"], new_start_date_str))
                 workorder.startDate = new_start_date
-        except ValueError:
-            return jsonify({"error": "Invalid start date format. Use YYYY-MM-DD"}), 400
+        except (TypeError, ValueError):
+            return changes, "Invalid start date format. Use YYYY-MM-DD"
     
     if "endDate" in payload:
         try:
             new_end_date = datetime.strptime(payload["endDate"], "%Y-%m-%d").date()
             new_end_date_str = new_end_date.isoformat()
             if new_end_date_str != original_values["endDate"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "endDate", original_values["endDate"], new_end_date_str, session_id, workorder.projectId)
+                changes.append(("endDate", original_values["endDate"], new_end_date_str))
                 workorder.endDate = new_end_date
-        except ValueError:
-            return jsonify({"error": "Invalid end date format. Use YYYY-MM-DD"}), 400
+        except (TypeError, ValueError):
+            return changes, "Invalid end date format. Use YYYY-MM-DD"
     
     if "actualStartDate" in payload:
         if payload["actualStartDate"]:
@@ -294,13 +399,13 @@ def update_workorder(workorder_id):
                 new_actual_start_date = datetime.strptime(payload["actualStartDate"], "%Y-%m-%d").date()
                 new_actual_start_date_str = new_actual_start_date.isoformat()
                 if new_actual_start_date_str != original_values["actualStartDate"]:
-                    create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualStartDate", original_values["actualStartDate"], new_actual_start_date_str, session_id, workorder.projectId)
+                    changes.append(("actualStartDate", original_values["actualStartDate"], new_actual_start_date_str))
                     workorder.actualStartDate = new_actual_start_date
-            except ValueError:
-                return jsonify({"error": "Invalid actual start date format. Use YYYY-MM-DD"}), 400
+            except (TypeError, ValueError):
+                return changes, "Invalid actual start date format. Use YYYY-MM-DD"
         else:
             if original_values["actualStartDate"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualStartDate", original_values["actualStartDate"], None, session_id, workorder.projectId)
+                changes.append(("actualStartDate", original_values["actualStartDate"], None))
             workorder.actualStartDate = None
     
     if "actualEndDate" in payload:
@@ -309,51 +414,54 @@ def update_workorder(workorder_id):
                 new_actual_end_date = datetime.strptime(payload["actualEndDate"], "%Y-%m-%d").date()
                 new_actual_end_date_str = new_actual_end_date.isoformat()
                 if new_actual_end_date_str != original_values["actualEndDate"]:
-                    create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualEndDate", original_values["actualEndDate"], new_actual_end_date_str, session_id, workorder.projectId)
+                    changes.append(("actualEndDate", original_values["actualEndDate"], new_actual_end_date_str))
                     workorder.actualEndDate = new_actual_end_date
-            except ValueError:
-                return jsonify({"error": "Invalid actual end date format. Use YYYY-MM-DD"}), 400
+            except (TypeError, ValueError):
+                return changes, "Invalid actual end date format. Use YYYY-MM-DD"
         else:
             if original_values["actualEndDate"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualEndDate", original_values["actualEndDate"], None, session_id, workorder.projectId)
+                changes.append(("actualEndDate", original_values["actualEndDate"], None))
             workorder.actualEndDate = None
     
     if "status" in payload:
         try:
             new_status = WorkOrderStatus(payload["status"].lower())
             if new_status.value != original_values["status"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "status", original_values["status"], new_status.value, session_id, workorder.projectId)
+                changes.append(("status", original_values["status"], new_status.value))
                 workorder.status = new_status
-        except ValueError:
-            return jsonify({"error": "Invalid status. Must be pending, in_progress, on_hold, completed, or cancelled"}), 400
+        except (AttributeError, ValueError):
+            return changes, "Invalid status. Must be pending, in_progress, on_hold, completed, or cancelled"
     
     if "priority" in payload:
         try:
+            # int(True) would quietly become priority 1
+            if isinstance(payload["priority"], bool):
+                raise TypeError
             priority = int(payload["priority"])
             if priority < 1 or priority > 5:
-                return jsonify({"error": "Priority must be between 1 and 5"}), 400
+                return changes, "Priority must be between 1 and 5"
             priority_str = str(priority)
             if priority_str != original_values["priority"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "priority", original_values["priority"], priority_str, session_id, workorder.projectId)
+                changes.append(("priority", original_values["priority"], priority_str))
                 workorder.priority = priority
-        except ValueError:
-            return jsonify({"error": "Priority must be a number between 1 and 5"}), 400
+        except (TypeError, ValueError):
+            return changes, "Priority must be a number between 1 and 5"
     
     if "estimatedBudget" in payload:
         if payload["estimatedBudget"]:
             try:
                 estimated_budget = float(payload["estimatedBudget"])
                 if estimated_budget < 0:
-                    return jsonify({"error": "Estimated budget must be positive"}), 400
+                    return changes, "Estimated budget must be positive"
                 budget_str = f"{estimated_budget:.2f}"
                 if budget_str != original_values["estimatedBudget"]:
-                    create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "estimatedBudget", original_values["estimatedBudget"], budget_str, session_id, workorder.projectId)
+                    changes.append(("estimatedBudget", original_values["estimatedBudget"], budget_str))
                     workorder.estimatedBudget = estimated_budget
-            except ValueError:
-                return jsonify({"error": "Invalid estimated budget format"}), 400
+            except (TypeError, ValueError):
+                return changes, "Invalid estimated budget format"
         else:
             if original_values["estimatedBudget"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "estimatedBudget", original_values["estimatedBudget"], None, session_id, workorder.projectId)
+                changes.append(("estimatedBudget", original_values["estimatedBudget"], None))
             workorder.estimatedBudget = None
     
     if "actualCost" in payload:
@@ -361,31 +469,161 @@ def update_workorder(workorder_id):
             try:
                 actual_cost = float(payload["actualCost"])
                 if actual_cost < 0:
-                    return jsonify({"error": "Actual cost must be positive"}), 400
+                    return changes, "Actual cost must be positive"
                 cost_str = f"{actual_cost:.2f}"
                 if cost_str != original_values["actualCost"]:
-                    create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualCost", original_values["actualCost"], cost_str, session_id, workorder.projectId)
+                    changes.append(("actualCost", original_values["actualCost"], cost_str))
                     workorder.actualCost = actual_cost
-            except ValueError:
-                return jsonify({"error": "Invalid actual cost format"}), 400
+            except (TypeError, ValueError):
+                return changes, "Invalid actual cost format"
         else:
             if original_values["actualCost"]:
-                create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, "actualCost", original_values["actualCost"], None, session_id, workorder.projectId)
+                changes.append(("actualCost", original_values["actualCost"], None))
             workorder.actualCost = None
     
     # Validate date consistency after updates
     if workorder.startDate >= workorder.endDate:
-        return jsonify({"error": "End date must be after start date"}), 400
+        return changes, "End date must be after start date"
+    
+    return changes, None
+
+
+@workorders_bp.put("/<int:workorder_id>")
+@jwt_required()
+def update_workorder(workorder_id):
+    """Update a work order"""
+    # Check if user is a project manager
+    auth_error = require_project_manager()
+    if auth_error:
+        return auth_error
+    
+    workorder = WorkOrder.query.filter_by(id=workorder_id, isActive=True).first()
+    if not workorder:
+        return jsonify({"error": "Work order not found"}), 404
+    
+    user_id = get_jwt_identity()
+    # Generate a session ID for this update to group all changes together
+    session_id = str(uuid.uuid4())
+    payload = request.get_json(silent=True) or request.form.to_dict() or {}
+    
+    changes, error = apply_workorder_updates(workorder, payload)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    for field, old_value, new_value in changes:
+        create_audit_log(AuditEntityType.WORK_ORDER, workorder_id, user_id, field, old_value, new_value, session_id, workorder.projectId)
     
     # Update project's actual cost if work order actual cost was changed
     if "actualCost" in payload:
         update_project_actual_cost(workorder.projectId)
     
     db.session.commit()
+    refresh_capacity([workorder_id])
     
     return jsonify({"workorder": workorder.to_dict()}), 200
 
 
+# Upper bound on updates accepted by a single batch request
+MAX_BATCH_UPDATES = 500
+
+
+@workorders_bp.patch("/batch")
+@jwt_required()
+def batch_update_workorders():
+    """Apply updates to many work orders in one transaction.
+    
+    Project managers may change any field accepted by PUT /<id>; workers may only change
+    status and actualCost. Either every update is applied or none are.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.filter_by(id=user_id, isActive=True).first()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    
+    if user.role == UserRole.PROJECT_MANAGER:
+        allowed_fields = WORKORDER_UPDATE_FIELDS
+    elif user.role == UserRole.WORKER:
+        allowed_fields = WORKER_UPDATE_FIELDS
+    else:
+        return jsonify({"error": "Only project managers and workers can update work orders"}), 403
+    
+    payload = request.get_json(silent=True) or {}
+    updates = payload.get("updates")
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "updates must be a non-empty list"}), 400
+    if len(updates) > MAX_BATCH_UPDATES:
+        return jsonify({"error": f"A batch may contain at most {MAX_BATCH_UPDATES} updates"}), 400
+    
+    workorder_ids = []
+    for item in updates:
+        # bool is a subclass of int, so {"id": true} would otherwise pass
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int) or isinstance(item["id"], bool):
+            return jsonify({"error": "Each update must be an object with a numeric id"}), 400
+        workorder_ids.append(item["id"])
+    if len(set(workorder_ids)) != len(workorder_ids):
+        return jsonify({"error": "Each work order may only appear once per batch"}), 400
+    
+    # Load every targeted work order in one query
+    workorders = {
+        wo.id: wo
+        for wo in WorkOrder.query.filter(WorkOrder.id.in_(workorder_ids), WorkOrder.isActive == True).all()
+    }
+    missing = [wid for wid in workorder_ids if wid not in workorders]
+    if missing:
+        return jsonify({"error": "Work orders not found", "missingIds": missing}), 404
+    
+    if user.role == UserRole.WORKER:
+        project_ids = {wo.projectId for wo in workorders.values()}
+        member_project_ids = {
+            pid for (pid,) in db.session.query(ProjectMember.projectId).filter(
+                ProjectMember.userId == user.id,
+                ProjectMember.projectId.in_(project_ids),
+                ProjectMember.isActive == True
+            ).all()
+        }
+        if project_ids - member_project_ids:
+            return jsonify({"error": "You can only update work orders in projects you are a member of"}), 403
+    
+    session_id = str(uuid.uuid4())
+    audit_count = 0
+    updated_count = 0
+    errors = []
+    cost_project_ids = set()
+    
+    for item in updates:
+        workorder = workorders[item["id"]]
+        changes, error = apply_workorder_updates(workorder, item, allowed_fields)
+        if error:
+            errors.append({"id": workorder.id, "error": error})
+            continue
+        
+        if changes:
+            updated_count += 1
+        for field, old_value, new_value in changes:
+            record_audit(AuditEntityType.WORK_ORDER, workorder.id, user_id, field, old_value, new_value,
+                         session_id, workorder.projectId, notify=True, entity_name=workorder.name)
+            audit_count += 1
+        if "actualCost" in item and "actualCost" in allowed_fields:
+            cost_project_ids.add(workorder.projectId)
+    
+    if errors:
+        db.session.rollback()
+        return jsonify({"error": "One or more updates are invalid; no changes were applied", "errors": errors}), 400
+    
+    # Recompute each affected project's cost once instead of once per work order
+    update_projects_actual_cost(cost_project_ids)
+
+    # Buffered audits go out as one insert on commit; the digest email follows the response
+    db.session.commit()
+    refresh_capacity(workorder_ids)
+
+    return jsonify({
+        "workorders": [workorders[wid].to_dict() for wid in workorder_ids],
+        "updatedCount": updated_count,
+        "auditCount": audit_count,
+    }), 200
+
+
 @workorders_bp.post("/<int:workorder_id>/complete")
 @jwt_required()
 def complete_workorder(workorder_id):
@@ -395,11 +633,14 @@ def complete_workorder(workorder_id):
     if not workorder:
         return jsonify({"error": "Work order not found"}), 404
 
+    if workorder.status != WorkOrderStatus.COMPLETED:
+        create_audit_log(AuditEntityType.WORK_ORDER, workorder.id, get_jwt_identity(), "status", workorder.status.value if workorder.status else None, WorkOrderStatus.COMPLETED.value, str(uuid.uuid4()), workorder.projectId)
     workorder.status = WorkOrderStatus.COMPLETED
     workorder.actualEndDate = date.today()
 
     # Ensure date consistency; if planned end before start, keep as is
     db.session.commit()
+    refresh_capacity([workorder_id])
     return jsonify({"workorder": workorder.to_dict()}), 200
 
 
@@ -411,9 +652,12 @@ def start_workorder(workorder_id):
     if not workorder:
         return jsonify({"error": "Work order not found"}), 404
 
+    if workorder.status != WorkOrderStatus.IN_PROGRESS:
+        create_audit_log(AuditEntityType.WORK_ORDER, workorder.id, get_jwt_identity(), "status", workorder.status.value if workorder.status else None, WorkOrderStatus.IN_PROGRESS.value, str(uuid.uuid4()), workorder.projectId)
     workorder.actualStartDate = date.today()
     workorder.status = WorkOrderStatus.IN_PROGRESS
     db.session.commit()
+    refresh_capacity([workorder_id])
     return jsonify({"workorder": workorder.to_dict()}), 200
 
 
@@ -513,76 +757,24 @@ def assign_worker_to_workorder(workorder_id):
     if not is_project_member:
         return jsonify({"error": "Worker must be a member of this project to be assigned to work orders"}), 400
     
-    # Check if already assigned
-    existing_assignment = WorkOrderWorker.query.filter_by(
-        workOrderId=workorder_id, 
-        userId=user_id_to_assign,
-        isActive=True
-    ).first()
-    
-    if existing_assignment:
+    # Load all assignment rows for this work order once and diff in memory
+    rows = load_assignment_rows([workorder_id])
+    current = active_worker_ids(rows[workorder_id])
+    if user_id_to_assign in current:
         return jsonify({"error": "Worker is already assigned to this work order"}), 400
     
-    # Check if there's an inactive assignment to reactivate
-    inactive_assignment = WorkOrderWorker.query.filter_by(
-        workOrderId=workorder_id,
-        userId=user_id_to_assign,
-        isActive=False
-    ).first()
-    
-    # Get current assigned workers for audit log
-    current_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-    old_worker_ids = [a.userId for a in current_assignments]
-    old_worker_names = []
-    for wid in old_worker_ids:
-        w = User.query.filter_by(id=wid).first()
-        if w:
-            old_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-    old_value = ", ".join(old_worker_names) if old_worker_names else "None"
-    
-    if inactive_assignment:
-        inactive_assignment.isActive = True
-        inactive_assignment.assignedAt = datetime.utcnow()
-    else:
-        # Create new assignment
-        assignment = WorkOrderWorker(
-            workOrderId=workorder_id,
-            userId=user_id_to_assign
-        )
-        db.session.add(assignment)
-    
-    db.session.flush()  # Flush to ensure assignment is saved
-    
-    # Get updated assigned workers for audit log
-    updated_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-    new_worker_ids = [a.userId for a in updated_assignments]
-    new_worker_names = []
-    for wid in new_worker_ids:
-        w = User.query.filter_by(id=wid).first()
-        if w:
-            new_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-    new_value = ", ".join(new_worker_names) if new_worker_names else "None"
-    
-    # Create audit log for worker assignment
     user_id = get_jwt_identity()
-    session_id = str(uuid.uuid4())
-    create_audit_log(
-        AuditEntityType.WORK_ORDER,
-        workorder_id,
-        user_id,
-        "assignedWorkers",
-        old_value,
-        new_value,
-        session_id,
-        workorder.projectId
-    )
+    apply_worker_assignments([workorder], {workorder_id: current | {user_id_to_assign}}, user_id, rows=rows)
     
     db.session.commit()
+    refresh_capacity([workorder_id])
     
     # Refresh work order to get updated assigned workers
     workorder = WorkOrder.query.filter_by(id=workorder_id, isActive=True).first()
     
-    return jsonify({"workorder": workorder.to_dict(), "message": "Worker assigned successfully"}), 200
+    # Assignments are saved either way; overlapping bookings come back as warnings
+    conflicts = [c for c in assignment_conflicts([workorder_id]) if c["userId"] == user_id_to_assign]
+    return jsonify({"workorder": workorder.to_dict(), "capacityWarnings": conflicts, "message": "Worker assigned successfully"}), 200
 
 
 @workorders_bp.post("/<int:workorder_id>/remove-worker")
@@ -608,54 +800,17 @@ def remove_worker_from_workorder(workorder_id):
     except ValueError:
         return jsonify({"error": "userId must be a number"}), 400
     
-    # Find and deactivate the assignment
-    assignment = WorkOrderWorker.query.filter_by(
-        workOrderId=workorder_id,
-        userId=user_id_to_remove,
-        isActive=True
-    ).first()
-    
-    if not assignment:
+    # Load all assignment rows for this work order once and diff in memory
+    rows = load_assignment_rows([workorder_id])
+    current = active_worker_ids(rows[workorder_id])
+    if user_id_to_remove not in current:
         return jsonify({"error": "Worker is not assigned to this work order"}), 404
     
-    # Get current assigned workers for audit log
-    current_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-    old_worker_ids = [a.userId for a in current_assignments]
-    old_worker_names = []
-    for wid in old_worker_ids:
-        w = User.query.filter_by(id=wid).first()
-        if w:
-            old_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-    old_value = ", ".join(old_worker_names) if old_worker_names else "None"
-    
-    assignment.isActive = False
-    db.session.flush()  # Flush to ensure assignment is saved
-    
-    # Get updated assigned workers for audit log
-    updated_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-    new_worker_ids = [a.userId for a in updated_assignments]
-    new_worker_names = []
-    for wid in new_worker_ids:
-        w = User.query.filter_by(id=wid).first()
-        if w:
-            new_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-    new_value = ", ".join(new_worker_names) if new_worker_names else "None"
-    
-    # Create audit log for worker removal
     user_id = get_jwt_identity()
-    session_id = str(uuid.uuid4())
-    create_audit_log(
-        AuditEntityType.WORK_ORDER,
-        workorder_id,
-        user_id,
-        "assignedWorkers",
-        old_value,
-        new_value,
-        session_id,
-        workorder.projectId
-    )
+    apply_worker_assignments([workorder], {workorder_id: current - {user_id_to_remove}}, user_id, rows=rows)
     
     db.session.commit()
+    refresh_capacity([workorder_id])
     
     # Refresh work order to get updated assigned workers
     workorder = WorkOrder.query.filter_by(id=workorder_id, isActive=True).first()
@@ -663,6 +818,31 @@ def remove_worker_from_workorder(workorder_id):
     return jsonify({"workorder": workorder.to_dict(), "message": "Worker removed successfully"}), 200
 
 
+def validate_assignable_workers(worker_ids: set, project_ids: set):
+    """Check that workers exist, are active workers and belong to the given projects.
+
+    Returns (members_by_project, error_response). members_by_project maps project ID to the
+    set of active member IDs so callers can check per-project membership without more queries.
+    """
+    if worker_ids:
+        valid_worker_ids = {w.id for w in User.query.filter(
+            User.id.in_(worker_ids),
+            User.isActive == True,
+            User.role == UserRole.WORKER
+        ).all()}
+        if valid_worker_ids != worker_ids:
+            return None, (jsonify({"error": "One or more worker IDs are invalid"}), 400)
+    
+    members_by_project = {pid: set() for pid in project_ids}
+    if project_ids:
+        for pid, uid in db.session.query(ProjectMember.projectId, ProjectMember.userId).filter(
+            ProjectMember.projectId.in_(project_ids),
+            ProjectMember.isActive == True
+        ).all():
+            members_by_project[pid].add(uid)
+    return members_by_project, None
+
+
 @workorders_bp.put("/<int:workorder_id>/assign-workers")
 @jwt_required()
 def assign_workers_to_workorder(workorder_id):
@@ -681,99 +861,228 @@ def assign_workers_to_workorder(workorder_id):
     if not isinstance(worker_ids, list):
         return jsonify({"error": "workerIds must be a list"}), 400
     
-    # Validate all workers exist and are workers
-    worker_ids = [int(wid) for wid in worker_ids]
-    workers = User.query.filter(
-        User.id.in_(worker_ids),
-        User.isActive == True,
-        User.role == UserRole.WORKER
-    ).all()
-    
-    if len(workers) != len(worker_ids):
-        return jsonify({"error": "One or more worker IDs are invalid"}), 400
+    try:
+        worker_ids = {int(wid) for wid in worker_ids}
+    except (ValueError, TypeError):
+        return jsonify({"error": "workerIds must be a list of numbers"}), 400
     
-    # Validate that all workers are members of the project
-    project_id = workorder.projectId
-    project_member_ids = {pm.userId for pm in ProjectMember.query.filter_by(
-        projectId=project_id, 
-        isActive=True
-    ).all()}
+    # Validate all workers exist, are workers, and are members of the project
+    members_by_project, error = validate_assignable_workers(worker_ids, {workorder.projectId})
+    if error:
+        return error
     
-    invalid_workers = [wid for wid in worker_ids if wid not in project_member_ids]
+    invalid_workers = sorted(worker_ids - members_by_project[workorder.projectId])
     if invalid_workers:
         return jsonify({
             "error": f"One or more workers are not members of this project. Worker IDs: {invalid_workers}"
         }), 400
     
-    # Get current assigned workers for audit log
-    current_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-    old_worker_ids = set([a.userId for a in current_assignments])
-    old_worker_ids_sorted = sorted(old_worker_ids)
-    old_worker_names = []
-    for wid in old_worker_ids_sorted:
-        w = User.query.filter_by(id=wid).first()
-        if w:
-            old_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-    old_value = ", ".join(old_worker_names) if old_worker_names else "None"
-    
-    # Check if workers have actually changed (using sets to compare regardless of order)
-    new_worker_ids = set(worker_ids)
-    workers_changed = old_worker_ids != new_worker_ids
-    
-    # Deactivate all current assignments
-    WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).update({"isActive": False})
-    
-    # Create or reactivate assignments for the new worker list
-    for worker_id in worker_ids:
-        existing = WorkOrderWorker.query.filter_by(
-            workOrderId=workorder_id,
-            userId=worker_id
-        ).first()
-        
-        if existing:
-            existing.isActive = True
-            existing.assignedAt = datetime.utcnow()
-        else:
-            assignment = WorkOrderWorker(
-                workOrderId=workorder_id,
-                userId=worker_id
-            )
-            db.session.add(assignment)
-    
-    db.session.flush()  # Flush to ensure assignments are saved
-    
-    # Only create audit log if workers actually changed
-    if workers_changed:
-        # Get updated assigned workers for audit log
-        updated_assignments = WorkOrderWorker.query.filter_by(workOrderId=workorder_id, isActive=True).all()
-        new_worker_ids_sorted = sorted([a.userId for a in updated_assignments])
-        new_worker_names = []
-        for wid in new_worker_ids_sorted:
-            w = User.query.filter_by(id=wid).first()
-            if w:
-                new_worker_names.append(f"{w.firstName} {w.lastName}".strip() or w.emailAddress)
-        new_value = ", ".join(new_worker_names) if new_worker_names else "None"
-        
-        # Create audit log for worker assignment
-        user_id = get_jwt_identity()
-        session_id = str(uuid.uuid4())
-        create_audit_log(
-            AuditEntityType.WORK_ORDER,
-            workorder_id,
-            user_id,
-            "assignedWorkers",
-            old_value,
-            new_value,
-            session_id,
-            workorder.projectId
-        )
+    # Diff old and new worker sets in memory; only changed rows are written and audited
+    user_id = get_jwt_identity()
+    apply_worker_assignments([workorder], {workorder_id: worker_ids}, user_id)
     
     db.session.commit()
+    refresh_capacity([workorder_id])
     
     # Refresh work order to get updated assigned workers
     workorder = WorkOrder.query.filter_by(id=workorder_id, isActive=True).first()
     
-    return jsonify({"workorder": workorder.to_dict(), "message": "Workers assigned successfully"}), 200
+    return jsonify({
+        "workorder": workorder.to_dict(),
+        "capacityWarnings": assignment_conflicts([workorder_id]),
+        "message": "Workers assigned successfully"
+    }), 200
+
+
+@workorders_bp.put("/assign-workers/batch")
+@jwt_required()
+def batch_assign_workers():
+    """Change worker assignments on many work orders at once (only project managers can do this).
+
+    Body: {"assignments": [{"workOrderId": 1, "workerIds": [..]}, {"workOrderId": 2, "addWorkerIds": [..], "removeWorkerIds": [..]}]}
+    "workerIds" replaces the worker set; "addWorkerIds"/"removeWorkerIds" adjust it. All changes are
+    validated up front and written in one transaction.
+    """
+    auth_error = require_project_manager()
+    if auth_error:
+        return auth_error
+    
+    payload = request.get_json(silent=True) or {}
+    assignments = payload.get("assignments")
+    
+    if not isinstance(assignments, list) or not assignments:
+        return jsonify({"error": "assignments must be a non-empty list"}), 400
+    
+    # Parse entries
+    parsed = {}
+    try:
+        for entry in assignments:
+            wo_id = int(entry["workOrderId"])
+            if wo_id in parsed:
+                return jsonify({"error": f"Work order {wo_id} appears more than once"}), 400
+            parsed[wo_id] = {
+                "replace": {int(w) for w in entry["workerIds"]} if entry.get("workerIds") is not None else None,
+                "add": {int(w) for w in entry.get("addWorkerIds") or []},
+                "remove": {int(w) for w in entry.get("removeWorkerIds") or []},
+            }
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({"error": "Each assignment needs a numeric workOrderId and lists of numeric worker IDs"}), 400
+    
+    workorders = WorkOrder.query.filter(WorkOrder.id.in_(parsed.keys()), WorkOrder.isActive == True).all()
+    missing = sorted(set(parsed.keys()) - {wo.id for wo in workorders})
+    if missing:
+        return jsonify({"error": f"Work orders not found: {missing}"}), 404
+    
+    # Build desired worker sets from current assignments loaded in one query
+    rows = load_assignment_rows(parsed.keys())
+    desired = {}
+    for wo_id, spec in parsed.items():
+        base = spec["replace"] if spec["replace"] is not None else active_worker_ids(rows[wo_id])
+        desired[wo_id] = (base | spec["add"]) - spec["remove"]
+    
+    # Validate workers and project membership for every work order
+    incoming = set().union(*(spec["add"] | (spec["replace"] or set()) for spec in parsed.values()))
+    members_by_project, error = validate_assignable_workers(incoming, {wo.projectId for wo in workorders})
+    if error:
+        return error
+    
+    for wo in workorders:
+        new_ids = desired[wo.id] - active_worker_ids(rows[wo.id])
+        invalid_workers = sorted(new_ids - members_by_project[wo.projectId])
+        if invalid_workers:
+            return jsonify({
+                "error": f"One or more workers are not members of the project for work order {wo.id}. Worker IDs: {invalid_workers}"
+            }), 400
+    
+    user_id = get_jwt_identity()
+    changes = apply_worker_assignments(workorders, desired, user_id, rows=rows)
+    
+    db.session.commit()
+    refresh_capacity(changes.keys())
+    
+    workorders = WorkOrder.query.filter(WorkOrder.id.in_(parsed.keys()), WorkOrder.isActive == True).all()
+    
+    return jsonify({
+        "workorders": [wo.to_dict() for wo in workorders],
+        "changes": [{"workOrderId": wo_id, **change} for wo_id, change in sorted(changes.items())],
+        "capacityWarnings": assignment_conflicts(changes.keys()),
+        "message": f"Updated worker assignments on {len(changes)} work orders"
+    }), 200
+
+
+def require_capacity_viewer():
+    """Capacity views show bookings across projects, so only project managers and admins can see them"""
+    user = User.query.filter_by(id=get_jwt_identity(), isActive=True).first()
+    if not user or user.role not in (UserRole.PROJECT_MANAGER, UserRole.ADMIN):
+        return jsonify({"error": "Only project managers can view worker capacity"}), 403
+    return None
+
+
+def parse_capacity_window(args):
+    """Read from/to (YYYY-MM-DD, default today and 30 days on) and an optional projectId.
+
+    Returns (start, end, project_id, error_response).
+    """
+    try:
+        start = datetime.strptime(args["from"], "%Y-%m-%d").date() if args.get("from") else date.today()
+        end = datetime.strptime(args["to"], "%Y-%m-%d").date() if args.get("to") else start + timedelta(days=30)
+    except ValueError:
+        return None, None, None, (jsonify({"error": "from and to must be YYYY-MM-DD"}), 400)
+    if end < start:
+        return None, None, None, (jsonify({"error": "to must be on or after from"}), 400)
+    try:
+        project_id = int(args["projectId"]) if args.get("projectId") else None
+    except ValueError:
+        return None, None, None, (jsonify({"error": "projectId must be a number"}), 400)
+    return start, end, project_id, None
+
+
+def load_candidate_workers(project_id=None):
+    """Active workers, limited to a project's members when project_id is given"""
+    query = User.query.filter(User.isActive == True, User.role == UserRole.WORKER)
+    if project_id is not None:
+        query = query.join(ProjectMember, ProjectMember.userId == User.id).filter(
+            ProjectMember.projectId == project_id,
+            ProjectMember.isActive == True
+        )
+    return query.order_by(User.id).all()
+
+
+@workorders_bp.get("/workers/availability")
+@jwt_required()
+def get_worker_availability():
+    """Which workers are free between two dates, across every project.
+
+    Query params: from, to (YYYY-MM-DD, default the next 30 days), projectId (only that project's members).
+    A worker is busy if any pending or in-progress work order they are assigned to overlaps the window.
+    """
+    auth_error = require_capacity_viewer()
+    if auth_error:
+        return auth_error
+    
+    start, end, project_id, error = parse_capacity_window(request.args)
+    if error:
+        return error
+    
+    busy = get_capacity_index().busy_workers(start, end)
+    available, booked = [], []
+    for worker in load_candidate_workers(project_id):
+        entries = busy.get(worker.id)
+        if not entries:
+            available.append(worker.to_dict())
+        else:
+            booked.append({
+                "worker": worker.to_dict(),
+                "workOrderIds": sorted(e["workOrderId"] for e in entries),
+                "projectIds": sorted({e["projectId"] for e in entries}),
+            })
+    
+    return jsonify({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "available": available,
+        "busy": booked,
+    }), 200
+
+
+@workorders_bp.get("/workers/overallocated")
+@jwt_required()
+def get_overallocated_workers():
+    """Workers booked on more concurrent work orders than their capacity, across every project.
+
+    Query params: from, to (YYYY-MM-DD, default the next 30 days), projectId (only that project's members),
+    capacity (concurrent work orders allowed, default 1).
+    """
+    auth_error = require_capacity_viewer()
+    if auth_error:
+        return auth_error
+    
+    start, end, project_id, error = parse_capacity_window(request.args)
+    if error:
+        return error
+    try:
+        capacity = int(request.args.get("capacity", DEFAULT_WORKER_CAPACITY))
+    except ValueError:
+        return jsonify({"error": "capacity must be a number"}), 400
+    if capacity < 1:
+        return jsonify({"error": "capacity must be at least 1"}), 400
+    
+    overallocated = get_capacity_index().overallocated(start, end, capacity)
+    if project_id is not None:
+        members = {w.id for w in load_candidate_workers(project_id)}
+        overallocated = [entry for entry in overallocated if entry["userId"] in members]
+    
+    users = load_users_by_id(entry["userId"] for entry in overallocated)
+    for entry in overallocated:
+        user = users.get(entry["userId"])
+        entry["worker"] = user.to_dict() if user else None
+    
+    return jsonify({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "capacity": capacity,
+        "workers": overallocated,
+    }), 200
 
 
 @workorders_bp.delete("/<int:workorder_id>")
@@ -805,11 +1114,18 @@ def delete_workorder(workorder_id):
         project_id=project_id
     )
     
+    # Drop rows that reference the work order so the delete is not blocked by their foreign keys
+    WorkOrderDependency.query.filter(or_(
+        WorkOrderDependency.predecessorId == workorder_id, WorkOrderDependency.successorId == workorder_id
+    )).delete(synchronize_session=False)
+    WorkOrderStatusStats.query.filter_by(workOrderId=workorder_id).delete(synchronize_session=False)
+
     db.session.delete(workorder)
     
     # Update project's actual cost after deleting work order
     update_project_actual_cost(project_id)
     
     db.session.commit()
+    refresh_capacity([workorder_id])
     
     return jsonify({"message": "Work order deleted successfully"}), 200
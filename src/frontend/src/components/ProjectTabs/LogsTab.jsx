@@ -2,11 +2,15 @@ import React, { useState, useEffect } from "react";
 import { FaUser, FaCalendarAlt, FaDollarSign, FaMapMarkerAlt, FaFlag, FaCog, FaBox } from "react-icons/fa";
 import { projectsAPI } from "../../services/api";
 
+const PAGE_SIZE = 100;
+
 const LogsTab = ({ project, refreshTrigger, onNavigateToTab }) => {
     const [auditLogs, setAuditLogs] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [timeFilter, setTimeFilter] = useState('all'); // 'all', 'today', 'week', 'month'
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchAuditLogs();
@@ -16,8 +20,9 @@ const LogsTab = ({ project, refreshTrigger, onNavigateToTab }) => {
         try {
             setLoading(true);
             setError(null);
-            const response = await projectsAPI.getProjectAuditLogs(project.id);
+            const response = await projectsAPI.getProjectAuditLogs(project.id, { limit: PAGE_SIZE });
             setAuditLogs(response.auditLogs || []);
+            setNextCursor(response.hasMore ? response.nextCursor : null);
         } catch (err) {
             console.error('Error fetching audit logs:', err);
             setError(err.message);
@@ -26,6 +31,21 @@ const LogsTab = ({ project, refreshTrigger, onNavigateToTab }) => {
         }
     };
 
+    const loadMoreAuditLogs = async () => {
+        if (!nextCursor) return;
+        try {
+            setLoadingMore(true);
+            const response = await projectsAPI.getProjectAuditLogs(project.id, { limit: PAGE_SIZE, cursor: nextCursor });
+            setAuditLogs(prev => [...prev, ...(response.auditLogs || [])]);
+            setNextCursor(response.hasMore ? response.nextCursor : null);
+        } catch (err) {
+            console.error('Error fetching more audit logs:', err);
+            setError(err.message);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getFieldIcon = (field) => {
         switch (field) {
             case 'name':
@@ -582,6 +602,18 @@ const LogsTab = ({ project, refreshTrigger, onNavigateToTab }) => {
                     )}
                 </div>
             )}
+
+            {nextCursor && (
+                <div style={styles.loadMoreContainer}>
+                    <button
+                        style={styles.filterButton}
+                        onClick={loadMoreAuditLogs}
+                        disabled={loadingMore}
+                    >
+                        {loadingMore ? 'Loading...' : 'Load older activity'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
@@ -591,6 +623,11 @@ const styles = {
         width: '100%',
         padding: '0 1rem',
     },
+    loadMoreContainer: {
+        display: 'flex',
+        justifyContent: 'center',
+        margin: '1.5rem 0',
+    },
     title: {
         fontSize: '1.8rem',
         fontWeight: '600',
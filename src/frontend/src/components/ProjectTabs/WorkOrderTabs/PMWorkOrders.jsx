@@ -91,7 +91,8 @@ const PMWorkOrders = ({ project, onWorkOrderUpdate, onNavigateToSupplies, highli
   const fetchWorkers = async () => {
     try {
       setLoadingWorkers(true);
-      const workers = await usersAPI.getWorkers();
+      // Only this project's workers can be assigned, so fetch just those from the directory
+      const workers = project?.id ? await usersAPI.getProjectWorkers(project.id) : [];
       setAllWorkers(workers || []);
     } catch (err) {
       console.error("Error fetching workers:", err);
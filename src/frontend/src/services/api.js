@@ -28,8 +28,9 @@ apiClient.interceptors.request.use((config) => {
 });
 
 export const projectsAPI = {
-  getProjects: async () => {
-    const response = await apiClient.get("/projects/my-projects");
+  // params: fields, include (e.g. { fields: "name,status" } for pickers that only need names)
+  getProjects: async (params = {}) => {
+    const response = await apiClient.get("/projects/my-projects", { params });
     return response.data.projects;
   },
 
@@ -62,8 +63,26 @@ export const projectsAPI = {
     return true;
   },
 
-  getProjectAuditLogs: async (projectId) => {
-    const response = await apiClient.get(`/projects/${projectId}/audit-logs`);
+  getDependencies: async (projectId) => {
+    const response = await apiClient.get(`/projects/${projectId}/schedule/dependencies`);
+    return response.data.dependencies;
+  },
+
+  addDependency: async (projectId, predecessorId, successorId, lagDays = 0) => {
+    const response = await apiClient.post(
+      `/projects/${projectId}/schedule/dependencies`,
+      { predecessorId, successorId, lagDays }
+    );
+    return response.data.dependency;
+  },
+
+  removeDependency: async (projectId, dependencyId) => {
+    await apiClient.delete(`/projects/${projectId}/schedule/dependencies/${dependencyId}`);
+    return true;
+  },
+
+  getProjectAuditLogs: async (projectId, params = {}) => {
+    const response = await apiClient.get(`/projects/${projectId}/audit-logs`, { params });
     return response.data;
   },
 
@@ -214,6 +233,50 @@ export const projectsAPI = {
       );
       return response.data;
     },
+    statusAnalytics: async (projectId, params = {}) => {
+      const response = await apiClient.get(
+        `/projects/${projectId}/metrics/status-analytics`,
+        { params }
+      );
+      return response.data;
+    },
+    // What-if scenarios; nothing is saved
+    forecast: async (projectId, scenarios, date) => {
+      const response = await apiClient.post(
+        `/projects/${projectId}/forecast`,
+        { scenarios, date }
+      );
+      return response.data;
+    },
+    // P50/P80/P95 completion date and cost; params: iterations, seed
+    monteCarlo: async (projectId, params = {}) => {
+      const response = await apiClient.get(
+        `/projects/${projectId}/forecast/monte-carlo`,
+        { params }
+      );
+      return response.data;
+    },
+    // Critical path, slack and early/late dates per work order
+    criticalPath: async (projectId) => {
+      const response = await apiClient.get(`/projects/${projectId}/schedule`);
+      return response.data;
+    },
+    // Cascade a slip through the dependencies; nothing is saved
+    scheduleImpact: async (projectId, workOrderId, delayDays) => {
+      const response = await apiClient.post(
+        `/projects/${projectId}/schedule/impact`,
+        { workOrderId, delayDays }
+      );
+      return response.data;
+    },
+    // Daily snapshots for trend / burn-up charts; params: from, to, interval, agg
+    history: async (projectId, params = {}) => {
+      const response = await apiClient.get(
+        `/projects/${projectId}/metrics/history`,
+        { params }
+      );
+      return response.data;
+    },
     // NEW: Lightweight summary for project cards - fetches only essential metrics
     cardSummary: async (projectId) => {
       try {
@@ -309,8 +372,14 @@ export const messagesAPI = {
 };
 
 export const workOrdersAPI = {
-  getWorkOrdersByProject: async (projectId) => {
-    const response = await apiClient.get(`/workorders/project/${projectId}`);
+  // Cross-project listing; params: projectId, status, priority, from, to, assigneeId, sort, fields, include, limit, cursor
+  listWorkOrders: async (params = {}) => {
+    const response = await apiClient.get("/workorders/", { params });
+    return response.data;
+  },
+
+  getWorkOrdersByProject: async (projectId, params = {}) => {
+    const response = await apiClient.get(`/workorders/project/${projectId}`, { params });
     return response.data.workorders;
   },
 
@@ -360,9 +429,36 @@ export const workOrdersAPI = {
     );
     return response.data.workorder;
   },
+
+  // params: from, to, projectId
+  getWorkerAvailability: async (params = {}) => {
+    const response = await apiClient.get("/workorders/workers/availability", { params });
+    return response.data;
+  },
+
+  // params: from, to, projectId, capacity
+  getOverallocatedWorkers: async (params = {}) => {
+    const response = await apiClient.get("/workorders/workers/overallocated", { params });
+    return response.data.workers;
+  },
 };
 
 export const usersAPI = {
+  // Compact, paginated user search; params: q, role, workerType, projectId, limit, cursor
+  getDirectory: async (params = {}) => {
+    const response = await apiClient.get("/auth/directory", { params });
+    return response.data;
+  },
+  getProjectWorkers: async (projectId) => {
+    const users = [];
+    let cursor = null;
+    do {
+      const page = await usersAPI.getDirectory({ projectId, role: "worker", limit: 100, cursor });
+      users.push(...page.users);
+      cursor = page.nextCursor;
+    } while (cursor);
+    return users;
+  },
   getWorkers: async () => {
     const response = await apiClient.get("/auth/workers");
     return response.data.users;